@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from bv_algorithms import LevelDetectionPipeline, LevelDetector, LEVEL_ENGINES
+from level_detection_batch import read_frames, DEFAULT_ROI
+
+
+def compare_engines(video_path: str, roi: tuple = DEFAULT_ROI, max_frames: int = None):
+    """
+    Run all level detection engines on the difference images of a recording.
+    Note: The pipeline detects the glass and builds the difference images, every engine gets the same
+    difference image and glass mask of each frame.
+    :param video_path: Path to the video file or raw recording.
+    :param roi: ROI (x1, y1, x2, y2) of the glass.
+    :param max_frames: Process only the first frames of the recording.
+    :return: Dictionary engine -> {'levels': level per compared frame, 'times_ms': detection time per compared frame}
+    """
+    pipeline = LevelDetectionPipeline(roi_p1=tuple(roi[0:2]), roi_p2=tuple(roi[2:4]))
+    pipeline.level_interval = 1
+    pipeline.change_detector.enabled = False
+
+    detectors = {engine: LevelDetector() for engine in LEVEL_ENGINES}
+    for engine, detector in detectors.items():
+        detector.engine = engine
+    results = {engine: {'levels': [], 'times_ms': []} for engine in LEVEL_ENGINES}
+
+    for frame_index, frame in enumerate(read_frames(video_path, 0)):
+        if max_frames is not None and frame_index >= max_frames:
+            break
+        pipeline.process(frame)
+        images = pipeline.preview_images(names=())
+        if 'reference' in images:
+            for detector in detectors.values():
+                detector.set_glass_mask(pipeline.glass_detector.get_glass_mask())
+        if 'difference' not in images:
+            continue
+
+        for engine, detector in detectors.items():
+            start = time.perf_counter()
+            detector.detect(images['difference'].copy())
+            results[engine]['times_ms'].append((time.perf_counter() - start) * 1000)
+            results[engine]['levels'].append(detector.get_current_level())
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the level detection engines on recorded data.")
+    parser.add_argument('video', help="Video file or raw recording of a filling glass.")
+    parser.add_argument('--roi', type=int, nargs=4, metavar=('X1', 'Y1', 'X2', 'Y2'), default=DEFAULT_ROI,
+                        help="ROI of the glass.")
+    parser.add_argument('--max-frames', type=int, default=None, help="Process only the first frames.")
+    args = parser.parse_args(argv)
+
+    results = compare_engines(args.video, tuple(args.roi), args.max_frames)
+    reference = np.asarray(results[LEVEL_ENGINES[0]]['levels'])
+    for engine in LEVEL_ENGINES:
+        levels, times = np.asarray(results[engine]['levels']), np.asarray(results[engine]['times_ms'])
+        if len(levels) == 0:
+            print("No glass detected, nothing to compare.")
+            return 1
+        difference = levels - reference
+        print(f"{engine:12s} {len(levels)} frames | mean {times.mean():6.2f} ms | "
+              f"p50 {np.percentile(times, 50):6.2f} ms | "
+              f"level difference to {LEVEL_ENGINES[0]}: mean {difference.mean():+6.1f} px, "
+              f"max |{np.abs(difference).max()}| px")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from bv_algorithms import GlassDetection, LevelDetector, DifferenceImageBuilder, AutoscaleImage, MultiStationPipeline
+from stencil_benchmark import synthetic_glass_edges
+
+# Benchmark resolutions (height, width): full camera frame, default ROI and glass crop of the large glass.
+RESOLUTIONS = {
+    'full': (2048, 2048),
+    'roi': (1600, 800),
+    'glass': (1280, 480),
+}
+
+
+def synthetic_frame(height: int, width: int, fill: float = 0.5, seed: int = 0):
+    """
+    Create a deterministic raw 16-bit frame of a partially filled glass.
+    :param height: Frame height.
+    :param width: Frame width.
+    :param fill: Fill level of the glass (0.0 .. 1.0)
+    :param seed: Seed of the pixel noise.
+    :return: 16-bit frame
+    """
+    rng = np.random.default_rng(seed)
+    frame = np.full(shape=(height, width), fill_value=3000, dtype=np.uint16)
+
+    # Glass with 60 % of the frame width and 80 % of the frame height
+    x1, x2 = int(width * 0.2), int(width * 0.8)
+    y1, y2 = int(height * 0.1), int(height * 0.9)
+    level = int(y2 - (y2 - y1) * fill)
+    frame[level:y2, x1:x2] = 9000
+    cv2.rectangle(frame, (x1, y1), (x2, y2), 20000, 8)
+
+    noise = rng.normal(0, 100, size=(height, width))
+    return np.clip(frame + noise, 0, 65535).astype(np.uint16)
+
+
+def to_8bit(frame: np.ndarray):
+    """
+    Autoscale a raw 16-bit frame to 8 bit like the level detection pipeline.
+    :param frame: 16-bit frame
+    :return: 8-bit frame
+    """
+    return AutoscaleImage(backend='numpy').autoscale_8bit(frame)
+
+
+def detection_phase_detector(pyramid_scale: int = 1) -> GlassDetection:
+    """
+    Glass detector that never locks, so detect always measures the detection phase.
+    Note: A synthetic frame with a matching glass size (e.g. at ROI resolution) would lock a default detector
+    after detection_cycles calls, afterwards detect only crops the tracked glass.
+    :param pyramid_scale: Downsampling factor of the candidate search (see GlassDetection.pyramid_scale)
+    :return: Glass detector
+    """
+    detector = GlassDetection()
+    detector.detection_cycles = sys.maxsize
+    detector.pyramid_scale = pyramid_scale
+    return detector
+
+
+def create_stages(height: int, width: int):
+    """
+    Create the benchmarked stages for one resolution.
+    Note: The glass detection steps use the same OpenCV calls and parameters as GlassDetection.detect.
+    :param height: Frame height.
+    :param width: Frame width.
+    :return: Dictionary stage name -> function without arguments
+    """
+    raw = synthetic_frame(height, width)
+    frame = to_8bit(raw)
+    filled = to_8bit(synthetic_frame(height, width, fill=0.6, seed=1))
+
+    blurred = cv2.blur(frame, (7, 7), cv2.BORDER_DEFAULT)
+    grad_x = cv2.Sobel(blurred, cv2.CV_16S, 1, 0, ksize=5, scale=1, delta=0, borderType=cv2.BORDER_DEFAULT)
+    grad_y = cv2.Sobel(blurred, cv2.CV_16S, 0, 1, ksize=5, scale=1, delta=0, borderType=cv2.BORDER_DEFAULT)
+    weighted = cv2.addWeighted(cv2.convertScaleAbs(grad_x), 0.5, cv2.convertScaleAbs(grad_y), 0.5, 0)
+    _, edges = cv2.threshold(weighted, 40, 255, cv2.THRESH_BINARY)
+
+    def sobel():
+        gx = cv2.Sobel(blurred, cv2.CV_16S, 1, 0, ksize=5, scale=1, delta=0, borderType=cv2.BORDER_DEFAULT)
+        gy = cv2.Sobel(blurred, cv2.CV_16S, 0, 1, ksize=5, scale=1, delta=0, borderType=cv2.BORDER_DEFAULT)
+        return cv2.addWeighted(cv2.convertScaleAbs(gx), 0.5, cv2.convertScaleAbs(gy), 0.5, 0)
+
+    glass_detector = detection_phase_detector()
+    pyramid_detectors = {scale: detection_phase_detector(scale) for scale in (2, 4)}
+
+    # Stencil of a glass filling the whole frame
+    glass_edges = synthetic_glass_edges(height, width)
+    stencil_detector = GlassDetection()
+    stencil_detector._GlassDetection__ref_contour = (0, 0, width, height)
+
+    level_detector = LevelDetector()
+    stencil_detector.create_stencil(glass_edges.copy())
+    level_detector.set_glass_mask(stencil_detector.get_glass_mask())
+    projection_detector = LevelDetector()
+    projection_detector.engine = 'projection'
+    projection_detector.set_glass_mask(stencil_detector.get_glass_mask())
+
+    difference_builder = DifferenceImageBuilder()
+    difference_builder.set_reference_image(frame)
+    difference_image = difference_builder.build(filled).copy()
+
+    autoscale = AutoscaleImage()
+    autoscale.create_lookup_table(int(raw.min()), autoscale.t_max)
+    out_8bit = np.empty(shape=raw.shape, dtype=np.uint8)
+
+    # Same ROI for all stations, so the latency of 1 and 4 stations is directly comparable.
+    single_station = MultiStationPipeline(rois=[((0, 0), (width, height))])
+    four_stations = MultiStationPipeline(rois=[((0, 0), (width, height))] * 4)
+
+    return {
+        'glass_detection.blur': lambda: cv2.blur(frame, (7, 7), cv2.BORDER_DEFAULT),
+        'glass_detection.sobel': sobel,
+        'glass_detection.threshold': lambda: cv2.threshold(weighted, 40, 255, cv2.THRESH_BINARY),
+        'glass_detection.find_contours': lambda: cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE),
+        # Note: Like the pipeline, the detect stages leave out the edge map preview (same work at every scale).
+        'glass_detection.detect': lambda: glass_detector.detect(frame, compute_edges=False),
+        'glass_detection.detect_pyramid2': lambda: pyramid_detectors[2].detect(frame, compute_edges=False),
+        'glass_detection.detect_pyramid4': lambda: pyramid_detectors[4].detect(frame, compute_edges=False),
+        'glass_detection.create_stencil': lambda: stencil_detector.create_stencil(glass_edges.copy()),
+        'level_detection.detect': lambda: level_detector.detect(difference_image.copy()),
+        'level_detection.projection': lambda: projection_detector.detect(difference_image.copy()),
+        'difference_image.build': lambda: difference_builder.build(filled),
+        'autoscale.autoscale': lambda: autoscale.autoscale(raw),
+        'autoscale.autoscale_8bit': lambda: autoscale.autoscale_8bit(raw, out=out_8bit),
+        'stations.process_1': lambda: single_station.process(frame),
+        'stations.process_4': lambda: four_stations.process(frame),
+    }
+
+
+def measure(function, repeat: int, warmup: int):
+    """
+    Measure latency and peak memory of a stage.
+    Note: Peak memory is traced in a separate call, so tracing doesn't affect the latencies.
+    :param function: Stage function.
+    :param repeat: Number of timed calls.
+    :param warmup: Number of untimed calls before the measurement.
+    :return: Dictionary with mean_ms, p50_ms, p99_ms, fps and peak_memory_bytes
+    """
+    for _ in range(warmup):
+        function()
+
+    latencies = np.empty(shape=repeat, dtype=np.float64)
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies[i] = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = float(latencies.mean())
+    return {
+        'mean_ms': mean * 1000,
+        'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+        'p99_ms': float(np.percentile(latencies, 99)) * 1000,
+        'fps': 1.0 / mean if mean > 0 else 0.0,
+        'peak_memory_bytes': int(peak),
+    }
+
+
+def run(resolutions: list, stages: list = None, repeat: int = 50, warmup: int = 5):
+    """
+    Benchmark all stages at the given resolutions.
+    :param resolutions: Names of RESOLUTIONS.
+    :param stages: Stage names or prefixes to run (None: all stages)
+    :param repeat: Number of timed calls per stage.
+    :param warmup: Number of untimed calls per stage.
+    :return: Benchmark report (JSON serializable)
+    """
+    results = []
+    for resolution in resolutions:
+        height, width = RESOLUTIONS[resolution]
+        for stage, function in create_stages(height, width).items():
+            if stages is not None and not any(stage.startswith(name) for name in stages):
+                continue
+            result = {'stage': stage, 'resolution': resolution, 'shape': [height, width]}
+            result.update(measure(function, repeat, warmup))
+            results.append(result)
+            print(f"{stage:32s} {resolution:6s} mean {result['mean_ms']:8.2f} ms | p50 {result['p50_ms']:8.2f} ms | "
+                  f"p99 {result['p99_ms']:8.2f} ms | {result['fps']:8.1f} fps | "
+                  f"peak {result['peak_memory_bytes'] / 2 ** 20:7.1f} MiB", file=sys.stderr)
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'autoscale_backend': AutoscaleImage().backend,
+            'repeat': repeat,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, report: dict):
+    """
+    Print the speedup of a report against a baseline report.
+    :param baseline: Earlier benchmark report.
+    :param report: Current benchmark report.
+    :return: None
+    """
+    previous = {(r['stage'], r['resolution']): r for r in baseline['results']}
+    print(f"{'stage':32s} {'res':6s} {'baseline':>10s} {'current':>10s} {'speedup':>8s}")
+    for result in report['results']:
+        old = previous.get((result['stage'], result['resolution']))
+        if old is None:
+            continue
+        print(f"{result['stage']:32s} {result['resolution']:6s} {old['mean_ms']:8.2f}ms {result['mean_ms']:8.2f}ms "
+              f"{old['mean_ms'] / result['mean_ms']:7.2f}x")
+
+
+def parse_args(argv=None):
+    """
+    Command line arguments of the stage benchmark.
+    :param argv: Argument list (None: sys.argv)
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark each stage of bv_algorithms on synthetic frames.")
+    parser.add_argument('-r', '--resolutions', nargs='+', choices=list(RESOLUTIONS), default=list(RESOLUTIONS),
+                        help="Frame resolutions to benchmark.")
+    parser.add_argument('-s', '--stages', nargs='+', default=None,
+                        help="Stage names or prefixes to run, e.g. glass_detection autoscale.autoscale_8bit")
+    parser.add_argument('-n', '--repeat', type=int, default=50, help="Number of timed calls per stage.")
+    parser.add_argument('--warmup', type=int, default=5, help="Number of untimed calls per stage.")
+    parser.add_argument('-o', '--output', default=None, help="Save the results as JSON file.")
+    parser.add_argument('-c', '--compare', default=None, help="Compare against an earlier JSON result file.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args.resolutions, args.stages, args.repeat, args.warmup)
+
+    if args.output is not None:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as baseline:
+            compare(json.load(baseline), report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import sys
+import os
+import timeit
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from bv_algorithms import GlassDetection
+
+
+def synthetic_glass_edges(height: int, width: int, seed: int = 0):
+    """
+    Create a binarized edge image of a glass with broken contour segments.
+
+    :param height: Height of the glass BoundingBox.
+    :param width: Width of the glass BoundingBox.
+    :param seed: Seed for the random contour gaps.
+    :return: Binarized glass edge frame.
+    """
+    rng = np.random.default_rng(seed)
+    frame = np.zeros(shape=(height, width), dtype='uint8')
+    cv2.rectangle(frame, (3, int(height * 0.02)), (width - 4, height - 3), 255, 2)
+    for _ in range(4):
+        y = rng.integers(0, height)
+        frame[y:y + rng.integers(5, 60), :] = 0
+    return frame
+
+
+def legacy_create_stencil(frame: np.ndarray, ref_contour: tuple, mask_offset_top: float = 0.1,
+                          mask_offset_bottom: float = 0.1):
+    """
+    Line by line stencil reconstruction as implemented before vectorization.
+
+    :param frame: frame contain estimated glass section.
+    :param ref_contour: Glass BoundingBox (x, y, w, h).
+    :param mask_offset_top: Top offset for the mask frame.
+    :param mask_offset_bottom: Bottom offset for the mask frame.
+    :return: Tuple (stencil frame, mask frame)
+    """
+    (height, width) = ref_contour[3], ref_contour[2]
+    stencil_frame = np.full(shape=(height, width), fill_value=0, dtype='uint8')
+    contours, hierarchy = cv2.findContours(frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    for cnt in contours:
+        if cv2.contourArea(cnt) > 450:
+            stencil_frame = cv2.fillPoly(stencil_frame, pts=[cnt], color=(255, 255, 255))
+    stencil_frame = cv2.dilate(stencil_frame, np.ones((31, 31), np.uint8), 1)
+
+    (mean_right, mean_left, n_mean_left, n_mean_right) = (0, 0, 0, 0)
+    for yi in range(height):
+        t = np.where(stencil_frame[yi][0:-1] == 255)
+        if len(t) > 0 and len(t[0]) > 0:
+            t1 = t[0][0]
+            t2 = t[0][-1]
+            if int(height * mask_offset_top) < yi < int(height - height * mask_offset_bottom):
+                if abs(t2 - ref_contour[2]) < ref_contour[2] * 0.05:
+                    n_mean_right += 1
+                    mean_right += t2
+                if t1 < ref_contour[3] * 0.05:
+                    n_mean_left += 1
+                    mean_left += t1
+            stencil_frame[yi][t1:t2] = 255
+    mean_right = mean_right / n_mean_right
+    mean_left = mean_left / n_mean_left
+
+    range_y = range(int(height * 0.1), int(height - (height * 0.1)), 1)
+    for yi in range_y:
+        t = np.where(stencil_frame[yi][0:-1] == 255)
+        if len(t) > 0 and len(t[0]) > 0:
+            t1 = t[0][0]
+            t2 = t[0][-1]
+            if mean_right - t2 > 0:
+                stencil_frame[yi][t1:int(mean_right)] = 255
+            if t1 - mean_left > 0:
+                stencil_frame[yi][int(mean_left):t2] = 255
+
+    mask_frame = stencil_frame.copy()
+    for yi in range(0, int(height * mask_offset_top)):
+        mask_frame[yi] = 0
+    for yi in range(int(height - height * mask_offset_bottom), height):
+        mask_frame[yi] = 0
+
+    stencil_frame = cv2.cvtColor(stencil_frame, cv2.COLOR_GRAY2RGB)
+    for yi in range_y:
+        cv2.circle(stencil_frame, (int(mean_right), yi), 0, (255, 0, 0), 2)
+        cv2.circle(stencil_frame, (int(mean_left), yi), 0, (255, 0, 0), 2)
+    for xi in range(width):
+        cv2.circle(stencil_frame, (xi, int(height * 0.1)), 0, (0, 255, 255), 2)
+        cv2.circle(stencil_frame, (xi, int(height - height * 0.1)), 0, (0, 255, 255), 2)
+
+    return stencil_frame, mask_frame
+
+
+def vectorized_create_stencil(frame: np.ndarray, ref_contour: tuple):
+    """
+    Run GlassDetection.create_stencil for a fixed glass BoundingBox.
+
+    :param frame: frame contain estimated glass section.
+    :param ref_contour: Glass BoundingBox (x, y, w, h).
+    :return: Tuple (stencil frame, mask frame)
+    """
+    detector = GlassDetection()
+    detector._GlassDetection__ref_contour = ref_contour
+    detector.create_stencil(frame)
+    return detector.get_glass_stencil(), detector.get_glass_mask()
+
+
+if __name__ == '__main__':
+    repeat = 20
+    for (width, height) in [(480, 1040), (480, 1280)]:
+        edges = synthetic_glass_edges(height, width)
+        contour = (0, 0, width, height)
+
+        legacy_stencil, legacy_mask = legacy_create_stencil(edges.copy(), contour)
+        stencil, mask = vectorized_create_stencil(edges.copy(), contour)
+        identical = np.array_equal(legacy_stencil, stencil) and np.array_equal(legacy_mask, mask)
+
+        t_legacy = timeit.timeit(lambda: legacy_create_stencil(edges.copy(), contour), number=repeat) / repeat
+        t_vector = timeit.timeit(lambda: vectorized_create_stencil(edges.copy(), contour), number=repeat) / repeat
+        print(f"{width}x{height}: legacy {t_legacy * 1000:.2f} ms | vectorized {t_vector * 1000:.2f} ms | "
+              f"speedup {t_legacy / t_vector:.1f}x | identical: {identical}")
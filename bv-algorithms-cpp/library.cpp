@@ -1,7 +1,7 @@
 #include "library.h"
 
-#define WIN32
-//#define OSX
+#include <thread>
+#include <vector>
 
 Autoscale::Autoscale() {}
 
@@ -27,54 +27,123 @@ void Autoscale::Create_LookupTable(int t_min, int t_max) {
     return;
 }
 
-void Autoscale::Apply_16Bit(unsigned short img[2048][2048]) {
+void Autoscale::Set_LookupTable(const uint16_t *table) {
 
-    for(size_t i = 0; i < 2048; i++)
+    for(size_t i = 0; i < 65536; i++)
     {
-        for (size_t j = 0; j < 2048; j++)
+        this->lookupTable[i] = table[i];
+    }
+
+    return;
+}
+
+void Autoscale::Apply_Rows(uint16_t *img, size_t first_row, size_t last_row, size_t width, size_t stride) const {
+
+    for(size_t i = first_row; i < last_row; i++)
+    {
+        uint16_t *row = img + i * stride;
+        for (size_t j = 0; j < width; j++)
         {
-            img[i][j] = this->lookupTable[img[i][j]];
+            row[j] = this->lookupTable[row[j]];
         }
     }
     return;
 }
 
-#ifdef WIN32
-extern "C"
-{
-__declspec(dllexport) Autoscale* createInstance() {
+void Autoscale::Apply_16Bit(unsigned short img[2048][2048]) {
 
-    return new Autoscale();
+    this->Apply_16Bit(&img[0][0], 2048, 2048, 2048, 1);
+    return;
 }
 
-__declspec(dllexport) void createLookUpTable(Autoscale* instance, unsigned short t_min, unsigned short t_max){
+void Autoscale::Apply_16Bit(uint16_t *img, size_t height, size_t width, size_t stride, unsigned int n_threads) {
 
-    instance->Create_LookupTable(t_min, t_max);
+    Run_Row_Blocks(height, n_threads, [=](size_t first_row, size_t last_row) {
+        this->Apply_Rows(img, first_row, last_row, width, stride);
+    });
+    return;
 }
 
-__declspec(dllexport) void apply(Autoscale *instance, unsigned short array[2048][2048])
-{
-    instance->Apply_16Bit(array);
+void Autoscale::Apply_8Bit(const uint16_t *src, size_t height, size_t width, size_t src_stride, uint8_t *dst,
+                           size_t dst_stride, const uint8_t *table, unsigned int n_threads) {
+
+    Run_Row_Blocks(height, n_threads, [=](size_t first_row, size_t last_row) {
+        for(size_t i = first_row; i < last_row; i++)
+        {
+            const uint16_t *src_row = src + i * src_stride;
+            uint8_t *dst_row = dst + i * dst_stride;
+            for (size_t j = 0; j < width; j++)
+            {
+                dst_row[j] = table[src_row[j]];
+            }
+        }
+    });
+    return;
+}
+
+void Autoscale::Run_Row_Blocks(size_t height, unsigned int n_threads,
+                               const std::function<void(size_t, size_t)> &process_rows) {
+
+    // Note: Each worker thread processes a contiguous block of rows.
+    if (n_threads <= 1 || height < 2)
+    {
+        process_rows(0, height);
+        return;
+    }
+
+    if (n_threads > height)
+        n_threads = (unsigned int)height;
+
+    size_t rows_per_thread = (height + n_threads - 1) / n_threads;
+    std::vector<std::thread> workers;
+    for (size_t first_row = 0; first_row < height; first_row += rows_per_thread)
+    {
+        size_t last_row = first_row + rows_per_thread < height ? first_row + rows_per_thread : height;
+        workers.emplace_back(process_rows, first_row, last_row);
+    }
+
+    for (std::thread &worker : workers)
+        worker.join();
+
+    return;
 }
-};
-#endif
 
-#ifdef OSX
 extern "C"
 {
-Autoscale* createInstance() {
+BV_EXPORT Autoscale* createInstance() {
 
     return new Autoscale();
 }
 
-void createLookUpTable(Autoscale* instance, unsigned short t_min, unsigned short t_max){
+BV_EXPORT void createLookUpTable(Autoscale* instance, unsigned short t_min, unsigned short t_max){
 
     instance->Create_LookupTable(t_min, t_max);
 }
 
-void apply(Autoscale *instance, unsigned short array[2048][2048])
+// Replace the Look-Up table with a table of 65536 entries created by the caller.
+BV_EXPORT void setLookUpTable(Autoscale* instance, const uint16_t *table){
+
+    instance->Set_LookupTable(table);
+}
+
+BV_EXPORT void apply(Autoscale *instance, unsigned short array[2048][2048])
 {
     instance->Apply_16Bit(array);
 }
+
+// Apply the Look-Up table in place on a 16-bit image of any size.
+// Note: stride is the distance between two rows in pixels (not bytes).
+BV_EXPORT void applyStrided(Autoscale *instance, uint16_t *array, size_t height, size_t width, size_t stride,
+                            unsigned int n_threads)
+{
+    instance->Apply_16Bit(array, height, width, stride, n_threads);
+}
+
+// Map a 16-bit image to an 8-bit image through a table of 65536 entries.
+// Note: Strides are the distance between two rows in pixels (not bytes).
+BV_EXPORT void applyTo8Bit(const uint16_t *src, size_t height, size_t width, size_t src_stride, uint8_t *dst,
+                           size_t dst_stride, const uint8_t *table, unsigned int n_threads)
+{
+    Autoscale::Apply_8Bit(src, height, width, src_stride, dst, dst_stride, table, n_threads);
+}
 };
-#endif
\ No newline at end of file
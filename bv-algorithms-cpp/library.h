@@ -3,12 +3,24 @@
 
 #include <stdint.h>
 #include <stddef.h>
+#include <functional>
+
+#if defined(_WIN32)
+#define BV_EXPORT __declspec(dllexport)
+#else
+#define BV_EXPORT __attribute__((visibility("default")))
+#endif
 
 class Autoscale
 {
 
     uint16_t lookupTable[65536] = {0 };
 
+    void Apply_Rows(uint16_t *img, size_t first_row, size_t last_row, size_t width, size_t stride) const;
+
+    static void Run_Row_Blocks(size_t height, unsigned int n_threads,
+                               const std::function<void(size_t, size_t)> &process_rows);
+
 public:
 
     Autoscale();
@@ -17,7 +29,14 @@ public:
 
     void Create_LookupTable(int t_min, int t_max);
 
+    void Set_LookupTable(const uint16_t *table);
+
     void Apply_16Bit(unsigned short img[2048][2048]);
 
+    void Apply_16Bit(uint16_t *img, size_t height, size_t width, size_t stride, unsigned int n_threads);
+
+    static void Apply_8Bit(const uint16_t *src, size_t height, size_t width, size_t src_stride, uint8_t *dst,
+                           size_t dst_stride, const uint8_t *table, unsigned int n_threads);
+
 };
-#endif
\ No newline at end of file
+#endif
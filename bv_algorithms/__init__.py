@@ -1,2 +1,6 @@
 from .autoscale import AutoscaleImage
 from .algorithms import *
+from .pipeline import LevelDetectionPipeline, MultiStationPipeline, LevelResult, fill_level_mm
+from .mailbox import LatestFrameMailbox, FairFrameQueue
+from .timing import StageTimer
+from .histogram import RunningHistogram, histogram_bins, sample_pixels
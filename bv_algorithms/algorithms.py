@@ -1,6 +1,58 @@
 import cv2
 import sys
+import math
 import numpy as np
+from .timing import StageTimer
+
+# Level detection engines of the LevelDetector:
+# 'morphology': 2D morphology and Sobel on the difference image, level sampled on detection lines.
+# 'projection': Row profile of the difference image within the glass mask, level at the profile transition.
+LEVEL_ENGINES = ('morphology', 'projection')
+
+
+def _row_extents(foreground: np.ndarray):
+    """
+    Find the first and last foreground column of every line in a binary image.
+
+    :param foreground: Boolean image (True: foreground pixel).
+    :return: Tuple (first, last, has_pixels) with one entry per line. Lines without foreground pixels
+    have first and last set to 0.
+    """
+    has_pixels = foreground.any(axis=1)
+    first = np.where(has_pixels, foreground.argmax(axis=1), 0)
+    last = np.where(has_pixels, foreground.shape[1] - 1 - foreground[:, ::-1].argmax(axis=1), 0)
+    return first, last, has_pixels
+
+
+def _draw_vertical_guide(frame: np.ndarray, x: int, range_y: range, color: tuple):
+    """
+    Draw a vertical guide line with the same pixels as one cv2.circle(radius=0, thickness=2) per line.
+    Note: Such a circle is a plus-shaped cross of five pixels.
+
+    :param frame: RGB frame to draw on.
+    :param x: Column of the guide line.
+    :param range_y: Lines covered by the guide line.
+    :param color: Line color.
+    :return: None
+    """
+    height, width = frame.shape[0], frame.shape[1]
+    frame[max(range_y.start - 1, 0):min(range_y.stop + 1, height), x] = color
+    for xi in (x - 1, x + 1):
+        if 0 <= xi < width:
+            frame[range_y.start:range_y.stop, xi] = color
+
+
+def _draw_horizontal_guide(frame: np.ndarray, y: int, color: tuple):
+    """
+    Draw a horizontal guide line over the full frame width with the same pixels as one
+    cv2.circle(radius=0, thickness=2) per column.
+
+    :param frame: RGB frame to draw on.
+    :param y: Line of the guide line.
+    :param color: Line color.
+    :return: None
+    """
+    frame[max(y - 1, 0):y + 2] = color
 
 
 class GlassDetection(object):
@@ -38,6 +90,15 @@ class GlassDetection(object):
         # Original image with full size estimated glass.
         self.__glass_frame: np.ndarray = None
 
+        # Binarized edge frame of the last frame (None: not computed yet in tracking mode)
+        self.__edge_frame: np.ndarray = None
+
+        # Last frame in tracking mode, kept to compute the edge frame on demand.
+        self.__last_frame: np.ndarray = None
+
+        # Size (width, height) of the frame of a downsampled edge frame (None: edge frame has the frame size)
+        self.__edge_frame_size: tuple = None
+
         # 0: small glass 1: big glass -1: no glass
         self.__detected_glass_type: int = -1
 
@@ -48,6 +109,10 @@ class GlassDetection(object):
         # gets marked as done
         self.detection_cycles: int = 30
 
+        # Downsampling factor of the candidate search while detecting (1: full resolution | 2 | 4)
+        # Note: Only the final BoundingBox and the stencil are computed on the full resolution frame.
+        self.pyramid_scale: int = 1
+
         # Top offset for the mask_frame. (Default 10 %)
         self.mask_offset_top: float = 0.1
 
@@ -60,6 +125,9 @@ class GlassDetection(object):
         # Reference size in pixel of the small glass.
         self.small_glass_size: (int, int) = (480, 1040)
 
+        # Timing of the detection steps (disabled by default).
+        self.timer: StageTimer = StageTimer()
+
     def create_stencil(self, frame: np.ndarray):
         """
         Create binarized glass mask from estimated glass.
@@ -81,7 +149,6 @@ class GlassDetection(object):
         self.__stencil_frame = np.full(shape=(height, width), fill_value=0, dtype='uint8')
 
         # Get contours of within the glass BoundingBox
-        range_y = range(height)
         self.__stencil_contours_frame = np.zeros(frame.shape)
         contours, hierarchy = cv2.findContours(frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
         for cnt in contours:
@@ -101,58 +168,46 @@ class GlassDetection(object):
         self.__stencil_frame = cv2.dilate(self.__stencil_frame, np.ones((31, 31), np.uint8), 1)
 
         # 2. Close cylinder contour of the glass
-        # Note: Based on the mean of each edge-side...
-        (mean_right, mean_left, n_mean_left, n_mean_right) = (0, 0, 0, 0)
-
-        # Iterate all lines
-        for yi in range_y:
-            t = np.where(self.__stencil_frame[yi][0:-1] == 255)     # Extract all pixels of the glass
-
-            if len(t) > 0 and len(t[0]) > 0:
-                # Extract left first edge and right first edge
-                t1 = t[0][0]
-                t2 = t[0][-1]
-
-                if int(height * self.mask_offset_top) < yi < int(height - height * self.mask_offset_bottom):
-                    if abs(t2 - self.__ref_contour[2]) < self.__ref_contour[2]*0.05:
-                        n_mean_right += 1
-                        mean_right += t2
-                    if t1 < self.__ref_contour[3]*0.05:
-                        n_mean_left += 1
-                        mean_left += t1
-                self.__stencil_frame[yi][t1:t2] = 255   # Fill all pixels between left and right edge
-
-        mean_right = mean_right / n_mean_right
-        mean_left = mean_left / n_mean_left
+        # Note: Based on the mean of each edge-side. The first and last glass pixel of every line is
+        # extracted for the whole stencil at once (the last column is ignored).
+        first, last, has_pixels = _row_extents(self.__stencil_frame[:, 0:-1] == 255)
+        rows = np.arange(height)
+
+        # Only lines within the mask offsets contribute to the mean edge position
+        in_mask = has_pixels & (int(height * self.mask_offset_top) < rows) & \
+            (rows < int(height - height * self.mask_offset_bottom))
+        right_edges = last[in_mask & (np.abs(last - self.__ref_contour[2]) < self.__ref_contour[2] * 0.05)]
+        left_edges = first[in_mask & (first < self.__ref_contour[3] * 0.05)]
+
+        mean_right = int(right_edges.sum()) / len(right_edges)
+        mean_left = int(left_edges.sum()) / len(left_edges)
 
         # 3. Reconstruct cylinder contour for failed contour detection.
-        # Note: Mean pixel position used to determine the approximated right place for the edge pixel
+        # Note: Mean pixel position used to determine the approximated right place for the edge pixel.
+        # Every line is filled between its left and right edge, lines inside the reconstruction range
+        # get their edges extended to the mean edge positions.
         range_y = range(int(height*0.1), int(height-(height*0.1)), 1)   # Ignore 10 % of the height from top and bottom
-        for yi in range_y:
-            t = np.where(self.__stencil_frame[yi][0:-1] == 255)
-            if len(t) > 0 and len(t[0]) > 0:
-                t1 = t[0][0]
-                t2 = t[0][-1]
+        in_range = has_pixels & (range_y.start <= rows) & (rows < range_y.stop)
+        fill_start = np.where(in_range & (first - mean_left > 0), int(mean_left), first)
+        fill_stop = np.where(in_range & (mean_right - last > 0), int(mean_right), last)
 
-                if mean_right - t2 > 0:
-                    self.__stencil_frame[yi][t1:int(mean_right)] = 255
-                if t1 - mean_left > 0:
-                    self.__stencil_frame[yi][int(mean_left):t2] = 255
+        columns = np.arange(width)
+        fill = (fill_start[:, None] <= columns) & (columns < fill_stop[:, None]) & has_pixels[:, None]
+        self.__stencil_frame[fill] = 255
 
         self.__mask_frame = self.__stencil_frame.copy()
-        for yi in range(0, int(height * self.mask_offset_top)):
-            self.__mask_frame[yi] = 0
-        for yi in range(int(height-height * self.mask_offset_bottom), height):
-            self.__mask_frame[yi] = 0
+        self.__mask_frame[0:int(height * self.mask_offset_top)] = 0
+        self.__mask_frame[int(height-height * self.mask_offset_bottom):height] = 0
 
+        # Draw mean edge guides (blue) and reconstruction limits (yellow)
         self.__stencil_frame = cv2.cvtColor(self.__stencil_frame, cv2.COLOR_GRAY2RGB)
-        for yi in range_y:
-            cv2.circle(self.__stencil_frame, (int(mean_right), yi), 0, (255, 0, 0), 2)
-            cv2.circle(self.__stencil_frame, (int(mean_left), yi), 0, (255, 0, 0), 2)
+        if len(range_y) > 0:
+            _draw_vertical_guide(self.__stencil_frame, int(mean_right), range_y, (255, 0, 0))
+            _draw_vertical_guide(self.__stencil_frame, int(mean_left), range_y, (255, 0, 0))
 
-        for xi in range(width):
-            cv2.circle(self.__stencil_frame, (xi, int(height*0.1)), 0, (0, 255, 255), 2)
-            cv2.circle(self.__stencil_frame, (xi, int(height-height * 0.1)), 0, (0, 255, 255), 2)
+        if width > 0:
+            _draw_horizontal_guide(self.__stencil_frame, int(height*0.1), (0, 255, 255))
+            _draw_horizontal_guide(self.__stencil_frame, int(height-height * 0.1), (0, 255, 255))
 
         if self.__debug_mode:
             cv2.imshow("IMAGE", self.__mask_frame)
@@ -160,58 +215,59 @@ class GlassDetection(object):
 
         return
 
-    def detect(self, frame: np.ndarray):
+    def detect(self, frame: np.ndarray, compute_edges: bool = True):
         """
         Perform glass detection on the given input frame.
 
+        Note: Once the glass is detected, the detector is in tracking mode and only crops the glass frame.
+        The edge frame is then computed on demand (see get_edge_frame), the input frame must not be
+        modified until then.
+        With pyramid_scale > 1 the candidate search and the stability check run on the downsampled frame.
         :param frame: Original image frame from camera.
-        :return: blurred frame
+        :param compute_edges: Return the edge frame (otherwise available through get_edge_frame)
+        :return: binarized edge frame (None with compute_edges=False)
         """
 
         # ------------------------------------------------- #
-        # 1. Blur input frame before further processing
-        # ------------------------------------------------- #
-        orig_frame = frame.copy()
-        frame = cv2.blur(frame, (7, 7), cv2.BORDER_DEFAULT)
-
-        # ------------------------------------------------- #
-        # 2. Sobel Operator to detect glass contour
-        # ------------------------------------------------- #
-        grad_x = cv2.Sobel(frame, cv2.CV_16S, 1, 0, ksize=5, scale=1, delta=0, borderType=cv2.BORDER_DEFAULT)
-        grad_y = cv2.Sobel(frame, cv2.CV_16S, 0, 1, ksize=5, scale=1, delta=0, borderType=cv2.BORDER_DEFAULT)
-
-        # ------------------------------------------------- #
-        # 3. Transform into 8-bit pixel values.
-        # ------------------------------------------------- #
-        abs_grad_x = cv2.convertScaleAbs(grad_x)
-        abs_grad_y = cv2.convertScaleAbs(grad_y)
-
-        # ------------------------------------------------- #
-        # 4. Overlay x and y Sobel components
+        # 1. Tracking mode: Only copy the estimated glass section.
         # ------------------------------------------------- #
-        weighted = cv2.addWeighted(abs_grad_x, 0.5, abs_grad_y, 0.5, 0)
-
-        # ------------------------------------------------- #
-        # 5. Threshold resulting image with static values.
-        # ------------------------------------------------- #
-        _, frame = cv2.threshold(weighted, 40, 255, cv2.THRESH_BINARY)
+        if self.__detected:
+            t = self.timer.tic()
+            self.__glass_frame = frame[
+                                self.__ref_contour[1]:self.__ref_contour[1] + self.__ref_contour[3],
+                                self.__ref_contour[0]:self.__ref_contour[0] + self.__ref_contour[2]].copy()
+            self.__last_frame = frame
+            self.__edge_frame = None
+            self.__edge_frame_size = None
+            self.timer.toc('glass_detection.glass_frame', t)
+            return self.get_edge_frame() if compute_edges else None
 
         # ------------------------------------------------- #
-        # 6. Make a copy of the estimated glass section.
+        # 2. Binarize the glass contour (blur, Sobel, threshold).
+        # Note: In pyramid mode on the downsampled frame.
         # ------------------------------------------------- #
-        if self.__detected:
-            self.__glass_frame = orig_frame[
-                                self.__ref_contour[1]:self.__ref_contour[1] + self.__ref_contour[3],
-                                self.__ref_contour[0]:self.__ref_contour[0] + self.__ref_contour[2]]
-            return frame.copy()
+        orig_frame = frame
+        scale = self.pyramid_scale if self.pyramid_scale > 1 else 1
+        self.__edge_frame_size = None
+        if scale > 1:
+            t = self.timer.tic()
+            size = (frame.shape[1] // scale, frame.shape[0] // scale)
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            self.timer.toc('glass_detection.downsample', t)
+            self.__edge_frame_size = (orig_frame.shape[1], orig_frame.shape[0])
+        frame = self.__create_edge_frame(frame, scale)
+        self.__last_frame = None
+        self.__edge_frame = frame
+        t = self.timer.tic()
 
         # ------------------------------------------------- #
-        # 7. Detect contours in binarized image.
+        # 3. Detect contours in binarized image.
         # ------------------------------------------------- #
         contours, hierarchy = cv2.findContours(frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        t = self.timer.toc('glass_detection.contours', t)
 
         # ------------------------------------------------- #
-        # 8. Estimate glass with checking the largest contour.
+        # 4. Estimate glass with checking the largest contour.
         # ------------------------------------------------- #
         if len(contours) == 0:
             self.__cycle_counter = 0
@@ -221,6 +277,7 @@ class GlassDetection(object):
         for contour in contours:
             if cv2.contourArea(contour) > biggest_area:
                 biggest_contour = cv2.boundingRect(contour)
+        biggest_contour = tuple(value * scale for value in biggest_contour)
         diff = tuple(map(lambda x, y: abs(x - y), self.__ref_contour, biggest_contour))
         if max(diff) > self.abs_pixel_tolerance:
             self.__ref_contour = biggest_contour
@@ -230,6 +287,13 @@ class GlassDetection(object):
 
         if self.__cycle_counter >= self.detection_cycles:
 
+            # Refine the BoundingBox of the downsampled frame on the full resolution frame
+            stencil_edges = None
+            if scale > 1:
+                t = self.timer.toc('glass_detection.estimate', t)
+                stencil_edges = self.__refine_contour(orig_frame)
+                t = self.timer.toc('glass_detection.refine', t)
+
             # Check if the determined contour could be the small or large glass
             estimated_height = self.__ref_contour[3]
             estimated_width = self.__ref_contour[2]
@@ -251,13 +315,101 @@ class GlassDetection(object):
                 self.__detected = True
                 self.__glass_frame = orig_frame[
                                     self.__ref_contour[1]:self.__ref_contour[1] + self.__ref_contour[3],
-                                    self.__ref_contour[0]:self.__ref_contour[0] + self.__ref_contour[2]]
+                                    self.__ref_contour[0]:self.__ref_contour[0] + self.__ref_contour[2]].copy()
 
-                self.create_stencil(frame[
+                if stencil_edges is None:
+                    stencil_edges = frame[
                                     self.__ref_contour[1]:self.__ref_contour[1] + self.__ref_contour[3],
-                                    self.__ref_contour[0]:self.__ref_contour[0] + self.__ref_contour[2]])
+                                    self.__ref_contour[0]:self.__ref_contour[0] + self.__ref_contour[2]]
+                self.create_stencil(stencil_edges)
+
+        self.timer.toc('glass_detection.estimate', t)
+        return self.get_edge_frame() if compute_edges else None
+
+    def __refine_contour(self, frame: np.ndarray):
+        """
+        Refine the BoundingBox found on the downsampled frame on a full resolution window around it.
+        Note: The refined BoundingBox is only taken if it is within abs_pixel_tolerance of the candidate.
+        :param frame: Original image frame from camera.
+        :return: Full resolution edge frame of the (refined) BoundingBox for the stencil.
+        """
+        x, y, w, h = self.__ref_contour
+        margin = 4 * self.pyramid_scale + 8
+        x1, y1 = max(x - margin, 0), max(y - margin, 0)
+        x2, y2 = min(x + w + margin, frame.shape[1]), min(y + h + margin, frame.shape[0])
+        edges = self.__create_edge_frame(frame[y1:y2, x1:x2])
+
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours) > 0:
+            bx, by, bw, bh = cv2.boundingRect(max(contours, key=cv2.contourArea))
+            refined = (bx + x1, by + y1, bw, bh)
+            if max(map(lambda i, j: abs(i - j), refined, self.__ref_contour)) <= self.abs_pixel_tolerance:
+                self.__ref_contour = refined
+
+        x, y, w, h = self.__ref_contour
+        return edges[y - y1:y - y1 + h, x - x1:x - x1 + w]
+
+    def get_edge_frame(self):
+        """
+        Binarized edge frame of the last frame.
+        Note: Computed on the first call after a frame in tracking mode.
+        :return: Copy of the edge frame (None before the first frame)
+        """
+        if self.__edge_frame is None and self.__last_frame is not None:
+            self.__edge_frame = self.__create_edge_frame(self.__last_frame)
+            self.__last_frame = None
+        if self.__edge_frame is None:
+            return None
+        if self.__edge_frame_size is not None:
+            # Edge frame of the downsampled frame (pyramid mode) in the frame size
+            return cv2.resize(self.__edge_frame, self.__edge_frame_size, interpolation=cv2.INTER_NEAREST)
+        return self.__edge_frame.copy()
+
+    def __create_edge_frame(self, frame: np.ndarray, scale: int = 1):
+        """
+        Binarize the glass contour of a frame.
+        :param frame: Original image frame from camera.
+        :param scale: Downsampling factor of the frame, the filter sizes are reduced accordingly.
+        :return: binarized edge frame
+        """
+        blur_size = 7 if scale == 1 else 3
+        sobel_size = 5 if scale == 1 else 3
+
+        # ------------------------------------------------- #
+        # 1. Blur input frame before further processing
+        # ------------------------------------------------- #
+        t = self.timer.tic()
+        frame = cv2.blur(frame, (blur_size, blur_size), cv2.BORDER_DEFAULT)
+        t = self.timer.toc('glass_detection.blur', t)
+
+        # ------------------------------------------------- #
+        # 2. Sobel Operator to detect glass contour
+        # ------------------------------------------------- #
+        grad_x = cv2.Sobel(frame, cv2.CV_16S, 1, 0, ksize=sobel_size, scale=1, delta=0,
+                           borderType=cv2.BORDER_DEFAULT)
+        grad_y = cv2.Sobel(frame, cv2.CV_16S, 0, 1, ksize=sobel_size, scale=1, delta=0,
+                           borderType=cv2.BORDER_DEFAULT)
+        t = self.timer.toc('glass_detection.sobel', t)
 
-        return frame.copy()
+        # ------------------------------------------------- #
+        # 3. Transform into 8-bit pixel values.
+        # ------------------------------------------------- #
+        abs_grad_x = cv2.convertScaleAbs(grad_x)
+        abs_grad_y = cv2.convertScaleAbs(grad_y)
+        t = self.timer.toc('glass_detection.convert', t)
+
+        # ------------------------------------------------- #
+        # 4. Overlay x and y Sobel components
+        # ------------------------------------------------- #
+        weighted = cv2.addWeighted(abs_grad_x, 0.5, abs_grad_y, 0.5, 0)
+        t = self.timer.toc('glass_detection.weighted', t)
+
+        # ------------------------------------------------- #
+        # 5. Threshold resulting image with static values.
+        # ------------------------------------------------- #
+        _, frame = cv2.threshold(weighted, 40, 255, cv2.THRESH_BINARY)
+        self.timer.toc('glass_detection.threshold', t)
+        return frame
 
     def state(self):
         """
@@ -314,6 +466,7 @@ class GlassDetection(object):
         """
         self.__detected = False
         self.__ref_contour = (0, 0, 0, 0)
+        self.__last_frame = None
 
 
 class LevelDetector(object):
@@ -338,39 +491,63 @@ class LevelDetector(object):
         self.__current_level_pixel: int = 0
 
         # All detection lines to calculate fill-level
-        self.__detection_lines = []
+        # Note: Column index of each detection line within the glass frame.
+        self.__detection_lines: np.ndarray = None
+
+        # Relative x-positions of the detection lines (0.0: left edge, 1.0: right edge of the glass)
+        self.detection_line_positions: tuple = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+        # Detected height of each detection line of the last frame (0: nothing detected)
+        self.__detected_heights: np.ndarray = np.zeros(shape=0, dtype='int64')
+
+        # Level detection engine (see LEVEL_ENGINES), can be changed between frames.
+        self.engine: str = 'morphology'
+
+        # Projection engine: minimum fraction of changed mask pixels of a row to count as filled and
+        # size of the box filter smoothing the row profile.
+        self.profile_threshold: float = 0.5
+        self.profile_filter_size: int = 7
+
+        # Number of glass mask pixels of each row and buffer of the masked difference image (projection engine).
+        self.__mask_row_pixels: np.ndarray = None
+        self.__masked_frame: np.ndarray = None
+
+        # Smoothed row profile of the last frame (projection engine, fraction of filled mask pixels per row).
+        self.__profile: np.ndarray = np.zeros(shape=0, dtype='float64')
+
+        # Timing of the detection steps (disabled by default).
+        self.timer: StageTimer = StageTimer()
 
     def detect(self, frame: np.ndarray):
         """
         Detect current fill-level for the input frame.
 
         :param frame: Frame contain only the estimated glass area. Not the whole camera frame.
-        :return: None
+        :return: RGB level detection image (the input frame without glass mask)
         """
 
         if self.__glass_mask is None:
             return frame
 
+        if self.engine == 'projection':
+            return self.__detect_projection(frame)
+        if self.engine != 'morphology':
+            raise ValueError(f"Unknown level detection engine: {self.engine}")
+
         # -------------------------------------------------------------- #
         # 1. Generate detection lines
         # -------------------------------------------------------------- #
+        t = self.timer.tic()
         (height, width) = frame.shape
-        if len(self.__detection_lines) == 0:
-            self.__detection_lines.append((int(0.1*width), 0, int(0.1*width), height))
-            self.__detection_lines.append((int(0.2 * width), 0, int(0.2 * width), height))
-            self.__detection_lines.append((int(0.3 * width), 0, int(0.3 * width), height))
-            self.__detection_lines.append((int(0.4 * width), 0, int(0.4 * width), height))
-            self.__detection_lines.append((int(0.5 * width), 0, int(0.5 * width), height))
-            self.__detection_lines.append((int(0.6 * width), 0, int(0.6 * width), height))
-            self.__detection_lines.append((int(0.7 * width), 0, int(0.7 * width), height))
-            self.__detection_lines.append((int(0.8 * width), 0, int(0.8 * width), height))
-            self.__detection_lines.append((int(0.9 * width), 0, int(0.9 * width), height))
+        self.__detection_lines = self.__line_columns(width)
+        t = self.timer.toc('level_detection.lines', t)
 
         # -------------------------------------------------------------- #
         # 2. Eliminate all unimportant pixels
         # Note: This generate a binarized image.
         # -------------------------------------------------------------- #
         frame = cv2.bitwise_and(self.__glass_mask, frame)
+        t = self.timer.toc('level_detection.mask', t)
 
         # -------------------------------------------------------------- #
         # 3. Process the resulting image by using Morphological Filters
@@ -380,6 +557,7 @@ class LevelDetector(object):
         frame = cv2.erode(frame, kernel, 2)
         kernel = np.ones((13, 13), np.uint8)
         frame = cv2.dilate(frame, kernel, 1)
+        t = self.timer.toc('level_detection.morphology', t)
 
         if self.__debug_mode:
             cv2.imshow("LEVEL_DETECTOR", frame)
@@ -396,40 +574,82 @@ class LevelDetector(object):
         frame = cv2.dilate(frame, kernel, 1)
 
         # Detect first pixels on detection line from top to bottom
-        detected_heights = [0, 0, 0, 0, 0, 0, 0, 0, 0]
-
-        # Find first and second detection line
-        for yi in range(height):
-            if frame[yi][int(0.1*width)] == 255 and detected_heights[0] == 0:
-                detected_heights[0] = yi
-            if frame[yi][int(0.2*width)] == 255 and detected_heights[1] == 0:
-                detected_heights[1] = yi
-            if frame[yi][int(0.3*width)] == 255 and detected_heights[2] == 0:
-                detected_heights[2] = yi
-            if frame[yi][int(0.4*width)] == 255 and detected_heights[3] == 0:
-                detected_heights[3] = yi
-            if frame[yi][int(0.5*width)] == 255 and detected_heights[4] == 0:
-                detected_heights[4] = yi
-            if frame[yi][int(0.6*width)] == 255 and detected_heights[5] == 0:
-                detected_heights[5] = yi
-            if frame[yi][int(0.7*width)] == 255 and detected_heights[6] == 0:
-                detected_heights[6] = yi
-            if frame[yi][int(0.8*width)] == 255 and detected_heights[7] == 0:
-                detected_heights[7] = yi
-            if frame[yi][int(0.9*width)] == 255 and detected_heights[8] == 0:
-                detected_heights[8] = yi
+        # Note: All detection lines are sampled at once. The first line of the frame is skipped,
+        # a detection line without any pixel reports a height of 0.
+        samples = frame[1:, self.__detection_lines] == 255
+        self.__detected_heights = np.where(samples.any(axis=0), samples.argmax(axis=0) + 1, 0)
+        t = self.timer.toc('level_detection.level', t)
 
         frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
 
         # Draw estimated fill-level line
-        self.__current_level_pixel = int(sum(detected_heights) / len(detected_heights))
+        # Note: Without detection lines the level is reported as 0 (nothing detected).
+        n_lines = len(self.__detected_heights)
+        self.__current_level_pixel = int(int(self.__detected_heights.sum()) / n_lines) if n_lines > 0 else 0
         cv2.line(frame, pt1=(0, self.__current_level_pixel), pt2=(width, self.__current_level_pixel),
                  color=(0, 0, 255), thickness=3)
 
         # Draw detection lines
-        for detection_line in self.__detection_lines:
-            cv2.line(frame, pt1=(detection_line[0], detection_line[1]), pt2=(detection_line[2], detection_line[3]),
-                     color=(0, 255, 0), thickness=2)
+        # Note: Same pixels as cv2.line with thickness 2 (one column on each side of the line).
+        line_columns = np.concatenate((self.__detection_lines - 1, self.__detection_lines, self.__detection_lines + 1))
+        frame[:, line_columns[(line_columns >= 0) & (line_columns < width)]] = (0, 255, 0)
+        self.timer.toc('level_detection.draw', t)
+
+        return frame
+
+    def __line_columns(self, width: int) -> np.ndarray:
+        """
+        Column index of each detection line within the glass frame.
+        Note: A position of 1.0 (right edge) is the last column of the frame.
+        :param width: Width of the glass frame.
+        :return: Column index of each detection line.
+        """
+        columns = (np.asarray(self.detection_line_positions) * width).astype('intp')
+        return np.clip(columns, 0, width - 1)
+
+    def __detect_projection(self, frame: np.ndarray):
+        """
+        Detect the fill level from the row profile of the difference image within the glass mask.
+        Note: A single pass over the pixels (masked row sums), the level search itself is 1D.
+
+        :param frame: Binarized difference image of the glass area.
+        :return: RGB image of the masked difference image with row profile and fill-level line
+        """
+
+        # -------------------------------------------------------------- #
+        # 1. Row profile: fraction of changed glass mask pixels of every row
+        # -------------------------------------------------------------- #
+        t = self.timer.tic()
+        (height, width) = frame.shape
+        self.__detection_lines = self.__line_columns(width)
+        if self.__masked_frame is None or self.__masked_frame.shape != frame.shape:
+            self.__masked_frame = np.empty_like(frame)
+        cv2.bitwise_and(self.__glass_mask, frame, dst=self.__masked_frame)
+        row_sums = cv2.reduce(self.__masked_frame, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+        profile = np.divide(row_sums, 255.0 * self.__mask_row_pixels, out=np.zeros(shape=height, dtype='float64'),
+                            where=self.__mask_row_pixels > 0)
+        t = self.timer.toc('level_detection.profile', t)
+
+        # -------------------------------------------------------------- #
+        # 2. Filling level detection
+        # Note: Box filter along the rows to suppress single noisy rows, the level is the first row
+        # from top to bottom that is filled. The first row is skipped like by the morphology engine.
+        # -------------------------------------------------------------- #
+        size = max(int(self.profile_filter_size), 1)
+        self.__profile = np.convolve(profile, np.ones(size) / size, mode='same')
+        filled = self.__profile[1:] >= self.profile_threshold
+        self.__current_level_pixel = int(filled.argmax()) + 1 if filled.any() else 0
+        self.__detected_heights = np.full(shape=len(self.__detection_lines), fill_value=self.__current_level_pixel,
+                                          dtype='int64')
+        t = self.timer.toc('level_detection.level', t)
+
+        # Draw row profile and estimated fill-level line
+        frame = cv2.cvtColor(self.__masked_frame, cv2.COLOR_GRAY2RGB)
+        points = np.stack((self.__profile * (width - 1), np.arange(height)), axis=1).astype('int32')
+        cv2.polylines(frame, [points], isClosed=False, color=(0, 255, 0), thickness=2)
+        cv2.line(frame, pt1=(0, self.__current_level_pixel), pt2=(width, self.__current_level_pixel),
+                 color=(0, 0, 255), thickness=3)
+        self.timer.toc('level_detection.draw', t)
 
         return frame
 
@@ -440,6 +660,7 @@ class LevelDetector(object):
         :return: None
         """
         self.__glass_mask = mask.copy()
+        self.__mask_row_pixels = np.count_nonzero(self.__glass_mask, axis=1)
 
     def get_current_level(self):
         """
@@ -450,6 +671,32 @@ class LevelDetector(object):
         """
         return self.__current_level_pixel
 
+    def set_detection_line_count(self, n_lines: int):
+        """
+        Distribute the given number of detection lines evenly over the glass width.
+        Note: The default configuration equals 9 detection lines.
+        :param n_lines: Number of detection lines (at least 1).
+        :return: None
+        """
+        if n_lines < 1:
+            raise ValueError(f"At least one detection line is needed: {n_lines}")
+        self.detection_line_positions = tuple(i / (n_lines + 1) for i in range(1, n_lines + 1))
+
+    def get_detected_heights(self):
+        """
+        Detected fill-level of every single detection line of the last frame.
+        Note: The projection engine reports its fill level for every detection line.
+        :return: Array with the height in pixel for each detection line (0: nothing detected)
+        """
+        return self.__detected_heights.copy()
+
+    def get_profile(self):
+        """
+        Smoothed row profile of the last frame (projection engine only).
+        :return: Fraction of changed glass mask pixels of each row
+        """
+        return self.__profile.copy()
+
 
 class DifferenceImageBuilder(object):
     """
@@ -469,20 +716,33 @@ class DifferenceImageBuilder(object):
         self.__ref_image = None
 
         # Resulting difference image
+        # Note: Allocated once with the reference image and overwritten by every build call.
         self.__diff_image = None
 
+        # Absolute difference between input frame and reference image (8-bit fast path only).
+        self.__abs_diff_image = None
+
         # Threshold distance between reference image and difference image
         self.distance: int = 10
 
     def build(self, frame: np.ndarray):
         """
         This method create a binarized difference image from the input frame and a internal saved reference frame.
+        Note: For 8-bit images the result is written into a buffer allocated with the reference image. The returned
+        image will be overwritten by the next call of this method, copy it to keep the result.
         :param frame: Input frame
-        :return: None
-        """
-        self.__diff_image = abs(frame.astype('float64') - self.__ref_image.astype('float64'))
-        self.__diff_image = np.where(self.__diff_image >= self.distance, 255, 0)
-        self.__diff_image = self.__diff_image.astype('uint8')
+        :return: Binarized difference image (255: distance >= threshold distance)
+        """
+        if self.__abs_diff_image is None or frame.dtype != self.__ref_image.dtype:
+            diff_image = abs(frame.astype('float64') - self.__ref_image.astype('float64'))
+            diff_image = np.where(diff_image >= self.distance, 255, 0)
+            self.__diff_image = diff_image.astype('uint8')
+            return self.__diff_image
+
+        # Integer distance: |a - b| >= distance equals |a - b| > ceil(distance) - 1
+        cv2.absdiff(frame, self.__ref_image, dst=self.__abs_diff_image)
+        cv2.threshold(self.__abs_diff_image, math.ceil(self.distance) - 1, 255, cv2.THRESH_BINARY,
+                      dst=self.__diff_image)
         return self.__diff_image
 
     def set_reference_image(self, frame: np.ndarray):
@@ -492,3 +752,141 @@ class DifferenceImageBuilder(object):
         :return: None
         """
         self.__ref_image = frame.copy()
+
+        # Allocate output buffers for the 8-bit fast path once per reference image.
+        if self.__ref_image.dtype == np.uint8:
+            self.__abs_diff_image = np.empty_like(self.__ref_image)
+            self.__diff_image = np.empty_like(self.__ref_image)
+        else:
+            self.__abs_diff_image = None
+            self.__diff_image = None
+
+
+class ChangeDetector(object):
+    """
+    Cheap check if a frame has changed since the last frame that passed the check.
+    Note: Used as gate in front of the difference image and the level detection, static frames (before and after
+    the pour) reuse the previous result. Frames are compared downsampled, the area average also suppresses the
+    pixel noise. With a mask only blocks well inside the side walls are compared, so small movements of the glass
+    walls don't count as change. The top and bottom of the mask are kept, the level changes there.
+    """
+
+    def __init__(self, threshold: int = 8, min_changed: int = 4, scale: int = 8, mask_margin: int = 32,
+                 mask_margin_y: int = 0, refresh_interval: int = 10):
+        """
+        Constructor
+        :param threshold: Minimum difference in gray levels of a downsampled pixel to count as changed.
+        :param min_changed: Minimum number of changed downsampled pixels to count the frame as changed.
+        :param scale: Downsampling factor in both directions.
+        :param mask_margin: Horizontal distance in pixel to the mask border of the compared area (see set_mask).
+        :param mask_margin_y: Vertical distance in pixel to the mask border of the compared area.
+        :param refresh_interval: Count a frame as changed after this number of consecutive static frames (0: never)
+        """
+
+        # Check frames (False: every frame counts as changed)
+        self.enabled: bool = True
+
+        # Minimum difference in gray levels of a downsampled pixel to count as changed.
+        self.threshold: int = threshold
+
+        # Minimum number of changed downsampled pixels to count the frame as changed.
+        self.min_changed: int = min_changed
+
+        # Downsampling factor in both directions.
+        self.scale: int = scale
+
+        # Horizontal and vertical distance in pixel to the mask border of the compared area.
+        # Note: The glass walls move sideways by a few pixels, the top and bottom of the filling area are
+        # no walls (see GlassDetection.create_stencil) and the level passes them.
+        self.mask_margin: int = mask_margin
+        self.mask_margin_y: int = mask_margin_y
+
+        # Count a frame as changed after this number of consecutive static frames (0: never)
+        # Note: Bounds the time a level change below the threshold goes unnoticed.
+        self.refresh_interval: int = refresh_interval
+
+        # Number of checked frames and number of unchanged (skipped) frames.
+        self.frames_checked: int = 0
+        self.frames_skipped: int = 0
+        self.__skipped_in_row: int = 0
+
+        # Downsampled current frame, last passed frame and their absolute difference.
+        self.__small_frame: np.ndarray = None
+        self.__last_frame: np.ndarray = None
+        self.__diff_frame: np.ndarray = None
+
+        # Compared area (None: whole frame) and the downsampled blocks completely inside it.
+        self.__mask: np.ndarray = None
+        self.__small_mask: np.ndarray = None
+
+    def changed(self, frame: np.ndarray) -> bool:
+        """
+        Compare a frame with the last frame that passed the check.
+        :param frame: Grayscale frame.
+        :return: True: changed (or first frame, new size, gate disabled) | False: static frame
+        """
+        self.frames_checked += 1
+        if not self.enabled:
+            return True
+
+        # 1. Downsample
+        size = (max(frame.shape[1] // self.scale, 1), max(frame.shape[0] // self.scale, 1))
+        if self.__small_frame is None or self.__small_frame.shape != (size[1], size[0]) or \
+                self.__small_frame.dtype != frame.dtype:
+            self.__small_frame = np.empty(shape=(size[1], size[0]), dtype=frame.dtype)
+            self.__diff_frame = np.empty_like(self.__small_frame)
+            self.__last_frame = None
+            self.__small_mask = None
+            if self.__mask is not None and self.__mask.shape == frame.shape[:2]:
+                # Blocks completely inside the mask, shrunk by the margins
+                margin_x = 2 * math.ceil(self.mask_margin / self.scale) + 1
+                margin_y = 2 * math.ceil(self.mask_margin_y / self.scale) + 1
+                small_mask = cv2.resize(self.__mask, size, interpolation=cv2.INTER_AREA)
+                self.__small_mask = cv2.erode(small_mask, np.ones((margin_y, margin_x), np.uint8),
+                                              borderType=cv2.BORDER_CONSTANT, borderValue=0) == 255
+        cv2.resize(frame, size, dst=self.__small_frame, interpolation=cv2.INTER_AREA)
+
+        # 2. Count changed pixels (inside the mask) against the last passed frame
+        changed = self.__last_frame is None
+        if not changed:
+            cv2.absdiff(self.__small_frame, self.__last_frame, dst=self.__diff_frame)
+            changed_pixels = self.__diff_frame > self.threshold
+            if self.__small_mask is not None:
+                changed_pixels &= self.__small_mask
+            changed = np.count_nonzero(changed_pixels) >= self.min_changed
+            changed |= 0 < self.refresh_interval <= self.__skipped_in_row
+
+        # 3. A changed frame becomes the new comparison frame
+        if changed:
+            if self.__last_frame is None:
+                self.__last_frame = np.empty_like(self.__small_frame)
+            self.__small_frame, self.__last_frame = self.__last_frame, self.__small_frame
+            self.__skipped_in_row = 0
+        else:
+            self.frames_skipped += 1
+            self.__skipped_in_row += 1
+        return changed
+
+    def set_mask(self, mask: np.ndarray):
+        """
+        Compare only the area of a mask (e.g. the filling area of the glass), the next frame counts as changed.
+        :param mask: Binarized mask with the frame size (255: compared) | None: whole frame
+        :return: None
+        """
+        self.__mask = mask.copy() if mask is not None else None
+        self.__small_frame = None
+        self.__last_frame = None
+
+    def skip_ratio(self) -> float:
+        """
+        Fraction of the checked frames that were static.
+        :return: 0.0 .. 1.0
+        """
+        return self.frames_skipped / self.frames_checked if self.frames_checked > 0 else 0.0
+
+    def reset(self):
+        """
+        Forget the last frame, the next frame counts as changed.
+        :return: None
+        """
+        self.__last_frame = None
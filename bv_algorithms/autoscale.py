@@ -1,27 +1,110 @@
 import ctypes
+import functools
+import cv2
 import platform
 import numpy as np
 import os
 
 # ------------------------------------------------------------ #
 # Autodetect OS platform
+# Note: The Linux library has to be built from bv-algorithms-cpp
+# with CMake. The build places it next to this file.
+# If no native library can be loaded, the NumPy backend is used.
 # ------------------------------------------------------------ #
-if platform.system() == 'Windows':
-    lib = ctypes.CDLL(os.path.dirname(os.path.realpath(__file__)) + "\\bv_algorithms_cpp.dll")
-elif platform.system() == 'Darwin':
-    lib = ctypes.CDLL(os.path.dirname(os.path.realpath(__file__)) + "/libbv_algorithms_cpp.dylib")
-else:
-    raise Exception(f"No implementations for this System: {platform.system()}")
+lib = None
+try:
+    if platform.system() == 'Windows':
+        lib = ctypes.CDLL(os.path.dirname(os.path.realpath(__file__)) + "\\bv_algorithms_cpp.dll")
+    elif platform.system() == 'Darwin':
+        lib = ctypes.CDLL(os.path.dirname(os.path.realpath(__file__)) + "/libbv_algorithms_cpp.dylib")
+    elif platform.system() == 'Linux':
+        lib = ctypes.CDLL(os.path.dirname(os.path.realpath(__file__)) + "/libbv_algorithms_cpp.so")
+except OSError:
+    lib = None
 
 # ------------------------------------------------------------ #
 # Generate local Python bindings to the C++ autoscale library.
 # ------------------------------------------------------------ #
 c_int_array = np.ctypeslib.ndpointer(dtype=np.uint16, ndim=2, flags=['C_CONTIGUOUS', 'WRITEABLE'])
+c_lut_array = np.ctypeslib.ndpointer(dtype=np.uint16, ndim=1, shape=(65536,), flags=['C_CONTIGUOUS'])
+c_lut_8bit_array = np.ctypeslib.ndpointer(dtype=np.uint8, ndim=1, shape=(65536,), flags=['C_CONTIGUOUS'])
 BV_HelperHandle = ctypes.POINTER(ctypes.c_char)
-lib.createInstance.argtypes = []
-lib.createInstance.restype = BV_HelperHandle
-lib.createLookUpTable.argtypes = [BV_HelperHandle, ctypes.c_uint16, ctypes.c_uint16]
-lib.apply.argtypes = [BV_HelperHandle, c_int_array]
+if lib is not None:
+    lib.createInstance.argtypes = []
+    lib.createInstance.restype = BV_HelperHandle
+    lib.createLookUpTable.argtypes = [BV_HelperHandle, ctypes.c_uint16, ctypes.c_uint16]
+    lib.apply.argtypes = [BV_HelperHandle, c_int_array]
+
+# Resolution-agnostic apply with row stride and worker threads.
+# Note: Libraries built before this binding support only 2048x2048 images.
+HAS_STRIDED_APPLY = lib is not None and hasattr(lib, 'applyStrided')
+if HAS_STRIDED_APPLY:
+    lib.applyStrided.argtypes = [BV_HelperHandle, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_size_t,
+                                 ctypes.c_uint]
+
+# Upload of Look-Up tables created in Python.
+# Note: Libraries built before this binding create their table themselves.
+HAS_SET_LOOKUP_TABLE = lib is not None and hasattr(lib, 'setLookUpTable')
+if HAS_SET_LOOKUP_TABLE:
+    lib.setLookUpTable.argtypes = [BV_HelperHandle, c_lut_array]
+
+# Single pass 16-bit to 8-bit mapping.
+# Note: Libraries built before this binding use the NumPy implementation.
+HAS_APPLY_TO_8BIT = lib is not None and hasattr(lib, 'applyTo8Bit')
+if HAS_APPLY_TO_8BIT:
+    lib.applyTo8Bit.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_void_p,
+                                ctypes.c_size_t, c_lut_8bit_array, ctypes.c_uint]
+
+# Number of Look-Up tables kept in the shared cache.
+LOOKUP_TABLE_CACHE_SIZE = 16
+
+
+@functools.lru_cache(maxsize=LOOKUP_TABLE_CACHE_SIZE)
+def lookup_table(t_min: int, t_max: int) -> np.ndarray:
+    """
+    Create the 16-bit Look-Up table for min and max pixel value.
+    Note: Same values as Autoscale::Create_LookupTable of the C++ library (integer scale factor,
+    single precision arithmetic). Tables are cached, the returned array is read-only.
+    :param t_min: Minimum pixel value.
+    :param t_max: Maximum pixel value.
+    :return: Look-Up table with 65536 entries.
+    """
+    if t_max == t_min:
+        raise ZeroDivisionError("Look-Up table needs t_max != t_min.")
+
+    # C++ integer division truncates towards zero.
+    c_0 = np.float32(65535 // abs(t_max - t_min) * (1 if t_max > t_min else -1))
+    c_1 = np.float32(-1.0 * t_min)
+    values = c_0 * (np.arange(65536, dtype=np.float32) + c_1)
+
+    # Float to int conversion: out of range values become INT_MIN like on x86.
+    out_of_range = (values >= 2.0 ** 31) | (values < -2.0 ** 31)
+    values = np.where(out_of_range, -2.0 ** 31, np.trunc(values))
+
+    table = np.clip(values, 0, 65535).astype(np.uint16)
+    table.flags.writeable = False
+    return table
+
+
+@functools.lru_cache(maxsize=LOOKUP_TABLE_CACHE_SIZE)
+def lookup_table_8bit(t_min: int, t_max: int, v_min: int, v_max: int) -> np.ndarray:
+    """
+    Create a Look-Up table mapping raw 16-bit pixels to the final 8-bit image.
+    Note: Same result as the 16-bit Look-Up table followed by cv2.normalize(..., NORM_MINMAX, CV_8U) on an image
+    with minimum v_min and maximum v_max. Entries outside [v_min, v_max] are 0. Tables are cached,
+    the returned array is read-only.
+    :param t_min: Minimum pixel value of the 16-bit Look-Up table.
+    :param t_max: Maximum pixel value of the 16-bit Look-Up table.
+    :param v_min: Minimum pixel value of the raw image.
+    :param v_max: Maximum pixel value of the raw image.
+    :return: Look-Up table with 65536 entries.
+    """
+    scaled = lookup_table(t_min, t_max)[v_min:v_max + 1].reshape(1, -1)
+
+    table = np.zeros(shape=65536, dtype=np.uint8)
+    table[v_min:v_max + 1] = cv2.normalize(scaled, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U).ravel()
+    table.flags.writeable = False
+    return table
 
 
 class AutoscaleImage(object):
@@ -29,23 +112,90 @@ class AutoscaleImage(object):
     Binding class to C++ autoscaling methods.
 
     This class contains binding to generate a Look-Up table and create an auto-scaled image.
+    The NumPy backend gets selected automatically if the native library isn't available.
     Note: Works only with 16-bit image.
     """
 
-    def __init__(self):
+    def __init__(self, n_threads: int = 1, backend: str = None):
         """
         Class constructor create new instance from native C++ library.
+        :param n_threads: Number of worker threads to apply the Look-Up table (native backend only).
+        :param backend: 'native' | 'numpy' | None (autodetect)
         """
-        self.instance = lib.createInstance()
+        if backend is None:
+            backend = 'native' if lib is not None else 'numpy'
+        if backend not in ('native', 'numpy'):
+            raise ValueError(f"Unknown autoscale backend: {backend}")
+        if backend == 'native' and lib is None:
+            raise Exception(f"No native autoscale library for this System: {platform.system()}")
+
+        # Selected backend: 'native' | 'numpy'
+        self.backend: str = backend
+
+        self.instance = lib.createInstance() if backend == 'native' else None
+
+        # Number of worker threads the image rows get split across.
+        self.n_threads: int = n_threads
+
+        # Maximum pixel value of the Look-Up table used by autoscale.
+        self.t_max: int = 32750
+
+        # Limits (t_min, t_max) and Look-Up table currently in use.
+        self.__lookup_table_key: tuple = None
+        self.__lookup_table: np.ndarray = None
 
     def create_lookup_table(self, t_min: int, t_max: int) -> None:
         """
         Create Look-Up table with min and max pixel value.
+        Note: Tables are taken from a cache shared by all instances.
         :param t_min: Minimum pixel value.
         :param t_max: Maximum pixel value.
         :return: None
         """
-        lib.createLookUpTable(self.instance, t_min, t_max)
+        key = (int(t_min), int(t_max))
+        table = lookup_table(*key)
+        if key == self.__lookup_table_key:
+            return
+
+        self.__lookup_table_key = key
+        self.__lookup_table = table
+        if self.backend == 'native':
+            if HAS_SET_LOOKUP_TABLE:
+                lib.setLookUpTable(self.instance, table)
+            else:
+                lib.createLookUpTable(self.instance, t_min, t_max)
+
+    def apply(self, image: np.ndarray) -> None:
+        """
+        Apply the current Look-Up table in place.
+        Note: The image can have any size. Rows may be padded (e.g. a crop of a larger frame),
+        but the pixels within a row have to be contiguous.
+        :param image: Grayscale 16-bit image
+        :return: None
+        """
+        if image.dtype != np.uint16 or image.ndim != 2:
+            raise ValueError("Autoscale works only with 2D 16-bit images.")
+
+        if self.backend == 'numpy':
+            np.take(self.__lookup_table, image, out=image)
+            return
+
+        if not HAS_STRIDED_APPLY:
+            if image.shape != (2048, 2048):
+                raise ValueError("The loaded autoscale library supports only 2048x2048 images. Rebuild it from "
+                                 "bv-algorithms-cpp for other image sizes.")
+            lib.apply(self.instance, image)
+            return
+
+        height, width = image.shape
+        if image.strides[1] != image.itemsize or image.strides[0] < width * image.itemsize or \
+                image.strides[0] % image.itemsize != 0:
+            raise ValueError("Image rows have to be contiguous.")
+        if not image.flags.writeable:
+            raise ValueError("Image has to be writeable.")
+
+        lib.applyStrided(self.instance, image.ctypes.data, height, width, image.strides[0] // image.itemsize,
+                         max(int(self.n_threads), 1))
 
     def autoscale(self, image: np.ndarray):
         """
@@ -53,7 +203,54 @@ class AutoscaleImage(object):
         :param image: Input grayscale 16-bit image
         :return: Scaled 16-bit image.
         """
+        self.create_lookup_table(image.min(), self.t_max)
+        if self.backend == 'numpy':
+            return np.take(self.__lookup_table, image)
+
         scaled_image = image.copy()
-        lib.createLookUpTable(self.instance, image.min(), 32750)
-        lib.apply(self.instance, scaled_image)
+        self.apply(scaled_image)
         return scaled_image
+
+    def autoscale_8bit(self, image: np.ndarray, out: np.ndarray = None):
+        """
+        Perform autoscaling and min-max normalization to 8-bit in a single pass.
+        Note: Same result as cv2.normalize(autoscale(image), None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U).
+        :param image: Input grayscale 16-bit image
+        :param out: Optional 8-bit output image with the size of the input image.
+        :return: Scaled and normalized 8-bit image.
+        """
+        if image.dtype != np.uint16 or image.ndim != 2:
+            raise ValueError("Autoscale works only with 2D 16-bit images.")
+        if out is None:
+            out = np.empty(shape=image.shape, dtype=np.uint8)
+        elif out.dtype != np.uint8 or out.shape != image.shape:
+            raise ValueError("Output image has to be an 8-bit image with the size of the input image.")
+
+        v_min, v_max, _, _ = cv2.minMaxLoc(image)
+        table = lookup_table_8bit(int(v_min), self.t_max, int(v_min), int(v_max))
+
+        height, width = image.shape
+        if self.backend == 'native' and HAS_APPLY_TO_8BIT and image.strides[1] == image.itemsize and \
+                out.strides[1] == out.itemsize and image.strides[0] >= width * image.itemsize and \
+                image.strides[0] % image.itemsize == 0 and out.strides[0] >= width:
+            lib.applyTo8Bit(image.ctypes.data, height, width, image.strides[0] // image.itemsize, out.ctypes.data,
+                            out.strides[0], table, max(int(self.n_threads), 1))
+        else:
+            np.take(table, image, out=out)
+        return out
+
+    @staticmethod
+    def cache_info():
+        """
+        Statistics of the Look-Up table cache shared by all instances and backends.
+        :return: Named tuple (hits, misses, maxsize, currsize)
+        """
+        return lookup_table.cache_info()
+
+    @staticmethod
+    def cache_info_8bit():
+        """
+        Statistics of the 8-bit Look-Up table cache shared by all instances and backends.
+        :return: Named tuple (hits, misses, maxsize, currsize)
+        """
+        return lookup_table_8bit.cache_info()
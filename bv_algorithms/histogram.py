@@ -0,0 +1,105 @@
+import numpy as np
+
+
+def histogram_bins(dtype) -> tuple:
+    """
+    Histogram layout used for camera images.
+    :param dtype: Image data type.
+    :return: Tuple (number of bins, pixel values per bin) - 16 bit: (1024, 64) | 8 bit: (256, 1)
+    """
+    return (65536 // 64, 64) if np.dtype(dtype) == np.uint16 else (256, 1)
+
+
+def sample_pixels(image: np.ndarray, sample_budget: int = None, mode: str = 'strided', rng=None) -> np.ndarray:
+    """
+    Take a subsample of the pixels of an image.
+    :param image: Grayscale image.
+    :param sample_budget: Maximum number of pixels (None: all pixels)
+    :param mode: 'strided': regular grid | 'random': random pixels (new positions every call)
+    :param rng: NumPy random generator for the random mode (None: default generator)
+    :return: 1-D copy of the sampled pixels
+    """
+    n_pixel = image.shape[0] * image.shape[1]
+    if sample_budget is None or sample_budget >= n_pixel:
+        return image.ravel().copy()
+
+    if mode == 'random':
+        rng = rng if rng is not None else np.random.default_rng()
+        rows = rng.integers(0, image.shape[0], size=sample_budget)
+        columns = rng.integers(0, image.shape[1], size=sample_budget)
+        return image[rows, columns]
+    if mode != 'strided':
+        raise ValueError(f"Unknown sample mode: {mode}")
+
+    # Same step in both directions, rounded up so the budget isn't exceeded.
+    step = int(np.ceil(np.sqrt(n_pixel / sample_budget)))
+    return image[::step, ::step].ravel()
+
+
+class RunningHistogram(object):
+    """
+    Histogram of sampled pixels with optional exponential smoothing over frames.
+    Note: Counts are scaled to the pixel count of the full image, so sampled and exact histograms are comparable.
+    """
+
+    def __init__(self, n_bins: int, bin_width: int = 1, smoothing: float = 0.0):
+        """
+        Constructor.
+        :param n_bins: Number of bins.
+        :param bin_width: Pixel values per bin.
+        :param smoothing: Weight of the previous histogram (0.0: no smoothing .. <1.0: strong smoothing)
+        """
+        self.n_bins: int = n_bins
+        self.bin_width: int = bin_width
+        self.smoothing: float = smoothing
+
+        self.__histogram: np.ndarray = None
+
+    def update(self, samples: np.ndarray, n_pixel: int = None) -> np.ndarray:
+        """
+        Add the samples of a new frame.
+        :param samples: Sampled pixel values.
+        :param n_pixel: Pixel count of the full image (None: number of samples)
+        :return: Current histogram
+        """
+        counts = np.bincount(samples // self.bin_width if self.bin_width > 1 else samples, minlength=self.n_bins)
+        histogram = counts[:self.n_bins].astype(np.float64)
+        if n_pixel is not None and len(samples) > 0:
+            histogram *= n_pixel / len(samples)
+
+        if self.__histogram is None or self.smoothing <= 0.0:
+            self.__histogram = histogram
+        else:
+            self.__histogram = self.smoothing * self.__histogram + (1.0 - self.smoothing) * histogram
+        return self.__histogram
+
+    def histogram(self) -> np.ndarray:
+        """
+        Current histogram.
+        :return: Pixel count per bin (None before the first update)
+        """
+        return self.__histogram
+
+    def cumulative(self) -> np.ndarray:
+        """
+        Cumulative distribution of the current histogram.
+        :return: Fraction of pixels up to each bin (None before the first update)
+        """
+        if self.__histogram is None:
+            return None
+        cumulative = self.__histogram.cumsum()
+        return cumulative / cumulative[-1] if cumulative[-1] > 0 else cumulative
+
+    def bin_values(self) -> np.ndarray:
+        """
+        Lowest pixel value of each bin.
+        :return: X-values of the histogram
+        """
+        return np.arange(self.n_bins, dtype=np.float64) * self.bin_width
+
+    def reset(self) -> None:
+        """
+        Drop the smoothed histogram.
+        :return: None
+        """
+        self.__histogram = None
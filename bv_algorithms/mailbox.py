@@ -0,0 +1,246 @@
+import collections
+import threading
+import numpy as np
+
+
+class LatestFrameMailbox(object):
+    """
+    Single slot mailbox between a frame source and a processing thread.
+
+    A new frame overwrites a frame that hasn't been taken yet, so the consumer always gets the latest frame
+    and memory stays bounded when processing falls behind. Overwritten frames are counted as dropped.
+    """
+
+    def __init__(self, drop_callback=None):
+        """
+        Constructor.
+        :param drop_callback: Called with every dropped frame (e.g. to give it back to a frame pool).
+        """
+        self.__drop_callback = drop_callback
+        self.__condition = threading.Condition()
+        self.__frame: np.ndarray = None
+        self.__closed: bool = False
+
+        # Number of frames put into the mailbox.
+        self.frames_put: int = 0
+
+        # Number of frames overwritten before the consumer took them.
+        self.frames_dropped: int = 0
+
+    def put(self, frame: np.ndarray) -> bool:
+        """
+        Store a new frame. A frame that hasn't been taken yet gets dropped.
+        Note: Never blocks, can be called from any thread.
+        :param frame: New frame.
+        :return: True: no frame dropped | False: previous frame dropped
+        """
+        with self.__condition:
+            dropped_frame = self.__frame
+            if dropped_frame is not None:
+                self.frames_dropped += 1
+            self.__frame = frame
+            self.frames_put += 1
+            self.__condition.notify()
+
+        if dropped_frame is not None and self.__drop_callback is not None:
+            self.__drop_callback(dropped_frame)
+        return dropped_frame is None
+
+    def get(self, timeout: float = None):
+        """
+        Take the latest frame. Blocks until a frame is available, the timeout expires or the mailbox is closed.
+        :param timeout: Maximum waiting time in seconds (None: wait forever)
+        :return: Latest frame or None
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__frame is not None or self.__closed, timeout)
+            frame = self.__frame
+            self.__frame = None
+            return frame
+
+    def close(self):
+        """
+        Wake up all waiting consumers. Frames put afterwards are still stored.
+        :return: None
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+    def open(self):
+        """
+        Reopen a closed mailbox and discard a pending frame.
+        :return: None
+        """
+        with self.__condition:
+            self.__closed = False
+            dropped_frame = self.__frame
+            self.__frame = None
+
+        if dropped_frame is not None and self.__drop_callback is not None:
+            self.__drop_callback(dropped_frame)
+
+
+class FairFrameQueue(object):
+    """
+    Bounded frame queues of several streams (e.g. cameras) shared by a pool of processing threads.
+
+    Every stream keeps at most depth frames. A new frame replaces the oldest pending frame of its stream, so
+    memory stays bounded and a fast stream can never starve the others. Consumers take the frames round-robin
+    over the streams. A stream is skipped while one of its frames is in process (task_done not called yet),
+    so the frames of a stream are processed in order, one at a time.
+    """
+
+    def __init__(self, depth: int = 1, drop_callback=None):
+        """
+        Constructor.
+        :param depth: Maximum number of pending frames per stream.
+        :param drop_callback: Called with (stream_id, frame) of every dropped frame.
+        """
+        self.depth: int = depth
+        self.__drop_callback = drop_callback
+        self.__condition = threading.Condition()
+        self.__closed: bool = False
+
+        # Pending frames, busy flag and counters of each stream (insertion order is the round-robin order).
+        self.__streams: dict = {}
+        self.__next: int = 0
+
+    def add_stream(self, stream_id) -> None:
+        """
+        Register a new stream.
+        :param stream_id: Stream id (any hashable)
+        :return: None
+        """
+        with self.__condition:
+            if stream_id not in self.__streams:
+                self.__streams[stream_id] = {'frames': collections.deque(), 'busy': False, 'frames_put': 0,
+                                             'frames_dropped': 0, 'frames_taken': 0}
+
+    def remove_stream(self, stream_id) -> None:
+        """
+        Unregister a stream and drop its pending frames.
+        :param stream_id: Stream id.
+        :return: None
+        """
+        with self.__condition:
+            stream = self.__streams.pop(stream_id, None)
+        if stream is not None:
+            self.__drop_all(stream_id, stream['frames'])
+
+    def put(self, stream_id, frame: np.ndarray) -> bool:
+        """
+        Queue a new frame of a stream. The oldest pending frame of the stream gets dropped if its queue is full.
+        Note: Never blocks, can be called from any thread. Frames of unknown streams are dropped.
+        :param stream_id: Stream id.
+        :param frame: New frame.
+        :return: True: no frame dropped | False: a frame was dropped
+        """
+        dropped_frame = None
+        with self.__condition:
+            stream = self.__streams.get(stream_id)
+            if stream is None:
+                dropped_frame = frame
+            else:
+                if len(stream['frames']) >= self.depth:
+                    dropped_frame = stream['frames'].popleft()
+                    stream['frames_dropped'] += 1
+                stream['frames'].append(frame)
+                stream['frames_put'] += 1
+                self.__condition.notify()
+
+        if dropped_frame is not None and self.__drop_callback is not None:
+            self.__drop_callback(stream_id, dropped_frame)
+        return dropped_frame is None
+
+    def get(self, timeout: float = None):
+        """
+        Take the next frame (round-robin over the streams that aren't in process).
+        Blocks until a frame is available, the timeout expires or the queue is closed.
+        Note: Call task_done with the stream id once the frame is processed.
+        :param timeout: Maximum waiting time in seconds (None: wait forever)
+        :return: Tuple (stream_id, frame) or None
+        """
+        with self.__condition:
+            stream_id = None
+            if self.__condition.wait_for(lambda: self.__closed or self.__pick() is not None, timeout):
+                stream_id = self.__pick()
+            if stream_id is None:
+                return None
+
+            stream = self.__streams[stream_id]
+            stream['busy'] = True
+            stream['frames_taken'] += 1
+            self.__next = list(self.__streams).index(stream_id) + 1
+            return stream_id, stream['frames'].popleft()
+
+    def task_done(self, stream_id) -> None:
+        """
+        Mark the frame taken last from a stream as processed, the stream gets scheduled again.
+        :param stream_id: Stream id.
+        :return: None
+        """
+        with self.__condition:
+            stream = self.__streams.get(stream_id)
+            if stream is not None:
+                stream['busy'] = False
+                self.__condition.notify()
+
+    def __pick(self):
+        """
+        Next stream with a pending frame that isn't in process (lock must be held).
+        :return: Stream id or None
+        """
+        stream_ids = list(self.__streams)
+        for i in range(len(stream_ids)):
+            stream_id = stream_ids[(self.__next + i) % len(stream_ids)]
+            stream = self.__streams[stream_id]
+            if stream['frames'] and not stream['busy']:
+                return stream_id
+        return None
+
+    def stats(self) -> dict:
+        """
+        Counters of all streams.
+        :return: Dictionary stream_id -> {'frames_put', 'frames_dropped', 'frames_taken', 'queue_depth'}
+        """
+        with self.__condition:
+            return {stream_id: {'frames_put': stream['frames_put'], 'frames_dropped': stream['frames_dropped'],
+                                'frames_taken': stream['frames_taken'], 'queue_depth': len(stream['frames'])}
+                    for stream_id, stream in self.__streams.items()}
+
+    def close(self):
+        """
+        Wake up all waiting consumers. Frames put afterwards are still queued.
+        :return: None
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+    def open(self):
+        """
+        Reopen a closed queue and drop all pending frames.
+        :return: None
+        """
+        with self.__condition:
+            self.__closed = False
+            pending = []
+            for stream_id, stream in self.__streams.items():
+                pending.append((stream_id, list(stream['frames'])))
+                stream['frames'].clear()
+                stream['busy'] = False
+
+        for stream_id, frames in pending:
+            self.__drop_all(stream_id, frames)
+
+    def __drop_all(self, stream_id, frames):
+        """
+        Hand dropped frames to the drop callback.
+        :param stream_id: Stream id.
+        :param frames: Dropped frames.
+        :return: None
+        """
+        if self.__drop_callback is not None:
+            for frame in frames:
+                self.__drop_callback(stream_id, frame)
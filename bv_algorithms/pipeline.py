@@ -0,0 +1,497 @@
+import os
+import typing
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from .algorithms import GlassDetection, DifferenceImageBuilder, LevelDetector, ChangeDetector, LEVEL_ENGINES
+from .autoscale import AutoscaleImage
+from .timing import StageTimer
+
+# Real height in mm of each glass type (0: small glass | 1: large glass)
+GLASS_HEIGHT_MM = {0: 118.0, 1: 145.0}
+
+
+def fill_level_mm(glass_type: int, glass_height_pixel: int, level_pixel: int) -> float:
+    """
+    Convert a fill level in pixel into the fill level in mm.
+    :param glass_type: 0: Small glass | 1: Large glass | -1: No glass
+    :param glass_height_pixel: Height of the glass BoundingBox in pixel.
+    :param level_pixel: Fill level in pixel (referenced by the glass mask).
+    :return: Fill level in mm (0.0 if no glass or level detected)
+    """
+    if glass_type not in GLASS_HEIGHT_MM or level_pixel <= 0 or glass_height_pixel <= 0:
+        return 0.0
+    return GLASS_HEIGHT_MM[glass_type] / glass_height_pixel * (glass_height_pixel - level_pixel)
+
+
+class LevelResult(typing.NamedTuple):
+    """
+    Result of the level detection pipeline for a single frame.
+    """
+
+    # Index of the frame within the processed stream.
+    frame_index: int
+
+    # Glass BoundingBox (x1, y1, x2, y2) on the original frame, None until the glass is detected.
+    glass_bbox: typing.Optional[typing.Tuple[int, int, int, int]]
+
+    # 0: Small glass | 1: Large glass | -1: No glass
+    glass_type: int
+
+    # Fill level in pixel referenced by the glass mask.
+    level_pixel: int
+
+    # Fill level in mm.
+    level_mm: float
+
+    # True if the level detection ran on this frame (False on static frames skipped by the change detector).
+    level_updated: bool
+
+    # Station (ROI) of a multi-station pipeline the result belongs to.
+    station_id: int = 0
+
+
+class LevelDetectionPipeline(object):
+    """
+    Level detection without GUI: ROI -> glass detection -> difference image -> level detection.
+    Note: Used by the processing thread of level_detection_gui and by level_detection_batch.
+    """
+
+    def __init__(self, roi_p1: tuple = (500, 250), roi_p2: tuple = (1300, 1850), station_id: int = 0):
+        """
+        Constructor.
+        :param roi_p1: Top left corner (x, y) of the ROI.
+        :param roi_p2: Bottom right corner (x, y) of the ROI.
+        :param station_id: Station reported in the results (see MultiStationPipeline).
+        """
+
+        # Station reported in the results.
+        self.station_id: int = station_id
+
+        # Region of interest on the original frame.
+        self.roi_p1: tuple = roi_p1
+        self.roi_p2: tuple = roi_p2
+
+        # Run the level detection on every n-th frame after the glass is detected.
+        self.level_interval: int = 5
+
+        # Timing of the pipeline stages and of the detection steps (disabled by default, see enable_timing).
+        self.timer: StageTimer = StageTimer()
+
+        self.glass_detector = GlassDetection()
+        self.difference_builder = DifferenceImageBuilder()
+        self.level_detector = LevelDetector()
+        self.glass_detector.timer = self.timer
+        self.level_detector.timer = self.timer
+
+        # Gate in front of the difference image and level detection: static glass frames keep the last level.
+        self.change_detector = ChangeDetector()
+
+        # Autoscaling for 16-bit camera frames (created on first use).
+        self.__autoscale: AutoscaleImage = None
+        self.__frame_8bit: np.ndarray = None
+
+        self.__frame_index: int = 0
+        self.__frame_counter: int = 0
+        self.__reference_set: bool = False
+        self.__last_result: LevelResult = None
+
+        # Intermediate images of the last frame for display purposes.
+        self.__preview_images: dict = {}
+
+    def process(self, frame: np.ndarray) -> LevelResult:
+        """
+        Run the pipeline on the next frame of the stream.
+        :param frame: 8-bit grayscale frame or raw 16-bit camera frame.
+        :return: Result for this frame.
+        """
+        t = self.timer.tic()
+        frame = self.to_8bit(frame)
+        t = self.timer.toc('pipeline.to_8bit', t)
+
+        # 1. Glass detection on the ROI
+        # Note: The edge map is only computed (or upscaled in pyramid mode) when a preview is requested.
+        roi = frame[self.roi_p1[1]:self.roi_p2[1], self.roi_p1[0]:self.roi_p2[0]]
+        if not self.glass_detector.state():
+            roi = roi.copy()
+        t = self.timer.toc('pipeline.roi', t)
+        self.glass_detector.detect(roi, compute_edges=False)
+        self.__preview_images = {'frame': frame}
+        t = self.timer.toc('pipeline.glass_detection', t)
+
+        result = LevelResult(self.__frame_index, None, -1, 0, 0.0, False, self.station_id)
+        if self.glass_detector.state():
+
+            # 2. Set reference image first frame after glass detected
+            if not self.__reference_set:
+                self.difference_builder.set_reference_image(self.glass_detector.get_glass_frame())
+                self.level_detector.set_glass_mask(self.glass_detector.get_glass_mask())
+                self.change_detector.set_mask(self.glass_detector.get_glass_mask())
+                self.__reference_set = True
+                self.__preview_images['reference'] = self.glass_detector.get_glass_frame()
+                self.timer.toc('pipeline.reference', t)
+
+            result = self.__detect_level(self.__frame_counter == self.level_interval - 1)
+            if self.__frame_counter == self.level_interval - 1:
+                self.__frame_counter = 0
+            else:
+                self.__frame_counter += 1
+
+        self.__frame_index += 1
+        self.__last_result = result
+        self.timer.frame()
+        return result
+
+    def to_8bit(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Autoscale raw 16-bit camera frames into 8-bit frames. 8-bit frames are returned unchanged.
+        :param frame: Input frame.
+        :return: 8-bit frame.
+        """
+        if frame.dtype != np.uint16:
+            return frame
+
+        if self.__autoscale is None:
+            self.__autoscale = AutoscaleImage()
+        if self.__frame_8bit is None or self.__frame_8bit.shape != frame.shape:
+            self.__frame_8bit = np.empty(shape=frame.shape, dtype='uint8')
+        return self.__autoscale.autoscale_8bit(frame, out=self.__frame_8bit)
+
+    def __detect_level(self, update_level: bool) -> LevelResult:
+        """
+        Difference image and level detection on the detected glass.
+        :param update_level: Run the level detection if the glass frame has changed, otherwise the last level is
+                             reported.
+        :return: Result for the current frame.
+        """
+        self.__preview_images['glass'] = self.glass_detector.get_glass_frame()
+        if update_level:
+            t = self.timer.tic()
+            update_level = self.change_detector.changed(self.glass_detector.get_glass_frame())
+            t = self.timer.toc('pipeline.change_detection', t)
+        if update_level:
+            diff_image = self.difference_builder.build(self.glass_detector.get_glass_frame())
+            self.__preview_images['difference'] = diff_image
+            t = self.timer.toc('pipeline.difference', t)
+            self.__preview_images['level'] = self.level_detector.detect(diff_image.copy())
+            self.timer.toc('pipeline.level', t)
+
+        x1, y1, x2, y2 = self.glass_detector.estimated_glass()
+        glass_bbox = (self.roi_p1[0] + x1, self.roi_p1[1] + y1, self.roi_p1[0] + x2, self.roi_p1[1] + y2)
+        glass_type = self.glass_detector.get_detected_glass_type()
+        level_pixel = self.level_detector.get_current_level()
+
+        return LevelResult(self.__frame_index, glass_bbox, glass_type, level_pixel,
+                           fill_level_mm(glass_type, y2 - y1, level_pixel), update_level, self.station_id)
+
+    def last_result(self) -> LevelResult:
+        """
+        Result of the last processed frame.
+        :return: Last result (None before the first frame)
+        """
+        return self.__last_result
+
+    def preview_images(self, names: tuple = None) -> dict:
+        """
+        Intermediate images of the last processed frame.
+        Note: Keys are only present if the image was created on the last frame:
+        'frame' (8-bit frame), 'edges' (glass detection edge map of the ROI), 'glass' (glass frame),
+        'reference' (new reference image), 'difference' (difference image), 'level' (level detection image).
+        'frame' and 'difference' are overwritten by the next frame, copy them to keep them.
+        'edges' is computed by this call if requested.
+        :param names: Names of the images needed by the caller (None: all), only limits the images computed on demand.
+        :return: Dictionary with the images
+        """
+        if 'edges' not in self.__preview_images and 'frame' in self.__preview_images and \
+                (names is None or 'edges' in names):
+            self.__preview_images['edges'] = self.glass_detector.get_edge_frame()
+        return self.__preview_images
+
+    def enable_timing(self, enabled: bool = True):
+        """
+        Enable or disable the timing of all stages.
+        Note: Statistics are available through timer.stats() and timer.summary().
+        :param enabled: Record timings.
+        :return: None
+        """
+        self.timer.enabled = enabled
+
+    def reset(self):
+        """
+        Reset the pipeline for a new glass.
+        :return: None
+        """
+        pyramid_scale, level_engine = self.glass_detector.pyramid_scale, self.level_detector.engine
+        distance = self.difference_builder.distance
+        self.glass_detector = GlassDetection()
+        self.difference_builder = DifferenceImageBuilder()
+        self.level_detector = LevelDetector()
+        self.glass_detector.pyramid_scale = pyramid_scale
+        self.difference_builder.distance = distance
+        self.level_detector.engine = level_engine
+        self.glass_detector.timer = self.timer
+        self.level_detector.timer = self.timer
+        self.change_detector.set_mask(None)
+        self.__frame_counter = 0
+        self.__reference_set = False
+
+
+class MultiStationPipeline(object):
+    """
+    Level detection of several glasses (stations) seen by one camera: one LevelDetectionPipeline per ROI.
+
+    Each frame is autoscaled once and shared read-only by all stations. The station pipelines run
+    concurrently on a thread pool (OpenCV releases the GIL), so the latency of a frame stays close to the
+    latency of the slowest station instead of growing with the number of stations.
+    """
+
+    def __init__(self, rois: list = (((500, 250), (1300, 1850)),), max_workers: int = None):
+        """
+        Constructor.
+        :param rois: One ROI (p1, p2) per station with top left and bottom right corner (x, y).
+        :param max_workers: Number of pool threads (None: one per station, at most the CPU count)
+        """
+
+        # Number of pool threads (None: one per station, at most the CPU count)
+        self.max_workers: int = max_workers
+
+        # Timing of the whole frame (the stations have their own timers, see enable_timing).
+        self.timer: StageTimer = StageTimer()
+
+        # Level detection pipeline of each station, the index is the station id.
+        self.stations: list = []
+
+        # Configuration applied to all stations (also to stations added later).
+        self.__distance: int = None
+        self.__level_interval: int = None
+        self.__change_detection: dict = {}
+        self.__pyramid_scale: int = None
+        self.__level_engine: str = None
+
+        self.__executor: ThreadPoolExecutor = None
+        self.__executor_workers: int = 0
+
+        # Autoscaling for 16-bit camera frames (created on first use).
+        self.__autoscale: AutoscaleImage = None
+        self.__frame_8bit: np.ndarray = None
+
+        self.__last_results: list = []
+
+        self.set_rois(rois)
+
+    def set_rois(self, rois: list):
+        """
+        Set the ROI of each station. Existing stations with an unchanged ROI keep their detection state, stations
+        with a moved ROI are reset, missing stations are created and surplus stations removed.
+        :param rois: One ROI (p1, p2) per station with top left and bottom right corner (x, y).
+        :return: None
+        """
+        for station_id, (p1, p2) in enumerate(rois):
+            if station_id < len(self.stations):
+                station = self.stations[station_id]
+                if (station.roi_p1, station.roi_p2) != (tuple(p1), tuple(p2)):
+                    # Glass, reference image and masks of the old ROI don't fit the new one
+                    station.roi_p1, station.roi_p2 = tuple(p1), tuple(p2)
+                    station.reset()
+                continue
+
+            station = LevelDetectionPipeline(roi_p1=tuple(p1), roi_p2=tuple(p2), station_id=station_id)
+            station.enable_timing(self.timer.enabled)
+            if self.__distance is not None:
+                station.difference_builder.distance = self.__distance
+            if self.__level_interval is not None:
+                station.level_interval = self.__level_interval
+            for name, value in self.__change_detection.items():
+                setattr(station.change_detector, name, value)
+            if self.__pyramid_scale is not None:
+                station.glass_detector.pyramid_scale = self.__pyramid_scale
+            if self.__level_engine is not None:
+                station.level_detector.engine = self.__level_engine
+            self.stations.append(station)
+        del self.stations[len(rois):]
+
+    def rois(self) -> list:
+        """
+        ROI of each station.
+        :return: List of (p1, p2) with top left and bottom right corner (x, y)
+        """
+        return [(station.roi_p1, station.roi_p2) for station in self.stations]
+
+    def set_distance(self, distance: int):
+        """
+        Change the threshold distance of the difference image of all stations.
+        :param distance: New threshold distance.
+        :return: None
+        """
+        self.__distance = distance
+        for station in self.stations:
+            station.difference_builder.distance = distance
+
+    def set_level_interval(self, level_interval: int):
+        """
+        Run the level detection of all stations on every n-th frame after the glass is detected.
+        :param level_interval: Frame interval of the level detection.
+        :return: None
+        """
+        self.__level_interval = level_interval
+        for station in self.stations:
+            station.level_interval = level_interval
+
+    def set_pyramid_scale(self, pyramid_scale: int):
+        """
+        Downsampling factor of the candidate search of all glass detectors (1: full resolution | 2 | 4).
+        Note: Only changes the detection of glasses not locked yet.
+        :param pyramid_scale: New downsampling factor.
+        :return: None
+        """
+        self.__pyramid_scale = pyramid_scale
+        for station in self.stations:
+            station.glass_detector.pyramid_scale = pyramid_scale
+
+    def set_level_engine(self, engine: str):
+        """
+        Select the level detection engine of all stations.
+        :param engine: 'morphology' | 'projection' (see LEVEL_ENGINES)
+        :return: None
+        """
+        if engine not in LEVEL_ENGINES:
+            raise ValueError(f"Unknown level detection engine: {engine}")
+        self.__level_engine = engine
+        for station in self.stations:
+            station.level_detector.engine = engine
+
+    def set_change_detection(self, enabled: bool = True, threshold: int = None):
+        """
+        Configure the change detector of all stations (static frames skip the level detection).
+        :param enabled: Skip the level detection on static frames.
+        :param threshold: Minimum difference in gray levels of a downsampled pixel to count as changed (None: keep)
+        :return: None
+        """
+        self.__change_detection['enabled'] = enabled
+        if threshold is not None:
+            self.__change_detection['threshold'] = threshold
+        for station in self.stations:
+            for name, value in self.__change_detection.items():
+                setattr(station.change_detector, name, value)
+
+    def change_detection_stats(self) -> list:
+        """
+        Change detector counters of all stations.
+        :return: One (frames checked, frames skipped) per station
+        """
+        return [(station.change_detector.frames_checked, station.change_detector.frames_skipped)
+                for station in self.stations]
+
+    def process(self, frame: np.ndarray) -> list:
+        """
+        Run the pipelines of all stations on the next frame of the stream.
+        :param frame: 8-bit grayscale frame or raw 16-bit camera frame.
+        :return: One LevelResult per station (ordered by station id)
+        """
+        t = self.timer.tic()
+        frame = self.to_8bit(frame)
+        t = self.timer.toc('stations.to_8bit', t)
+
+        # Note: A single station runs on the calling thread, there's nothing to overlap.
+        if len(self.stations) == 1:
+            results = [self.stations[0].process(frame)]
+        else:
+            results = list(self.__get_executor().map(lambda station: station.process(frame), self.stations))
+        self.timer.toc('stations.process', t)
+
+        self.__last_results = results
+        self.timer.frame()
+        return results
+
+    def to_8bit(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Autoscale raw 16-bit camera frames into 8-bit frames. 8-bit frames are returned unchanged.
+        :param frame: Input frame.
+        :return: 8-bit frame.
+        """
+        if frame.dtype != np.uint16:
+            return frame
+
+        if self.__autoscale is None:
+            self.__autoscale = AutoscaleImage()
+        if self.__frame_8bit is None or self.__frame_8bit.shape != frame.shape:
+            self.__frame_8bit = np.empty(shape=frame.shape, dtype='uint8')
+        return self.__autoscale.autoscale_8bit(frame, out=self.__frame_8bit)
+
+    def __get_executor(self) -> ThreadPoolExecutor:
+        """
+        Thread pool sized for the current number of stations.
+        :return: Thread pool
+        """
+        workers = self.max_workers if self.max_workers is not None else min(len(self.stations), os.cpu_count() or 1)
+        workers = max(workers, 1)
+        if self.__executor is None or self.__executor_workers != workers:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=False)
+            self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='station')
+            self.__executor_workers = workers
+        return self.__executor
+
+    def last_results(self) -> list:
+        """
+        Results of the last processed frame.
+        :return: One LevelResult per station (empty before the first frame)
+        """
+        return self.__last_results
+
+    def preview_images(self, station_id: int = 0, names: tuple = None) -> dict:
+        """
+        Intermediate images of the last processed frame of a station (see LevelDetectionPipeline.preview_images).
+        :param station_id: Station id.
+        :param names: Names of the images needed by the caller (None: all)
+        :return: Dictionary with the images
+        """
+        return self.stations[station_id].preview_images(names)
+
+    def enable_timing(self, enabled: bool = True):
+        """
+        Enable or disable the timing of the frame and of all stations.
+        :param enabled: Record timings.
+        :return: None
+        """
+        self.timer.enabled = enabled
+        for station in self.stations:
+            station.enable_timing(enabled)
+
+    def reset_timing(self):
+        """
+        Clear the timing statistics of the frame and of all stations.
+        :return: None
+        """
+        self.timer.reset()
+        for station in self.stations:
+            station.timer.reset()
+
+    def timing_summary(self, station_id: int = 0) -> str:
+        """
+        Text table of the frame timing and of the stage timing of one station (e.g. for a GUI overlay).
+        :param station_id: Station id.
+        :return: Frame statistics followed by the station statistics.
+        """
+        summary = self.timer.summary()
+        if station_id < len(self.stations):
+            summary += f"\n\nStation {station_id}\n" + self.stations[station_id].timer.summary()
+        return summary
+
+    def reset(self, station_id: int = None):
+        """
+        Reset stations for a new glass.
+        :param station_id: Station id (None: all stations)
+        :return: None
+        """
+        for station in self.stations if station_id is None else [self.stations[station_id]]:
+            station.reset()
+
+    def close(self):
+        """
+        Stop the thread pool.
+        :return: None
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
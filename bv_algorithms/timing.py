@@ -0,0 +1,106 @@
+import collections
+import time
+import numpy as np
+
+
+class StageTimer(object):
+    """
+    Rolling per-stage timing statistics.
+
+    Stages are timed with a monotonic nanosecond clock:
+
+        t = timer.tic()
+        ...                         # stage
+        t = timer.toc('stage', t)   # record and restart for the next stage
+
+    Note: A disabled timer skips the clock, tic/toc only check a flag. Recording is thread-safe for one
+    writer per stage (deque append), stats can be read from any thread.
+    """
+
+    def __init__(self, enabled: bool = False, window: int = 120):
+        """
+        Constructor.
+        :param enabled: Record timings.
+        :param window: Number of samples per stage kept for the statistics.
+        """
+        # Record timings.
+        self.enabled: bool = enabled
+
+        self.__window: int = window
+        self.__samples: dict = {}
+        self.__frames = collections.deque(maxlen=window)
+
+    def tic(self) -> int:
+        """
+        Start time of a stage.
+        :return: Clock value in ns (0 if disabled)
+        """
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def toc(self, stage: str, start: int) -> int:
+        """
+        Record the duration of a stage.
+        :param stage: Stage name.
+        :param start: Value returned by tic (or the last toc).
+        :return: Current clock value as start of the next stage (0 if disabled)
+        """
+        if not self.enabled or start == 0:
+            return 0
+        now = time.perf_counter_ns()
+        samples = self.__samples.get(stage)
+        if samples is None:
+            samples = self.__samples.setdefault(stage, collections.deque(maxlen=self.__window))
+        samples.append(now - start)
+        return now
+
+    def frame(self) -> None:
+        """
+        Mark the end of a frame (used for the frame rate).
+        :return: None
+        """
+        if self.enabled:
+            self.__frames.append(time.perf_counter_ns())
+
+    def frame_rate(self) -> float:
+        """
+        Frame rate over the rolling window.
+        :return: Frames per second (0.0 if unknown)
+        """
+        frames = list(self.__frames)
+        if len(frames) < 2 or frames[-1] == frames[0]:
+            return 0.0
+        return (len(frames) - 1) * 1e9 / (frames[-1] - frames[0])
+
+    def stats(self) -> dict:
+        """
+        Statistics of all stages over the rolling window.
+        :return: Dictionary stage -> {'p50_ms', 'p95_ms', 'max_ms', 'count'}
+        """
+        result = {}
+        for stage, samples in list(self.__samples.items()):
+            values = np.array(samples, dtype=np.float64) / 1e6
+            if len(values) == 0:
+                continue
+            p50, p95 = np.percentile(values, (50, 95))
+            result[stage] = {'p50_ms': float(p50), 'p95_ms': float(p95), 'max_ms': float(values.max()),
+                             'count': len(values)}
+        return result
+
+    def summary(self) -> str:
+        """
+        Text table of the statistics (e.g. for a GUI overlay).
+        :return: One line per stage and the frame rate.
+        """
+        lines = [f"{'stage':28s} {'p50':>7s} {'p95':>7s} {'max':>7s}"]
+        for stage, stats in sorted(self.stats().items()):
+            lines.append(f"{stage:28s} {stats['p50_ms']:7.2f} {stats['p95_ms']:7.2f} {stats['max_ms']:7.2f}")
+        lines.append(f"{self.frame_rate():.1f} frames/s")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """
+        Clear all samples.
+        :return: None
+        """
+        self.__samples = {}
+        self.__frames.clear()
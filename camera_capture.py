@@ -5,8 +5,10 @@ from PySide6.QtCore import Slot
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QTabWidget, QMessageBox, QHBoxLayout)
 from pco_capture import QtVideoCapture
 from qt_widgets import ImageWidget, HistogramWidget, CameraControlsWidget, VideoControlsWidget
-from bv_algorithms import AutoscaleImage
+from bv_algorithms import AutoscaleImage, DifferenceImageBuilder
 from cv_videoplayer import VideoPlayer
+from qt_processing import HistogramThread
+from raw_recording import RawRecordingWriter, RAW_EXTENSION
 
 
 class MainWindow(QMainWindow):
@@ -16,18 +18,31 @@ class MainWindow(QMainWindow):
 
         self.__mode = "VIDEO"   # 'CAMERA' | 'VIDEO'
         self.__record_video = False
-        self.__video = None
+        self.__video = None     # cv2.VideoWriter (8-bit) | RawRecordingWriter (raw 16-bit)
 
         self.__autosale = AutoscaleImage()
         self.__autosale.create_lookup_table(t_min=1000, t_max=20000)
 
+        # Reused 8-bit output buffer for camera frames.
+        self.__image_8bit = np.zeros(shape=(2048, 2048), dtype='uint8')
+
         self.__reference_image = np.zeros(shape=(2048, 2048), dtype='uint8')
         self.__difference_image = self.__reference_image.copy()
 
+        # Difference image with pixel distance > 80 against the reference image.
+        self.__difference_builder = DifferenceImageBuilder()
+        self.__difference_builder.distance = 81
+        self.__difference_builder.set_reference_image(self.__reference_image)
+
         self.__capture = QtVideoCapture()
         self.__capture.finished.connect(self.stop_capture_clicked_event)
         self.__capture.update_frame.connect(self.update_image)
 
+        # Histograms are computed from pixel samples on a worker thread.
+        self.__histogram_thread = HistogramThread(sample_budget=65536, sample_mode='strided', smoothing=0.8)
+        self.__histogram_thread.histogram_ready.connect(self.show_histograms)
+        self.__histogram_thread.start()
+
         self.__video_player = VideoPlayer()
         self.__video_player.finished.connect(self.stop_video_clicked_event)
         self.__video_player.update_frame.connect(self.update_image)
@@ -169,15 +184,23 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def start_video_capture_clicked_event(self):
+        # Paths ending with .raw record the raw 16-bit camera frames, anything else an 8-bit X264 video.
+        video_path = self.video_controls.getVideoPath()
+        if video_path.lower().endswith(RAW_EXTENSION):
+            self.__video = RawRecordingWriter(video_path, (2048, 2048), dtype='uint16')
+        else:
+            self.__video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'X264'), 20, (2048, 2048))
         self.__record_video = True
-        self.__video = cv2.VideoWriter(self.video_controls.getVideoPath(), cv2.VideoWriter_fourcc(*'X264'), 20, (2048, 2048))
         self.video_controls.disable_capture_button()
         self.start_capture_clicked_event()
 
     @Slot()
     def stop_video_capture_clicked_event(self):
         self.__record_video = False
-        self.__video.release()
+        if isinstance(self.__video, RawRecordingWriter):
+            self.__video.close()
+        else:
+            self.__video.release()
         self.video_controls.enable_capture_button()
         self.stop_capture_clicked_event()
 
@@ -226,28 +249,43 @@ class MainWindow(QMainWindow):
 
     def update_original_16bit_images(self, image: np.ndarray, scaled_image: np.ndarray):
         self.live_image.update_image(image)
-        self.live_image.update_image(scaled_image)
+        self.live_image_scaled.update_image(scaled_image)
 
     def update_original_8bit_image(self, image8bit: np.ndarray):
         self.corrected_image.update_image(image8bit)
 
     def update_histograms_16bit(self, image16bit: np.ndarray, scaled16bit: np.ndarray):
-        if self.__hist_update_counter == 20:
-            self.histogram_widget.update_histogram(name="Original Image", image=image16bit)
-            self.histogram_widget.update_histogram(name="Autoscaled Image", image=scaled16bit)
-        else:
-            self.__hist_update_counter += 1
+        self.__histogram_thread.submit('16bit', {"Original Image": image16bit, "Autoscaled Image": scaled16bit})
 
     def update_histograms_8bit(self, image8bit: np.ndarray):
-        if self.__hist_update_counter == 20:
-            self.histogram_corrected_widget.update_histogram(name="Original Image", image=image8bit)
-        else:
-            self.__hist_update_counter += 1
+        self.__histogram_thread.submit('8bit', {"Original Image": image8bit})
+
+    @Slot(object)
+    def show_histograms(self, histograms: tuple):
+        """
+        Show the histograms finished by the histogram thread.
+        :param histograms: Tuple (key, {name: (x-values, histogram, cumulative histogram, number of pixel values)})
+        :return: None
+        """
+        key, results = histograms
+        widget = self.histogram_widget if key == '16bit' else self.histogram_corrected_widget
+        for name, (x, hist, cum_hist, value_range) in results.items():
+            widget.show_histogram(name, x, hist, cum_hist, value_range)
+
+    def closeEvent(self, event):
+        """
+        Stop the histogram thread before the window closes.
+        :param event: Qt close event
+        :return: None
+        """
+        self.__histogram_thread.stop()
+        self.__histogram_thread.wait()
+        super().closeEvent(event)
 
     def update_difference_image(self, image8bit: np.ndarray):
         if self.__frame_counter == 2:
-            difference_image = np.where(abs(image8bit.astype('float64') - self.__reference_image) > 80, 255, 0)
-            gray_y = cv2.Sobel(difference_image.astype('uint8'),
+            difference_image = self.__difference_builder.build(image8bit)
+            gray_y = cv2.Sobel(difference_image,
                                cv2.CV_8U, 0, 1, ksize=3, scale=1, delta=0, borderType=cv2.BORDER_DEFAULT)
             contours, hierarchy = cv2.findContours(gray_y, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             contours_image = np.zeros(shape=(2048, 2048), dtype="uint8")
@@ -260,9 +298,9 @@ class MainWindow(QMainWindow):
 
             cv2.drawContours(contours_image, contours_copy, -1, (255, 255, 255), 4)
             self.__image_counter += 1
-            self.reference_image_widget.update_image(self.__reference_image.astype('uint8'))
+            self.reference_image_widget.update_image(self.__reference_image)
             self.diffimg_contours_widget.update_image(contours_image)
-            self.difference_image_widget.update_image(difference_image.astype('uint8'))
+            self.difference_image_widget.update_image(difference_image)
             self.difference_image_sobel_y_widget.update_image(gray_y)
             self.diffimg_live_widget.update_image(image8bit)
             self.__frame_counter = 0
@@ -270,14 +308,27 @@ class MainWindow(QMainWindow):
             self.__frame_counter += 1
 
     def update_image(self, image: np.ndarray):
+        try:
+            self.__update_image(image)
+        finally:
+            # Give the frame slot back to the capture thread (frames of the video player are ignored).
+            self.__capture.release_frame(image)
+
+    def __update_image(self, image: np.ndarray):
 
         tab_index = self.main_tab.currentIndex()
 
+        scaled_image = None
         if not self.__mode == "VIDEO":
-            scaled_image = self.__autosale.autoscale(image)
-            image_8bit = cv2.normalize(scaled_image, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+            # Autoscale and normalize to 8 bit in a single pass. The 16-bit scaled image is only needed by
+            # the 16-bit tabs.
+            if self.__image_8bit.shape != image.shape:
+                self.__image_8bit = np.empty(shape=image.shape, dtype='uint8')
+            image_8bit = self.__autosale.autoscale_8bit(image, out=self.__image_8bit)
+            if tab_index in (0, 2):
+                scaled_image = self.__autosale.autoscale(image)
             if self.__record_video:
-                self.__video.write(image_8bit)
+                self.__video.write(image if isinstance(self.__video, RawRecordingWriter) else image_8bit)
         else:
             image_8bit = image
 
@@ -285,8 +336,9 @@ class MainWindow(QMainWindow):
             self.histogram_widget.add_histogram(name="Original Image", image=image.copy())
             self.histogram_widget.add_histogram(name="Autoscaled Image", image=image.copy())
             self.histogram_corrected_widget.add_histogram(name="Original Image", image=image_8bit.copy())
-            self.__reference_image = image_8bit.astype('float64')
-            self.reference_image_widget.update_image(image_8bit.copy())
+            self.__reference_image = image_8bit.copy()
+            self.__difference_builder.set_reference_image(self.__reference_image)
+            self.reference_image_widget.update_image(image_8bit.copy(), force=True)
             self.__hist_update_counter += 1
 
         # Update Image 16 Bit
@@ -299,11 +351,11 @@ class MainWindow(QMainWindow):
 
         # Update 16 Bit Histogram
         elif tab_index == 2 and self.__mode == "CAMERA":
-            self.update_histograms_16bit(image.copy(), scaled_image.copy())
+            self.update_histograms_16bit(image, scaled_image)
 
         # Update 8 Bit Histogram
         elif tab_index == 3:
-            self.update_histograms_8bit(image_8bit.copy())
+            self.update_histograms_8bit(image_8bit)
 
         # Update Difference Image
         elif tab_index == 4:
@@ -1 +1,2 @@
 from .videoplayer import VideoPlayer
+from .raw_player import RawVideoPlayer
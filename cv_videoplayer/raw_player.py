@@ -0,0 +1,53 @@
+import time
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from raw_recording import RawRecordingReader
+
+
+class RawVideoPlayer(QThread):
+    """
+    Replay of raw recordings with Qt based QThread usage.
+    Note: Frames are emitted as read-only views into the memory-mapped file, nothing gets decoded or copied.
+    """
+
+    # Callback signal on new frame available
+    update_frame = Signal(np.ndarray)
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+
+        QThread.__init__(self, parent=None)
+        self.play = False
+        self.video_file_path = "capture.raw"
+
+        # Replay speed: 0.0: as fast as possible | 1.0: recorded frame rate
+        self.speed: float = 1.0
+
+        # Number of emitted frames of the last replay.
+        self.frames_emitted: int = 0
+
+    def run(self):
+        """
+        Emit all frames of the recording.
+        :return: None
+        """
+        reader = RawRecordingReader(self.video_file_path)
+        timestamps = reader.timestamps()
+        self.play = True
+        self.frames_emitted = 0
+
+        start_time = time.perf_counter()
+        for frame_index in range(len(reader)):
+            if not self.play:
+                break
+
+            # Keep the recorded timing (recordings without timestamps replay as fast as possible).
+            if self.speed > 0.0 and np.isfinite(timestamps[frame_index]) and np.isfinite(timestamps[0]):
+                delay = (timestamps[frame_index] - timestamps[0]) / self.speed - (time.perf_counter() - start_time)
+                if delay > 0.0:
+                    time.sleep(delay)
+
+            self.update_frame.emit(reader[frame_index])
+            self.frames_emitted += 1
@@ -0,0 +1,300 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from bv_algorithms import MultiStationPipeline, LEVEL_ENGINES
+from raw_recording import RawRecordingReader, RAW_EXTENSION
+
+# Column names of the result table.
+RESULT_COLUMNS = ['video', 'frame', 'station', 'x1', 'y1', 'x2', 'y2', 'glass_type', 'level_pixel', 'level_mm',
+                  'level_updated']
+
+# Default ROI (x1, y1, x2, y2) if no station ROI is given.
+DEFAULT_ROI = (500, 250, 1300, 1850)
+
+# File extensions of recordings found in an input directory.
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', RAW_EXTENSION)
+
+# Pipeline configuration of the current worker process (set by init_worker).
+_worker_config: dict = None
+
+
+def create_pipeline(config: dict) -> MultiStationPipeline:
+    """
+    Create a new level detection pipeline from a configuration.
+    :param config: Dictionary with 'rois' (one (x1, y1, x2, y2) per station), 'distance', 'level_interval',
+                   'station_threads', 'change_detection', 'change_threshold', 'pyramid_scale' and 'level_engine'.
+    :return: Configured pipeline.
+    """
+    pipeline = MultiStationPipeline(rois=[(tuple(roi[0:2]), tuple(roi[2:4])) for roi in config['rois']],
+                                    max_workers=config.get('station_threads'))
+    pipeline.set_distance(config['distance'])
+    pipeline.set_level_interval(config['level_interval'])
+    pipeline.set_change_detection(config.get('change_detection', True), config.get('change_threshold'))
+    pipeline.set_pyramid_scale(config.get('pyramid_scale', 1))
+    pipeline.set_level_engine(config.get('level_engine', 'morphology'))
+    return pipeline
+
+
+def init_worker(config: dict):
+    """
+    Process pool initializer: store the pipeline configuration of this worker process.
+    :param config: Pipeline configuration.
+    :return: None
+    """
+    global _worker_config
+    _worker_config = config
+
+
+def result_row(video: str, result):
+    """
+    Convert a pipeline result into a row of the result table.
+    :param video: Name of the processed video.
+    :param result: LevelResult of a single frame.
+    :return: List with one value per result column.
+    """
+    x1, y1, x2, y2 = result.glass_bbox if result.glass_bbox is not None else ('', '', '', '')
+    return [video, result.frame_index, result.station_id, x1, y1, x2, y2, result.glass_type, result.level_pixel,
+            round(result.level_mm, 2), int(result.level_updated)]
+
+
+def read_frames(video_path: str, first: int):
+    """
+    Iterate over the grayscale frames of a recording.
+    Note: Raw recordings yield the raw (e.g. 16-bit) frames as views into the memory-mapped file.
+    :param video_path: Path to the video file or raw recording.
+    :param first: Index of the first frame.
+    :return: Generator of frames.
+    """
+    if video_path.lower().endswith(RAW_EXTENSION):
+        reader = RawRecordingReader(video_path)
+        for frame_index in range(first, len(reader)):
+            yield reader[frame_index]
+        return
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Unable to open video file: {video_path}")
+    if first > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    finally:
+        cap.release()
+
+
+def frame_count(video_path: str) -> int:
+    """
+    Number of frames of a recording (as reported by the container for video files).
+    :param video_path: Path to the video file or raw recording.
+    :return: Number of frames.
+    """
+    if video_path.lower().endswith(RAW_EXTENSION):
+        return len(RawRecordingReader(video_path))
+
+    cap = cv2.VideoCapture(video_path)
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return n_frames
+
+
+def process_segment(video_path: str, start: int, stop: int, lead_in: int, config: dict):
+    """
+    Run a new pipeline on the frames [start, stop) of a video file.
+    Note: Up to lead_in frames before start are processed first without reporting results, so the
+    glass detection converges before the segment starts. The reference image of the difference image
+    is taken from the first frame after the glass is detected.
+    :param video_path: Path to the video file.
+    :param start: First frame of the segment.
+    :param stop: End of the segment (None: end of video).
+    :param lead_in: Number of frames processed before the segment starts.
+    :param config: Pipeline configuration.
+    :return: Tuple (result rows (one per frame and station), number of processed frames, elapsed time in seconds,
+             (level detections checked, static frames skipped) of all stations)
+    """
+    pipeline = create_pipeline(config)
+    video = os.path.basename(video_path)
+
+    frame_index = max(start - lead_in, 0)
+    rows = []
+    start_time = time.perf_counter()
+    try:
+        for frame in read_frames(video_path, frame_index):
+            if stop is not None and frame_index >= stop:
+                break
+            results = pipeline.process(frame)
+            if frame_index >= start:
+                rows.extend(result_row(video, result._replace(frame_index=frame_index)) for result in results)
+            frame_index += 1
+    finally:
+        pipeline.close()
+    elapsed = time.perf_counter() - start_time
+
+    change_stats = tuple(map(sum, zip((0, 0), *pipeline.change_detection_stats())))
+    return rows, frame_index - max(start - lead_in, 0), elapsed, change_stats
+
+
+def run_segment_task(task: tuple):
+    """
+    Process pool task: process one segment with the configuration of this worker.
+    :param task: Tuple (video_path, start, stop, lead_in)
+    :return: Tuple (result rows, number of processed frames, elapsed time in seconds, change detection counters,
+             worker process id)
+    """
+    return process_segment(*task, config=_worker_config) + (os.getpid(),)
+
+
+def list_videos(path: str):
+    """
+    List all recordings to process.
+    :param path: Video file or directory containing video files.
+    :return: Sorted list of video file paths.
+    """
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def split_segments(video_path: str, segment_length: int, lead_in: int, max_frames: int = None):
+    """
+    Split a video file into independent segments.
+    :param video_path: Path to the video file.
+    :param segment_length: Number of frames per segment (None: one segment for the whole file).
+    :param lead_in: Number of lead-in frames of each segment.
+    :param max_frames: Process only the first frames of the file (None: whole file).
+    :return: List of tasks (video_path, start, stop, lead_in)
+    """
+    if segment_length is None:
+        return [(video_path, 0, max_frames, 0)]
+
+    n_frames = frame_count(video_path)
+    if max_frames is not None:
+        n_frames = min(n_frames, max_frames)
+
+    tasks = []
+    for start in range(0, max(n_frames, 1), segment_length):
+        # The last segment reads until the end, the frame count of a container is not always exact.
+        stop = start + segment_length if start + segment_length < n_frames else max_frames
+        tasks.append((video_path, start, stop, lead_in if start > 0 else 0))
+    return tasks
+
+
+def run(videos: list, output, config: dict, workers: int = 1, segment_length: int = None, lead_in: int = 60,
+        max_frames: int = None):
+    """
+    Run the level detection pipeline on all frames of the given videos as fast as possible.
+    Note: With more than one worker, segments are processed by a process pool. The results are written
+    in video and frame order.
+    :param videos: Video file paths.
+    :param output: Writable text stream for the CSV result table.
+    :param config: Pipeline configuration.
+    :param workers: Number of worker processes.
+    :param segment_length: Split videos into segments of this number of frames (None: no splitting).
+    :param lead_in: Number of lead-in frames of each segment.
+    :param max_frames: Process only the first frames of each video (None: whole video).
+    :return: Tuple (number of reported frames, elapsed time in seconds, {worker id: (frames, busy time)},
+             (level detections checked, static frames skipped))
+    """
+    writer = csv.writer(output)
+    writer.writerow(RESULT_COLUMNS)
+
+    tasks = [task for video in videos for task in split_segments(video, segment_length, lead_in, max_frames)]
+
+    n_frames = 0
+    worker_stats = {}
+    checked, skipped = 0, 0
+    start_time = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config,)) as executor:
+            for rows, n_processed, elapsed, change_stats, worker in executor.map(run_segment_task, tasks):
+                writer.writerows(rows)
+                n_frames += len(rows) // len(config['rois'])
+                frames, busy = worker_stats.get(worker, (0, 0.0))
+                worker_stats[worker] = (frames + n_processed, busy + elapsed)
+                checked, skipped = checked + change_stats[0], skipped + change_stats[1]
+    else:
+        for task in tasks:
+            rows, n_processed, elapsed, change_stats = process_segment(*task, config=config)
+            writer.writerows(rows)
+            n_frames += len(rows) // len(config['rois'])
+            frames, busy = worker_stats.get(os.getpid(), (0, 0.0))
+            worker_stats[os.getpid()] = (frames + n_processed, busy + elapsed)
+            checked, skipped = checked + change_stats[0], skipped + change_stats[1]
+
+    return n_frames, time.perf_counter() - start_time, worker_stats, (checked, skipped)
+
+
+def parse_args(argv=None):
+    """
+    Command line arguments of the batch level detection.
+    :param argv: Argument list (None: sys.argv)
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Run the level detection pipeline on recorded videos without GUI.")
+    parser.add_argument('video', help="Video file or directory of video files to process.")
+    parser.add_argument('-o', '--output', default=None, help="CSV file for the per-frame results (default: stdout).")
+    parser.add_argument('--roi', type=int, nargs=4, metavar=('X1', 'Y1', 'X2', 'Y2'), action='append', default=None,
+                        help=f"Region of interest of a station on the original frame, repeat for several stations "
+                             f"(default: one station {DEFAULT_ROI}).")
+    parser.add_argument('--station-threads', type=int, default=None,
+                        help="Threads processing the stations of a frame (default: one per station, at most the "
+                             "CPU count).")
+    parser.add_argument('--distance', type=int, default=10, help="Threshold distance of the difference image.")
+    parser.add_argument('--level-interval', type=int, default=5,
+                        help="Run the level detection on every n-th frame after the glass is detected.")
+    parser.add_argument('--change-threshold', type=int, default=None,
+                        help="Minimum gray level change (8x downsampled) of the glass frame to run the level detection "
+                             "(default: 8).")
+    parser.add_argument('--no-change-detection', action='store_true',
+                        help="Run the level detection also on static frames.")
+    parser.add_argument('--pyramid-scale', type=int, choices=(1, 2, 4), default=1,
+                        help="Downsampling factor of the glass candidate search (1: full resolution).")
+    parser.add_argument('--level-engine', choices=LEVEL_ENGINES, default='morphology',
+                        help="Level detection engine: 2D morphology or row profile projection.")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="Number of worker processes.")
+    parser.add_argument('--segment-length', type=int, default=None,
+                        help="Split videos into independent segments of this number of frames.")
+    parser.add_argument('--lead-in', type=int, default=60,
+                        help="Frames processed before each segment so the glass detection converges.")
+    parser.add_argument('--max-frames', type=int, default=None, help="Process only the first frames of each video.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {'rois': args.roi if args.roi is not None else [DEFAULT_ROI], 'distance': args.distance,
+              'level_interval': args.level_interval, 'station_threads': args.station_threads,
+              'change_detection': not args.no_change_detection, 'change_threshold': args.change_threshold,
+              'pyramid_scale': args.pyramid_scale, 'level_engine': args.level_engine}
+    videos = list_videos(args.video)
+
+    if args.output is None:
+        n_frames, elapsed, worker_stats, change_stats = run(videos, sys.stdout, config, args.workers,
+                                                            args.segment_length, args.lead_in, args.max_frames)
+    else:
+        with open(args.output, 'w', newline='') as output:
+            n_frames, elapsed, worker_stats, change_stats = run(videos, output, config, args.workers,
+                                                                args.segment_length, args.lead_in, args.max_frames)
+
+    for worker, (frames, busy) in sorted(worker_stats.items()):
+        print(f"Worker {worker}: {frames} frames in {busy:.2f} s ({frames / busy if busy > 0 else 0.0:.1f} frames/s)",
+              file=sys.stderr)
+    checked, skipped = change_stats
+    print(f"Change detection: {skipped} of {checked} level detections skipped on static frames "
+          f"({skipped / checked if checked > 0 else 0.0:.1%})", file=sys.stderr)
+    fps = n_frames / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {n_frames} frames of {len(videos)} videos in {elapsed:.2f} s ({fps:.1f} frames/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
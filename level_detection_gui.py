@@ -1,13 +1,34 @@
+import argparse
+import os
 import sys
-import cv2
-from PySide6.QtCore import Slot
-from PySide6.QtWidgets import (QApplication, QFileDialog, QMainWindow, QWidget, QVBoxLayout, QTabWidget, QHBoxLayout)
+import time
+from PySide6.QtCore import Slot, Qt
+from PySide6.QtGui import QKeySequence, QShortcut
+from PySide6.QtWidgets import (QApplication, QFileDialog, QMainWindow, QWidget, QVBoxLayout, QTabWidget, QHBoxLayout,
+                               QLabel, QComboBox)
 from qt_widgets import (NavigationWidget, RefImageTabWidget, ROITabWidget, LevelDetectionTabWidget,
                         GlassDetectionTabWidget)
-from cv_videoplayer import VideoPlayer
-from pco_capture import QtVideoCapture
-from bv_algorithms import AutoscaleImage
-import numpy as np
+from cv_videoplayer import VideoPlayer, RawVideoPlayer
+from pco_capture import QtVideoCapture, CAMERA_BACKEND_ENV
+from qt_processing import StreamProcessingPool
+from bv_algorithms import MultiStationPipeline
+
+
+# Station ROI (p1, p2) of a new stream.
+DEFAULT_ROI = ((500, 250), (1300, 1850))
+
+# Tab indices of the main tab widget.
+ROI_TAB = 0
+GLASS_DETECTION_TAB = 1
+REFERENCE_IMAGE_TAB = 2
+LEVEL_DETECTION_TAB = 3
+
+# Preview images taken over from the processing thread.
+PREVIEW_IMAGES = ('frame', 'edges', 'stencil', 'reference', 'glass', 'difference', 'level')
+
+# Previews the processing thread copies or computes only for the visible tab (see StreamProcessingPool.set_previews)
+TAB_PREVIEWS = {ROI_TAB: ('frame',), GLASS_DETECTION_TAB: ('edges',), REFERENCE_IMAGE_TAB: ('difference',),
+                LEVEL_DETECTION_TAB: ()}
 
 
 class MainWindow(QMainWindow):
@@ -18,25 +39,41 @@ class MainWindow(QMainWindow):
     :type QMainWindow: Any
     """
 
-    def __init__(self):
+    def __init__(self, n_cameras: int = 1, camera_serials: list = None):
         """
         Default class constructor for MainWindow.
         Initialize all UI widgets.
+        :param n_cameras: Number of cameras opened by "Open PCO Camera Stream" (one stream per camera).
+        :param camera_serials: Serial number of each pco camera (overrides n_cameras), required for several
+                               pco cameras.
         """
         super().__init__()
 
-        self.frame_counter = 0
         self.mode = "VIDEO"  # 'CAMERA' | 'VIDEO'
-        self.orig_image = np.zeros(shape=(2048, 2048), dtype='uint8')
-
-        self.bv_scale = AutoscaleImage()
-        self.bv_scale.create_lookup_table(t_min=1000, t_max=20000)
 
-        self.video_player = VideoPlayer()
-        self.video_player.update_frame.connect(self.update_frame)
-
-        self.pco_stream = QtVideoCapture()
-        self.pco_stream.update_frame.connect(self.update_frame)
+        # Level detection of all frame sources (streams) on a shared pool of processing threads. Frame sources
+        # hand over their frames directly (from the capture threads), the GUI thread only draws the finished
+        # results of the selected stream.
+        # Note: Every station (ROI) of a stream has its own pipeline, the stations of a frame are processed in parallel.
+        self.processing = StreamProcessingPool()
+        self.processing.result_ready.connect(self.show_result)
+
+        # Frame sources of the open streams (the index is the stream id): video players | cameras
+        self.sources: list = []
+
+        # One capture thread per camera.
+        # Note: Without a serial number every pco camera would open the same (default) device.
+        if camera_serials:
+            n_cameras = len(camera_serials)
+        elif n_cameras > 1 and os.environ.get(CAMERA_BACKEND_ENV, 'pco') != 'simulated':
+            raise ValueError("Several pco cameras need a serial number for each camera.")
+        self.cameras = [QtVideoCapture() for _ in range(n_cameras)]
+        for camera, serial in zip(self.cameras, camera_serials or []):
+            camera.camera_options = {'serial': serial}
+
+        # Stream shown in the tabs and the station ROIs of each stream.
+        self.__stream_id: int = 0
+        self.__stream_rois: list = []
 
         self.setWindowTitle("Level Detection with PCO Camera")
         # self.setGeometry(0, 0, 800, 800)
@@ -101,7 +138,7 @@ class MainWindow(QMainWindow):
         self.refimg_tab_page_layout = QHBoxLayout(self.refimg_tab_page)
         self.refimg_tab_page_layout.setObjectName(u"refimg_tab_page_layout")
 
-        self.refimg_tab_widget = RefImageTabWidget()
+        self.refimg_tab_widget = RefImageTabWidget(distance_changed_callback=self.processing.set_distance)
         self.refimg_tab_widget.setObjectName(u"refimg_tab_widget")
         self.refimg_tab_page_layout.addWidget(self.refimg_tab_widget)
 
@@ -113,7 +150,8 @@ class MainWindow(QMainWindow):
         self.filling_tab_page_layout = QVBoxLayout(self.filling_tab_page)
         self.filling_tab_page_layout.setObjectName(u"filling_tab_page_layout")
 
-        self.level_detection_tab_widget = LevelDetectionTabWidget()
+        self.level_detection_tab_widget = LevelDetectionTabWidget(
+            engine_changed_callback=self.processing.set_level_engine)
         self.level_detection_tab_widget.setObjectName(u"level_detection_tab_widget")
         self.filling_tab_page_layout.addWidget(self.level_detection_tab_widget)
 
@@ -122,37 +160,163 @@ class MainWindow(QMainWindow):
         self.main_tab.addTab(self.refimg_tab_page, "3. Apply Reference Image")
         self.main_tab.addTab(self.filling_tab_page, "4. Level Detection")
 
+        # Only the visible tab gets drawn. Latest preview images and the images not drawn since their update.
+        self.__latest_images: dict = {}
+        self.__dirty_images: set = set()
+        self.__detection_state: dict = {'glass_detected': False, 'estimated_glass': (0, 0, 0, 0)}
+        self.processing.set_previews(TAB_PREVIEWS[self.main_tab.currentIndex()])
+        self.main_tab.currentChanged.connect(self.tab_changed)
+
         self.setCentralWidget(self.central_widget)
 
+        # Stream selection (shown in the status bar)
+        self.stream_combobox = QComboBox()
+        self.stream_combobox.setObjectName(u"stream_combobox")
+        self.stream_combobox.currentIndexChanged.connect(self.stream_selected)
+        self.statusBar().addPermanentWidget(self.stream_combobox)
+
+        #
+        # Timing overlay (toggled with F3)
+        # Note: Stage timing is only recorded while the overlay is visible.
+        #
+        self.timing_overlay = QLabel(self.central_widget)
+        self.timing_overlay.setObjectName(u"timing_overlay")
+        self.timing_overlay.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: white; "
+                                          "font-family: monospace; padding: 6px;")
+        self.timing_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.timing_overlay.hide()
+        self.__timing_overlay_updated = 0.0
+        self.timing_shortcut = QShortcut(QKeySequence(Qt.Key_F3), self)
+        self.timing_shortcut.activated.connect(self.toggle_timing_overlay)
+
+    @Slot()
+    def toggle_timing_overlay(self):
+        """
+        Show or hide the timing overlay and enable the stage timing while it is visible.
+        :return: None
+        """
+        visible = not self.timing_overlay.isVisible()
+        self.processing.enable_timing(visible)
+        self.timing_overlay.setVisible(visible)
+        if visible:
+            self.timing_overlay.setText("Waiting for frames...")
+            self.timing_overlay.adjustSize()
+            self.timing_overlay.move(10, 10)
+            self.timing_overlay.raise_()
+
+    def update_timing_overlay(self):
+        """
+        Refresh the timing overlay (at most twice per second).
+        :return: None
+        """
+        now = time.monotonic()
+        if not self.timing_overlay.isVisible() or now - self.__timing_overlay_updated < 0.5:
+            return
+        if self.__stream_id not in self.processing.stream_ids():
+            return
+        self.__timing_overlay_updated = now
+        pipeline = self.processing.pipeline(self.__stream_id)
+        self.timing_overlay.setText(pipeline.timing_summary(self.roi_widget.selected_station()))
+        self.timing_overlay.adjustSize()
+
     @Slot()
     def roi_selected_callback(self) -> None:
         """
-        Callback method for ROI selected from user GUI.
-        Note: This method is currently not needed.
+        Callback method for ROI or station selected from user GUI.
         :return: None
         """
-        pass
+        if self.__stream_id >= len(self.__stream_rois):
+            return
+        self.__stream_rois[self.__stream_id] = self.roi_widget.get_rois()
+        self.processing.set_rois(self.__stream_id, self.__stream_rois[self.__stream_id])
+        self.processing.set_preview_station(self.roi_widget.selected_station())
+
+    @Slot(int)
+    def stream_selected(self, index: int):
+        """
+        Show the results of another stream.
+        :param index: Stream id.
+        :return: None
+        """
+        if index < 0 or index >= len(self.__stream_rois):
+            return
+        self.__stream_id = index
+        self.processing.set_preview_stream(index)
+        self.processing.set_preview_station(0)
+        self.roi_widget.set_rois(self.__stream_rois[index])
+
+        # Images of the previous stream aren't shown anymore
+        self.__latest_images = {}
+        self.__dirty_images = set()
+
+    def set_sources(self, sources: list):
+        """
+        Replace the open streams.
+        :param sources: List of (name, frame source, release frame callback or None), the index is the stream id.
+        :return: None
+        """
+        self.stop_sources()
+        for stream_id in self.processing.stream_ids():
+            self.processing.remove_stream(stream_id)
+
+        self.sources = []
+        self.__stream_rois = []
+        self.stream_combobox.blockSignals(True)
+        self.stream_combobox.clear()
+        for stream_id, (name, source, release_frame_callback) in enumerate(sources):
+            pipeline = MultiStationPipeline(rois=[DEFAULT_ROI])
+            pipeline.set_level_engine(self.level_detection_tab_widget.level_engine())
+            self.processing.add_stream(stream_id, source, pipeline, release_frame_callback)
+            self.sources.append(source)
+            self.__stream_rois.append([DEFAULT_ROI])
+            self.stream_combobox.addItem(f"Stream {stream_id}: {name}")
+        self.stream_combobox.blockSignals(False)
+        self.stream_selected(0)
+
+    def stop_sources(self):
+        """
+        Stop all video players and cameras.
+        :return: None
+        """
+        for source in self.sources:
+            if isinstance(source, QtVideoCapture):
+                source.capture_enabled = False
+            else:
+                source.play = False
+        for source in self.sources:
+            source.wait()
 
     @Slot()
     def open_camera_stream_clicked(self):
+        self.set_sources([(f"Camera {camera_index}", camera, camera.release_frame)
+                          for camera_index, camera in enumerate(self.cameras)])
         self.main_nav_widget.enable_stream_controls()
         self.main_nav_widget.disable_video_controls()
 
     @Slot()
     def open_video_file_clicked(self):
 
-        # Open FileDialog
+        # Open FileDialog (one stream per selected file)
         options = QFileDialog.Options()
         options |= QFileDialog.DontUseNativeDialog
-        file_name, _ = QFileDialog.getOpenFileName(self, "Open Video", filter="Video File (*.mp4)")
-        if file_name:
-            self.video_player.video_file_path = file_name
+        file_names, _ = QFileDialog.getOpenFileNames(self, "Open Videos",
+                                                     filter="Video File (*.mp4);;Raw Recording (*.raw)")
+        if file_names:
+            sources = []
+            for file_name in file_names:
+                # Replay of raw 16-bit recordings (memory-mapped, no decoding).
+                player = RawVideoPlayer() if file_name.lower().endswith('.raw') else VideoPlayer()
+                player.video_file_path = file_name
+                sources.append((os.path.basename(file_name), player, None))
+            self.set_sources(sources)
         self.main_nav_widget.enable_video_controls()
         self.main_nav_widget.disable_stream_controls()
 
     @Slot()
     def play_video_clicked(self):
-        self.video_player.start()
+        self.start_processing()
+        for player in self.sources:
+            player.start()
 
     @Slot()
     def pause_video_clicked(self):
@@ -160,77 +324,144 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def stop_video_clicked(self):
-        self.video_player.play = False
+        for player in self.sources:
+            player.play = False
 
     @Slot()
     def start_stream_clicked(self):
         self.mode = 'CAMERA'
 
-        self.pco_stream.capture_enabled = True
-        self.pco_stream.start()
+        self.start_processing()
+        for camera in self.sources:
+            camera.capture_enabled = True
+            camera.start()
 
     @Slot()
     def stop_stream_clicked(self):
-        self.pco_stream.capture_enabled = False
+        for camera in self.sources:
+            camera.capture_enabled = False
 
     @Slot()
     def save_reference_image_clicked(self):
         pass
 
-    def update_frame(self, frame: np.ndarray):
-
-        # Preprocess image before update on GUI
-        if self.mode == "VIDEO":
-            self.orig_image = frame  # Input image is a 8 bit image
-        else:
-            image = self.bv_scale.autoscale(frame)  # Input image is a 16 bit image
-            self.orig_image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-
-        #
-        # Update widgets with new frame from video file or camera.
-        #
-        self.roi_widget.update_image(self.orig_image)
-        self.glass_detection_tab_widget.update_image(self.roi_widget.roi_image)
-
-        #
-        # Start level detection after glass detection is done
-        #
-        if self.glass_detection_tab_widget.glass_detector.state():
-
-            # 1. Set reference image first frame after glass detected
-            if not self.refimg_tab_widget.ref_image_state():
-
-                # Change top offset for glass mask when small glass is detected
-                f = self.glass_detection_tab_widget.glass_detector.get_glass_frame()
-                self.refimg_tab_widget.update_image(f.copy())
-                self.refimg_tab_widget.set_ref_image()
-
-                # Get glass mask from glass detector widget for level detection
-                glass_mask = self.glass_detection_tab_widget.glass_detector.get_glass_mask()
-                self.level_detection_tab_widget.level_detector.set_glass_mask(glass_mask)
-
-            # 2. Get estimated glass type from glass detector widget
-            self.roi_widget.glass_type = self.glass_detection_tab_widget.glass_detector.get_detected_glass_type()
+    def start_processing(self):
+        """
+        Start the processing threads if they aren't running yet.
+        :return: None
+        """
+        if not self.processing.isRunning():
+            self.processing.start()
 
-            # 3. Draw BoundingBox around estimated glass.
-            x1, y1, x2, y2 = self.glass_detection_tab_widget.glass_detector.estimated_glass()
-            self.roi_widget.update_glass_rect((x1, y1), (x2, y2))
+    def closeEvent(self, event):
+        """
+        Stop the frame sources and the processing threads before the window closes.
+        :param event: Qt close event
+        :return: None
+        """
+        self.stop_sources()
+        self.processing.close()
+        super().closeEvent(event)
 
-            if self.frame_counter == 4:
-                # 4. Apply Difference Image
-                f = self.glass_detection_tab_widget.glass_detector.get_glass_frame()
-                self.refimg_tab_widget.update_image(f.copy())
+    @Slot(int)
+    def tab_changed(self, index: int):
+        """
+        Request the previews of the visible tab and redraw it with the latest images.
+        :param index: Index of the visible tab.
+        :return: None
+        """
+        self.processing.set_previews(TAB_PREVIEWS.get(index, ()))
+        self.__dirty_images.update(self.__latest_images)
+        self.render_tab(index)
 
-                # 5. Fill-level detection
-                self.level_detection_tab_widget.update_image(self.refimg_tab_widget.diff_image)
-                self.roi_widget.fill_level_pixel = self.level_detection_tab_widget.level_detector.get_current_level()
-                self.frame_counter = 0
-            else:
-                self.frame_counter += 1
+    def render_tab(self, index: int):
+        """
+        Draw the images of a tab updated since it was drawn last.
+        Note: Images skipped by the refresh rate limit of the image widgets stay dirty.
+        :param index: Tab index.
+        :return: None
+        """
+        images = self.__latest_images
+        dirty = self.__dirty_images
+
+        if index == ROI_TAB and 'frame' in dirty:
+            if self.roi_widget.update_image(images['frame']):
+                dirty.discard('frame')
+
+        elif index == GLASS_DETECTION_TAB and 'edges' in dirty:
+            if self.glass_detection_tab_widget.show_detection(images['edges'],
+                                                              self.__detection_state['estimated_glass'],
+                                                              self.__detection_state['glass_detected'],
+                                                              images.get('stencil')):
+                dirty.discard('edges')
+
+        elif index == REFERENCE_IMAGE_TAB:
+            if 'reference' in dirty:
+                # Note: The reference image is always drawn (forced).
+                self.refimg_tab_widget.show_reference_image(images['reference'])
+                dirty.discard('reference')
+            if 'glass' in dirty and self.refimg_tab_widget.show_images(
+                    images['glass'], images['difference'] if 'difference' in dirty else None):
+                dirty.difference_update(('glass', 'difference'))
+
+        elif index == LEVEL_DETECTION_TAB and 'level' in dirty:
+            if self.level_detection_tab_widget.show_level_image(images['level']):
+                dirty.discard('level')
+
+    @Slot(object)
+    def show_result(self, output: dict):
+        """
+        Take over a finished result of the processing thread and draw the visible tab.
+        Note: Hidden tabs aren't drawn, they get redrawn with the latest images when they are shown.
+        :param output: Results of all stations and preview images of the preview station.
+        :return: None
+        """
+        if output['stream_id'] != self.__stream_id:
+            self.processing.result_consumed()
+            return
+
+        timer = self.processing.pipeline(output['stream_id']).timer
+        t = timer.tic()
+        try:
+            #
+            # BoundingBox and fill-level of the estimated glass of each station on the original frame.
+            #
+            for result, station in zip(output['results'], output['stations']):
+                if station['glass_detected']:
+                    self.roi_widget.update_station(result.station_id, result.glass_type, station['estimated_glass'],
+                                                   result.level_pixel)
+            self.__detection_state = {'glass_detected': output['glass_detected'],
+                                      'estimated_glass': output['estimated_glass']}
+
+            for name in PREVIEW_IMAGES:
+                if output.get(name) is not None:
+                    self.__latest_images[name] = output[name]
+                    self.__dirty_images.add(name)
+            self.render_tab(self.main_tab.currentIndex())
+
+            self.statusBar().showMessage(" | ".join(
+                f"Stream {stream_id}: {stats['fps']:.1f} fps, queue {stats['queue_depth']}, "
+                f"dropped {stats['frames_dropped']}" for stream_id, stats in output['stream_stats'].items()) +
+                f" | Static frames: {output['stations'][output['station_id']]['change_skip_ratio']:.0%}"
+                f" | Skipped previews: {output['results_skipped']}")
+        finally:
+            self.processing.result_consumed()
+            timer.toc('gui.render', t)
+            self.update_timing_overlay()
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Level detection with PCO cameras.")
+    parser.add_argument('--cameras', type=int, default=1, help="Number of cameras (one stream per camera).")
+    parser.add_argument('--camera-serials', type=int, nargs='+', default=None, metavar='SERIAL',
+                        help="Serial number of each pco camera (one stream per camera), required for several pco "
+                             "cameras.")
+    args, _ = parser.parse_known_args()
+    if args.cameras > 1 and not args.camera_serials and os.environ.get(CAMERA_BACKEND_ENV, 'pco') != 'simulated':
+        parser.error(f"--cameras {args.cameras} needs --camera-serials for the pco cameras "
+                     f"(or {CAMERA_BACKEND_ENV}=simulated).")
+
     app = QApplication()
-    main_window = MainWindow()
+    main_window = MainWindow(n_cameras=args.cameras, camera_serials=args.camera_serials)
     main_window.showFullScreen()
     sys.exit(app.exec())
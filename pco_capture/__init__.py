@@ -1 +1,14 @@
-from .video_capture import VideoCapture, QtVideoCapture
+from .frame_pool import FramePool
+from .image_writer import ImageWriter
+from .simulated_camera import SimulatedCamera
+from .camera import create_camera, CAMERA_BACKEND_ENV
+
+# Names of the capture module, imported on first use so the camera backends and the writer work without Qt.
+_VIDEO_CAPTURE_NAMES = ('VideoCapture', 'QtVideoCapture')
+
+
+def __getattr__(name: str):
+    if name in _VIDEO_CAPTURE_NAMES:
+        from . import video_capture
+        return getattr(video_capture, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
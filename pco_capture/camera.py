@@ -0,0 +1,65 @@
+import os
+import threading
+from .simulated_camera import SimulatedCamera
+
+# The pco package is only needed for the real camera.
+try:
+    import pco
+except ImportError:
+    pco = None
+
+# Environment variable selecting the default camera backend: 'pco' | 'simulated'
+CAMERA_BACKEND_ENV = 'PCO_CAMERA'
+
+# Serializes opening pco cameras, every pco.Camera opens the next camera not in use yet.
+_pco_open_lock = threading.Lock()
+
+
+def create_camera(backend: str = None, serial: int = None, **options):
+    """
+    Open the camera of the given backend.
+    :param backend: 'pco' | 'simulated' | None (environment variable PCO_CAMERA, default 'pco')
+    :param serial: Serial number of the pco camera to open (None: first free camera), ignored by the simulated camera.
+    :param options: Keyword arguments of SimulatedCamera or pco.Camera (e.g. interface)
+    :return: pco.Camera or SimulatedCamera
+    """
+    if backend is None:
+        backend = os.environ.get(CAMERA_BACKEND_ENV, 'pco')
+
+    if backend == 'simulated':
+        return SimulatedCamera(**options)
+    if backend != 'pco':
+        raise ValueError(f"Unknown camera backend: {backend}")
+    if pco is None:
+        raise Exception(f"The pco package is not installed, set {CAMERA_BACKEND_ENV}=simulated to use the "
+                        f"simulated camera.")
+    if serial is None:
+        return pco.Camera(**options)
+    return _open_pco_camera(serial, options)
+
+
+def _open_pco_camera(serial: int, options: dict):
+    """
+    Open the pco camera with the given serial number.
+    Note: pco.Camera has no serial number parameter, it opens the next free camera. Cameras are opened one after
+    another until the serial number reported by the SDK matches, the other cameras are closed again.
+    :param serial: Serial number of the camera.
+    :param options: Keyword arguments of pco.Camera.
+    :return: pco.Camera
+    """
+    others = []
+    with _pco_open_lock:
+        try:
+            while True:
+                try:
+                    camera = pco.Camera(**options)
+                except ValueError:
+                    # No further free camera
+                    raise ValueError(f"No free pco camera with serial number {serial} found "
+                                     f"({len(others)} other cameras checked).") from None
+                if int(camera.sdk.get_camera_type()['serial number']) == int(serial):
+                    return camera
+                others.append(camera)
+        finally:
+            for camera in others:
+                camera.close()
@@ -0,0 +1,89 @@
+import threading
+import numpy as np
+
+
+class FramePool(object):
+    """
+    Fixed pool of preallocated frame slots.
+
+    The capture thread acquires a free slot for every kept frame and writes the frame into it. Consumers release
+    the slot when they are done with the frame. If no slot is free, the frame is dropped and counted as overrun,
+    so memory use stays constant however long the capture runs.
+    """
+
+    def __init__(self, n_slots: int = 8):
+        """
+        Constructor
+        :param n_slots: Number of preallocated frame slots.
+        """
+        self.n_slots: int = n_slots
+
+        self.__lock = threading.Lock()
+        self.__slots: list = []
+        self.__free: list = []
+        self.__in_use: set = set()
+
+        # Data address of each slot -> slot index (used to release frames)
+        self.__slot_index: dict = {}
+
+        # Number of frames written into a slot.
+        self.frames_acquired: int = 0
+
+        # Number of frames dropped because all slots were in use.
+        self.overruns: int = 0
+
+    def acquire(self, shape: tuple, dtype) -> np.ndarray:
+        """
+        Get a free frame slot.
+        Note: The slots are (re)allocated on the first call and whenever the frame format changes.
+        :param shape: Frame shape.
+        :param dtype: Frame data type.
+        :return: Free frame slot or None if all slots are in use (overrun)
+        """
+        with self.__lock:
+            if len(self.__slots) == 0 or self.__slots[0].shape != tuple(shape) or self.__slots[0].dtype != dtype:
+                self.__allocate(shape, dtype)
+
+            if len(self.__free) == 0:
+                self.overruns += 1
+                return None
+
+            index = self.__free.pop()
+            self.__in_use.add(index)
+            self.frames_acquired += 1
+            return self.__slots[index]
+
+    def release(self, frame: np.ndarray) -> None:
+        """
+        Give a frame slot back to the pool. Frames not owned by the pool are ignored.
+        :param frame: Frame returned by acquire.
+        :return: None
+        """
+        if not isinstance(frame, np.ndarray):
+            return
+
+        with self.__lock:
+            index = self.__slot_index.get(frame.ctypes.data)
+            if index is not None and index in self.__in_use:
+                self.__in_use.remove(index)
+                self.__free.append(index)
+
+    def occupancy(self) -> int:
+        """
+        Number of frame slots currently in use.
+        :return: Slots in use
+        """
+        with self.__lock:
+            return len(self.__in_use)
+
+    def __allocate(self, shape: tuple, dtype) -> None:
+        """
+        Allocate all frame slots. Slots of the previous format still in use are no longer tracked.
+        :param shape: Frame shape.
+        :param dtype: Frame data type.
+        :return: None
+        """
+        self.__slots = [np.empty(shape=shape, dtype=dtype) for _ in range(self.n_slots)]
+        self.__free = list(range(self.n_slots))
+        self.__in_use = set()
+        self.__slot_index = {slot.ctypes.data: index for index, slot in enumerate(self.__slots)}
@@ -0,0 +1,125 @@
+import os
+import queue
+import threading
+import cv2
+import numpy as np
+
+# cv2.imwrite parameter of the compression level for each file format.
+COMPRESSION_PARAMS = {
+    'png': cv2.IMWRITE_PNG_COMPRESSION,     # 0 (fast, large) .. 9 (slow, small)
+    'jpg': cv2.IMWRITE_JPEG_QUALITY,        # 0 .. 100 (quality, lossy and 8-bit only)
+    'tiff': cv2.IMWRITE_TIFF_COMPRESSION,   # 1: none | 5: LZW | 8: Deflate
+}
+
+
+class ImageWriter(object):
+    """
+    Streaming image writer for captured frames.
+
+    Frames are written to disk during the capture by a small pool of writer threads. Pending frames are kept
+    in a bounded queue, so memory stays constant however long the capture runs. If the disk can't keep up,
+    the capture either waits for a free queue entry (block=True) or the frame is dropped and counted.
+    """
+
+    def __init__(self, folder: str, file_format: str = 'png', compression: int = 1, max_pending: int = 16,
+                 n_workers: int = 2, block: bool = False):
+        """
+        Constructor, starts the writer threads.
+        :param folder: Output folder (created if it doesn't exist).
+        :param file_format: 'png' | 'tiff' | 'jpg'
+        :param compression: Compression level of the file format (None: OpenCV default), see COMPRESSION_PARAMS.
+        :param max_pending: Maximum number of frames waiting to be written.
+        :param n_workers: Number of writer threads.
+        :param block: True: write waits for a free queue entry | False: drop the frame if the queue is full
+        """
+        if file_format not in COMPRESSION_PARAMS:
+            raise ValueError(f"Unknown image format: {file_format}")
+
+        self.folder: str = folder
+        self.file_format: str = file_format
+        self.block: bool = block
+
+        self.__params = [] if compression is None else [COMPRESSION_PARAMS[file_format], int(compression)]
+        self.__queue = queue.Queue(maxsize=max_pending)
+        self.__lock = threading.Lock()
+        self.__frame_index: int = 0
+
+        # Number of frames written to disk.
+        self.frames_written: int = 0
+
+        # Number of frames dropped because the queue was full.
+        self.frames_dropped: int = 0
+
+        # Number of frames cv2.imwrite failed to write.
+        self.write_errors: int = 0
+
+        os.makedirs(folder, exist_ok=True)
+        self.__workers = [threading.Thread(target=self.__run, name=f"ImageWriter-{i}", daemon=True)
+                          for i in range(max(n_workers, 1))]
+        for worker in self.__workers:
+            worker.start()
+
+    def write(self, image: np.ndarray) -> bool:
+        """
+        Queue a frame for writing. The frame is copied, the caller can reuse its buffer right away.
+        Note: Files are numbered in the order of the write calls.
+        :param image: Frame to save.
+        :return: True: frame queued | False: frame dropped
+        """
+        with self.__lock:
+            frame_index = self.__frame_index
+            self.__frame_index += 1
+
+        # Only accepted frames get copied.
+        if not self.block and self.__queue.full():
+            return self.__drop()
+        try:
+            self.__queue.put((frame_index, image.copy()), block=self.block)
+        except queue.Full:
+            return self.__drop()
+        return True
+
+    def pending(self) -> int:
+        """
+        Number of frames waiting to be written.
+        :return: Queue size
+        """
+        return self.__queue.qsize()
+
+    def close(self) -> None:
+        """
+        Write all pending frames and stop the writer threads.
+        :return: None
+        """
+        for _ in self.__workers:
+            self.__queue.put(None)
+        for worker in self.__workers:
+            worker.join()
+
+    def __drop(self) -> bool:
+        """
+        Count a dropped frame.
+        :return: False
+        """
+        with self.__lock:
+            self.frames_dropped += 1
+        return False
+
+    def __run(self) -> None:
+        """
+        Writer thread: save queued frames until close is called.
+        :return: None
+        """
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                return
+
+            frame_index, image = item
+            written = cv2.imwrite(os.path.join(self.folder, f"capture_{frame_index}.{self.file_format}"), image,
+                                  self.__params)
+            with self.__lock:
+                if written:
+                    self.frames_written += 1
+                else:
+                    self.write_errors += 1
@@ -0,0 +1,174 @@
+import time
+import cv2
+import numpy as np
+
+
+class SimulatedCamera(object):
+    """
+    Hardware-free stand-in for pco.Camera.
+
+    Generates raw 16-bit frames of a glass that fills up over time. The frames have the camera orientation,
+    i.e. the glass stands upright after the 90° clockwise rotation of the capture classes.
+    Supports the part of the pco.Camera interface used by the capture classes:
+    set_exposure_time, record, wait_for_first_image, image, close and the context manager.
+    """
+
+    # Glass size (width, height) in pixel on the rotated frame (see GlassDetection.small/large_glass_size)
+    GLASS_SIZES = {0: (480, 1040), 1: (480, 1280)}
+
+    def __init__(self, frame_rate: float = 30.0, glass_type: int = 1, noise: float = 100.0, jitter: int = 2,
+                 fill_time: float = 10.0, frame_size: int = 2048, glass_center: tuple = (900, 1050), seed: int = None):
+        """
+        Constructor.
+        :param frame_rate: Frames per second (0: as fast as possible)
+        :param glass_type: 0: Small glass | 1: Large glass | -1: No glass
+        :param noise: Standard deviation of the pixel noise.
+        :param jitter: Maximum random offset in pixel of the glass position per frame.
+        :param fill_time: Seconds from the empty to the full glass, afterwards the filling starts over.
+        :param frame_size: Width and height of the square frames.
+        :param glass_center: Glass center (x, y) on the rotated frame.
+        :param seed: Seed of the random generator (None: random)
+        """
+        self.frame_rate: float = frame_rate
+        self.glass_type: int = glass_type
+        self.noise: float = noise
+        self.jitter: int = jitter
+        self.fill_time: float = fill_time
+        self.frame_size: int = frame_size
+        self.glass_center: tuple = glass_center
+
+        # Pixel values of background, glass wall and liquid.
+        self.background_value: int = 3000
+        self.glass_value: int = 20000
+        self.liquid_value: int = 9000
+
+        # Number of frames generated.
+        self.frames_generated: int = 0
+
+        # Number of frames the caller missed because it took the frames too slowly (overload).
+        self.frames_missed: int = 0
+
+        self.__random = np.random.default_rng(seed)
+        self.__exposure_time: float = 0.01
+        self.__recording: bool = False
+        self.__start_time: float = 0.0
+        self.__last_frame_number: int = -1
+
+        # Noise is taken from a small bank of precomputed frames (offset by 4 sigma, subtracted after adding).
+        self.__noise_offset: int = int(4 * noise)
+        self.__noise_bank: list = []
+
+        # Reused buffers for the rotated scene and the camera frame.
+        self.__scene = np.empty(shape=(frame_size, frame_size), dtype=np.uint16)
+        self.__frame = np.empty(shape=(frame_size, frame_size), dtype=np.uint16)
+
+    def set_exposure_time(self, exposure_time: float):
+        """
+        Set the exposure time (only stored, has no effect on the frames).
+        :param exposure_time: Exposure time in seconds.
+        :return: None
+        """
+        self.__exposure_time = exposure_time
+
+    def record(self, number_of_images: int = 1, mode: str = 'sequence'):
+        """
+        Start the recording.
+        :param number_of_images: Ignored, frames are generated on demand.
+        :param mode: Ignored, image always returns the latest frame (like 'fifo' with a consumer that keeps up).
+        :return: None
+        """
+        if self.noise > 0 and len(self.__noise_bank) == 0:
+            for _ in range(4):
+                noise = self.__random.normal(self.__noise_offset, self.noise, size=(self.frame_size, self.frame_size))
+                self.__noise_bank.append(np.clip(noise, 0, 65535).astype(np.uint16))
+
+        self.__recording = True
+        self.__start_time = time.perf_counter()
+        self.__last_frame_number = -1
+
+    def wait_for_first_image(self):
+        """
+        Return as soon as the recording is running.
+        :return: None
+        """
+        if not self.__recording:
+            raise RuntimeError("Recording not started.")
+
+    def image(self):
+        """
+        Wait for the next frame and return it.
+        Note: The returned frame is overwritten by the next call.
+        :return: Tuple (16-bit frame, meta data dictionary with 'frame_number' and 'timestamp')
+        """
+        if not self.__recording:
+            raise RuntimeError("Recording not started.")
+
+        # 1. Wait for the next frame period. A caller that is too late gets the latest frame.
+        if self.frame_rate > 0:
+            elapsed = time.perf_counter() - self.__start_time
+            frame_number = max(int(elapsed * self.frame_rate), self.__last_frame_number + 1)
+            delay = frame_number / self.frame_rate - elapsed
+            if delay > 0:
+                time.sleep(delay)
+            self.frames_missed += frame_number - self.__last_frame_number - 1
+        else:
+            frame_number = self.__last_frame_number + 1
+        self.__last_frame_number = frame_number
+        timestamp = frame_number / self.frame_rate if self.frame_rate > 0 else time.perf_counter() - self.__start_time
+
+        # 2. Render the scene upright and rotate it into the camera orientation.
+        self.__render(timestamp)
+        cv2.rotate(self.__scene, cv2.ROTATE_90_COUNTERCLOCKWISE, dst=self.__frame)
+
+        # 3. Add pixel noise
+        if self.noise > 0:
+            cv2.add(self.__frame, self.__noise_bank[frame_number % len(self.__noise_bank)], dst=self.__frame)
+            cv2.subtract(self.__frame, self.__noise_offset, dst=self.__frame)
+
+        self.frames_generated += 1
+        return self.__frame, {'frame_number': frame_number, 'timestamp': timestamp}
+
+    def fill_fraction(self, timestamp: float) -> float:
+        """
+        Fill level of the glass at a time of the recording.
+        :param timestamp: Seconds since the start of the recording.
+        :return: 0.0 (empty) .. 1.0 (full)
+        """
+        if self.fill_time <= 0:
+            return 0.0
+        return (timestamp % self.fill_time) / self.fill_time
+
+    def close(self):
+        """
+        Stop the recording.
+        :return: None
+        """
+        self.__recording = False
+
+    def __render(self, timestamp: float):
+        """
+        Draw background, glass and liquid of the upright scene.
+        :param timestamp: Seconds since the start of the recording.
+        :return: None
+        """
+        self.__scene.fill(self.background_value)
+        if self.glass_type not in self.GLASS_SIZES:
+            return
+
+        width, height = self.GLASS_SIZES[self.glass_type]
+        dx, dy = self.__random.integers(-self.jitter, self.jitter + 1, size=2) if self.jitter > 0 else (0, 0)
+        x1 = int(self.glass_center[0] - width // 2 + dx)
+        y1 = int(self.glass_center[1] - height // 2 + dy)
+        x2, y2 = x1 + width - 1, y1 + height - 1
+
+        # Liquid from the bottom up to the current level, then the glass walls on top.
+        wall = 8
+        level = int(y2 - wall - (height - 2 * wall) * self.fill_fraction(timestamp))
+        self.__scene[max(level, y1 + wall):y2 - wall + 1, x1 + wall:x2 - wall + 1] = self.liquid_value
+        cv2.rectangle(self.__scene, (x1, y1), (x2, y2), self.glass_value, wall)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
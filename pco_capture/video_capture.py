@@ -1,9 +1,10 @@
-import pco
-import os
 import cv2
 from datetime import datetime
 from PySide6.QtCore import QThread, Signal
 import numpy as np
+from .frame_pool import FramePool
+from .image_writer import ImageWriter
+from .camera import create_camera
 
 
 class VideoCapture(object):
@@ -11,13 +12,14 @@ class VideoCapture(object):
     Video capture class from PCO camera.
     """
 
-    def __init__(self, frame_available_callback):
+    def __init__(self, frame_available_callback, camera_backend: str = None):
         """
         Constructor
         :param frame_available_callback: callback event for new frame from camera available.
+        :param camera_backend: 'pco' | 'simulated' | None (see create_camera)
         """
         self.__frame_available_callback = frame_available_callback
-        self.cam = pco.Camera()
+        self.cam = create_camera(camera_backend)
         self.__frame_counter = 0
 
     def run(self):
@@ -37,11 +39,11 @@ class VideoCapture(object):
         while True:
             self.cam.wait_for_first_image()
             image, _ = self.cam.image()
-            image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
 
+            # Discarded frames skip the rotation.
             if self.__frame_counter == 2:
                 self.__frame_counter = 0
-                self.__frame_available_callback(image)
+                self.__frame_available_callback(cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE))
             else:
                 self.__frame_counter += 1
 
@@ -54,23 +56,52 @@ class QtVideoCapture(QThread):
     # Callback signal when new frame available from camera.
     update_frame = Signal(np.ndarray)
 
-    def __init__(self):
+    def __init__(self, n_frame_slots: int = 8):
         """
         Constructor
+        :param n_frame_slots: Number of preallocated frame slots.
         """
         QThread.__init__(self, parent=None)
         self.capture_enabled = False
         self.save_image = False
-        self.__captured_images = []
         self.__counter = 0
 
+        # Settings of the image writer used when save_image is set.
+        self.image_format: str = 'png'
+        self.image_compression: int = 1
+        self.max_pending_images: int = 16
+        self.block_on_full_queue: bool = False
+
+        # Image writer of the current capture (None if images aren't saved).
+        self.image_writer: ImageWriter = None
+
+        # Emitted frames are written into preallocated slots. Consumers give them back with release_frame.
+        self.frame_pool = FramePool(n_frame_slots)
+
+        # Rotated frame for the image writer while all frame slots are in use (recording doesn't depend on
+        # the consumers).
+        self.__record_buffer: np.ndarray = None
+
+        # Camera backend and camera options, e.g. the serial number of a pco camera (see create_camera).
+        self.camera_backend: str = None
+        self.camera_options: dict = {}
+
+    def release_frame(self, frame: np.ndarray):
+        """
+        Give an emitted frame back to the frame pool. Frames from other sources are ignored.
+        Note: Can be called from any thread.
+        :param frame: Frame emitted by update_frame.
+        :return: None
+        """
+        self.frame_pool.release(frame)
+
     def run(self):
         """
         Start capture process from camera.
         :return: None
         """
 
-        with pco.Camera() as cam:
+        with create_camera(self.camera_backend, **self.camera_options) as cam:
 
             # --------------------------------------------- #
             # Setup Camera Parameters                       #
@@ -78,12 +109,14 @@ class QtVideoCapture(QThread):
             cam.set_exposure_time(0.01)  # 0.014997
 
             # --------------------------------------------- #
-            # Create folder on local system to save all     #
-            # captured images from camera.                  #
+            # Create folder on local system and start the   #
+            # writer threads to save all captured images.   #
             # --------------------------------------------- #
+            self.image_writer = None
             if self.save_image:
-                folder_name = datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
-                os.mkdir(folder_name)
+                self.image_writer = ImageWriter(datetime.now().strftime('%Y-%m-%d-%H-%M-%S'),
+                                                file_format=self.image_format, compression=self.image_compression,
+                                                max_pending=self.max_pending_images, block=self.block_on_full_queue)
 
             # --------------------------------------------- #
             # Start recording
@@ -94,27 +127,38 @@ class QtVideoCapture(QThread):
 
                 cam.wait_for_first_image()
                 image, _ = cam.image()
-                image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
-
-                if self.__counter == 2:
-                    if self.save_image:
-                        self.__captured_images.append(image)
-                    self.update_frame.emit(image)
-                    self.__counter = 0
-                else:
+
+                # Discarded frames skip the rotation.
+                if self.__counter != 2:
                     self.__counter += 1
+                    continue
+                self.__counter = 0
+
+                # Rotate into a free frame slot, drop the frame if all slots are in use (overrun).
+                # Note: On an overrun the frame is still recorded, rotated into the buffer of the capture.
+                shape = (image.shape[1], image.shape[0])
+                frame = self.frame_pool.acquire(shape, image.dtype)
+                if frame is None:
+                    if self.image_writer is not None:
+                        if self.__record_buffer is None or self.__record_buffer.shape != shape or \
+                                self.__record_buffer.dtype != image.dtype:
+                            self.__record_buffer = np.empty(shape=shape, dtype=image.dtype)
+                        cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE, dst=self.__record_buffer)
+                        self.image_writer.write(self.__record_buffer)
+                    continue
+                cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE, dst=frame)
+
+                if self.image_writer is not None:
+                    self.image_writer.write(frame)
+                self.update_frame.emit(frame)
 
             # END OF CAPTURE PROCESS
-            if self.save_image:
-                print("Save images on filesystem...")
-                n = len(self.__captured_images)
-                counter = 0
-                while len(self.__captured_images) > 0:
-                    image = self.__captured_images.pop()
-                    cv2.imwrite(f"{folder_name}/capture_{counter}.png", image)
-                    counter += 1
-                    print(f"({counter+1}/{n})")
-                print("all images saved.")
+            if self.image_writer is not None:
+                print(f"Save {self.image_writer.pending()} pending images on filesystem...")
+                self.image_writer.close()
+                print(f"{self.image_writer.frames_written} images saved, {self.image_writer.frames_dropped} dropped, "
+                      f"{self.image_writer.write_errors} failed, {self.frame_pool.overruns} not displayed "
+                      f"(frame slot overrun).")
 
             cam.close()
 
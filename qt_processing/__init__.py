@@ -0,0 +1,2 @@
+from .histogram_thread import HistogramThread
+from .stream_pool import StreamProcessingPool
@@ -0,0 +1,85 @@
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from bv_algorithms import LatestFrameMailbox, RunningHistogram, histogram_bins, sample_pixels
+
+
+class HistogramThread(QThread):
+    """
+    Histogram computation on a dedicated Qt thread.
+
+    The GUI thread only takes a small pixel sample of each image (submit), the worker computes the
+    (smoothed) histograms and publishes the finished arrays. Samples not processed yet are replaced by
+    newer ones, so a slow chart never blocks the capture.
+    """
+
+    # Callback signal when histograms are ready:
+    # Tuple (key, {name: (x-values, histogram, cumulative histogram, number of pixel values)})
+    histogram_ready = Signal(object)
+
+    def __init__(self, sample_budget: int = 65536, sample_mode: str = 'strided', smoothing: float = 0.8):
+        """
+        Constructor
+        :param sample_budget: Maximum number of pixels sampled per image (None: all pixels)
+        :param sample_mode: 'strided' | 'random' (see sample_pixels)
+        :param smoothing: Weight of the previous histogram (0.0: no smoothing)
+        """
+        QThread.__init__(self, parent=None)
+        self.sample_budget: int = sample_budget
+        self.sample_mode: str = sample_mode
+        self.smoothing: float = smoothing
+
+        self.mailbox = LatestFrameMailbox()
+        self.running = False
+
+        # Running histogram of each (key, name)
+        self.__histograms: dict = {}
+        self.__rng = np.random.default_rng()
+
+    def submit(self, key: str, images: dict):
+        """
+        Sample the images and hand them over to the worker.
+        Note: Only the sample gets copied, the images can be reused right away.
+        :param key: Receiver of the histograms (e.g. the histogram widget).
+        :param images: Dictionary name -> grayscale image
+        :return: None
+        """
+        samples = {}
+        for name, image in images.items():
+            samples[name] = (sample_pixels(image, self.sample_budget, self.sample_mode, self.__rng),
+                             image.shape[0] * image.shape[1], image.dtype)
+        self.mailbox.put((key, samples))
+
+    def stop(self):
+        """
+        Stop the histogram thread.
+        :return: None
+        """
+        self.running = False
+        self.mailbox.close()
+
+    def run(self):
+        """
+        Compute histograms until stop is called.
+        :return: None
+        """
+        self.running = True
+        self.mailbox.open()
+
+        while self.running:
+            item = self.mailbox.get(timeout=0.1)
+            if item is None:
+                continue
+
+            key, samples = item
+            results = {}
+            for name, (pixels, n_pixel, dtype) in samples.items():
+                n_bins, bin_width = histogram_bins(dtype)
+                histogram = self.__histograms.get((key, name))
+                if histogram is None or histogram.n_bins != n_bins:
+                    histogram = RunningHistogram(n_bins, bin_width)
+                    self.__histograms[(key, name)] = histogram
+                histogram.smoothing = self.smoothing
+                histogram.update(pixels, n_pixel)
+                results[name] = (histogram.bin_values(), histogram.histogram(), histogram.cumulative(),
+                                 n_bins * bin_width)
+            self.histogram_ready.emit((key, results))
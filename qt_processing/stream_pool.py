@@ -0,0 +1,369 @@
+import collections
+import os
+import threading
+import time
+import numpy as np
+from PySide6.QtCore import QObject, Qt, Signal
+from bv_algorithms import MultiStationPipeline, FairFrameQueue
+
+
+# Preview images that are copied or computed for the GUI, only sent if requested (see set_previews)
+ON_DEMAND_PREVIEWS = ('frame', 'edges', 'difference')
+
+
+def build_output(pipeline: MultiStationPipeline, results: list, station_id: int, previews: tuple = None) -> dict:
+    """
+    Collect the results of all stations and the preview images of one station for the GUI.
+    Note: Images reused by the pipeline get copied, ON_DEMAND_PREVIEWS only if requested.
+    :param pipeline: Pipeline that processed the frame.
+    :param results: Results of the frame (one per station).
+    :param station_id: Station whose preview images are collected.
+    :param previews: Requested ON_DEMAND_PREVIEWS (None: all)
+    :return: Dictionary with results, detector states and preview images
+    """
+    station_id = min(station_id, len(results) - 1)
+    output = dict(pipeline.preview_images(station_id, previews))
+    for name in ON_DEMAND_PREVIEWS:
+        if name not in output:
+            continue
+        if previews is not None and name not in previews:
+            del output[name]
+        elif name != 'edges':
+            output[name] = output[name].copy()
+
+    output['results'] = results
+    output['stations'] = [{'glass_detected': station.glass_detector.state(),
+                           'estimated_glass': station.glass_detector.estimated_glass(),
+                           'change_skip_ratio': station.change_detector.skip_ratio()}
+                          for station in pipeline.stations]
+
+    # Preview station
+    glass_detector = pipeline.stations[station_id].glass_detector
+    output['station_id'] = station_id
+    output['result'] = results[station_id]
+    output['glass_detected'] = glass_detector.state()
+    output['estimated_glass'] = glass_detector.estimated_glass()
+    output['stencil'] = glass_detector.get_glass_stencil()
+    return output
+
+
+class StreamProcessingPool(QObject):
+    """
+    Level detection of several frame sources (streams) on a shared pool of processing threads.
+
+    Every stream (camera, video or simulated camera) has its own pipeline and a bounded frame queue. The
+    worker threads take the frames round-robin over the streams (see FairFrameQueue), so a fast stream can't
+    starve the others and memory stays bounded when processing falls behind. The GUI receives the results
+    and preview images of one stream (preview stream), all streams are processed.
+    """
+
+    # Callback signal when a frame of the preview stream is processed. Dictionary with the results and preview images.
+    result_ready = Signal(object)
+
+    def __init__(self, n_workers: int = None, queue_depth: int = 1):
+        """
+        Constructor
+        :param n_workers: Number of processing threads (None: one per CPU, at most 4)
+        :param queue_depth: Maximum number of pending frames per stream.
+        """
+        QObject.__init__(self, parent=None)
+
+        # Number of processing threads.
+        self.n_workers: int = n_workers if n_workers is not None else max(1, min(4, os.cpu_count() or 1))
+
+        self.queue = FairFrameQueue(depth=queue_depth, drop_callback=self.__release_frame)
+        self.running = False
+
+        # Number of results not sent to the GUI because it was still busy with the previous one.
+        self.results_skipped: int = 0
+
+        # Pipeline, source and counters of each stream.
+        self.__streams: dict = {}
+        self.__lock = threading.Lock()
+        self.__workers: list = []
+
+        # Set while the GUI hasn't finished drawing the last result.
+        self.__result_pending = threading.Event()
+
+        # Names of the requested ON_DEMAND_PREVIEWS (None: all), stream and station of the preview images.
+        self.__previews: tuple = None
+        self.__preview_stream = None
+        self.__preview_station: int = 0
+
+    def add_stream(self, stream_id, source=None, pipeline: MultiStationPipeline = None,
+                   release_frame_callback=None) -> MultiStationPipeline:
+        """
+        Attach a new frame source.
+        :param stream_id: Stream id (any hashable, e.g. camera index)
+        :param source: Frame source with an update_frame signal (QtVideoCapture, VideoPlayer, RawVideoPlayer),
+                       None: frames are handed over with submit_frame.
+        :param pipeline: Pipeline of the stream (default: single station with default ROI)
+        :param release_frame_callback: Called with every frame of the stream that is no longer needed
+                                       (e.g. QtVideoCapture.release_frame)
+        :return: Pipeline of the stream
+        """
+        stream = {'pipeline': pipeline if pipeline is not None else MultiStationPipeline(), 'source': source,
+                  'slot': None, 'release_frame_callback': release_frame_callback, 'config': {},
+                  'frames_processed': 0, 'processed_times': collections.deque(maxlen=60)}
+        with self.__lock:
+            self.__streams[stream_id] = stream
+            if self.__preview_stream is None:
+                self.__preview_stream = stream_id
+        self.queue.add_stream(stream_id)
+
+        if source is not None:
+            stream['slot'] = lambda frame: self.queue.put(stream_id, frame)
+            source.update_frame.connect(stream['slot'], Qt.DirectConnection)
+        return stream['pipeline']
+
+    def remove_stream(self, stream_id) -> None:
+        """
+        Detach a frame source, pending frames are dropped.
+        Note: The pipeline of the stream is closed, stop the source first.
+        :param stream_id: Stream id.
+        :return: None
+        """
+        stream = self.__streams.get(stream_id)
+        if stream is None:
+            return
+        if stream['slot'] is not None:
+            stream['source'].update_frame.disconnect(stream['slot'])
+        self.queue.remove_stream(stream_id)
+        with self.__lock:
+            del self.__streams[stream_id]
+            if self.__preview_stream == stream_id:
+                self.__preview_stream = next(iter(self.__streams), None)
+        stream['pipeline'].close()
+
+    def stream_ids(self) -> list:
+        """
+        Ids of all attached streams.
+        :return: List of stream ids (in attach order)
+        """
+        return list(self.__streams)
+
+    def pipeline(self, stream_id) -> MultiStationPipeline:
+        """
+        Pipeline of a stream.
+        Note: Change the configuration with set_rois, set_distance and set_level_engine while the pool is running.
+        :param stream_id: Stream id.
+        :return: Pipeline
+        """
+        return self.__streams[stream_id]['pipeline']
+
+    def submit_frame(self, stream_id, frame: np.ndarray):
+        """
+        Hand over a new frame of a stream.
+        Note: Never blocks, the oldest pending frame of the stream gets dropped if its queue is full.
+        :param stream_id: Stream id.
+        :param frame: New frame.
+        :return: None
+        """
+        self.queue.put(stream_id, frame)
+
+    def result_consumed(self):
+        """
+        Notify the pool that the GUI has drawn the last result.
+        :return: None
+        """
+        self.__result_pending.clear()
+
+    def set_rois(self, stream_id, rois: list):
+        """
+        Change the station ROIs of a stream before its next frame.
+        :param stream_id: Stream id.
+        :param rois: One ROI (p1, p2) per station with top left and bottom right corner (x, y).
+        :return: None
+        """
+        with self.__lock:
+            self.__streams[stream_id]['config']['rois'] = list(rois)
+
+    def set_distance(self, distance: int):
+        """
+        Change the threshold distance of the difference image of all streams before their next frame.
+        :param distance: New threshold distance.
+        :return: None
+        """
+        with self.__lock:
+            for stream in self.__streams.values():
+                stream['config']['distance'] = distance
+
+    def set_level_engine(self, engine: str):
+        """
+        Select the level detection engine of all streams before their next frame.
+        :param engine: 'morphology' | 'projection' (see LEVEL_ENGINES)
+        :return: None
+        """
+        with self.__lock:
+            for stream in self.__streams.values():
+                stream['config']['level_engine'] = engine
+
+    def set_previews(self, names: tuple):
+        """
+        Select the preview images that are copied or computed for the GUI (e.g. for the visible tab).
+        Note: Images of ON_DEMAND_PREVIEWS not in names are left out of the results.
+        :param names: Requested preview image names (None: all)
+        :return: None
+        """
+        self.__previews = tuple(names) if names is not None else None
+
+    def set_preview_stream(self, stream_id):
+        """
+        Select the stream whose results and preview images are sent to the GUI.
+        :param stream_id: Stream id.
+        :return: None
+        """
+        self.__preview_stream = stream_id
+
+    def set_preview_station(self, station_id: int):
+        """
+        Select the station of the preview stream whose preview images are sent to the GUI.
+        :param station_id: Station id.
+        :return: None
+        """
+        self.__preview_station = station_id
+
+    def enable_timing(self, enabled: bool = True):
+        """
+        Enable or disable the stage timing of all streams and clear the statistics.
+        :param enabled: Record timings.
+        :return: None
+        """
+        for stream in list(self.__streams.values()):
+            stream['pipeline'].reset_timing()
+            stream['pipeline'].enable_timing(enabled)
+
+    def stream_stats(self) -> dict:
+        """
+        Throughput and queue counters of all streams.
+        :return: Dictionary stream_id -> {'frames_put', 'frames_dropped', 'frames_taken', 'queue_depth',
+                 'frames_processed', 'fps'}
+        """
+        queue_stats = self.queue.stats()
+        stats = {}
+        for stream_id, stream in list(self.__streams.items()):
+            times = list(stream['processed_times'])
+            fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) >= 2 and times[-1] > times[0] else 0.0
+            stats[stream_id] = dict(queue_stats.get(stream_id, {}), frames_processed=stream['frames_processed'],
+                                    fps=fps)
+        return stats
+
+    def start(self):
+        """
+        Start the processing threads.
+        :return: None
+        """
+        if self.isRunning():
+            return
+        self.running = True
+        self.queue.open()
+        self.__workers = [threading.Thread(target=self.__run, name=f"StreamProcessing-{i}", daemon=True)
+                          for i in range(self.n_workers)]
+        for worker in self.__workers:
+            worker.start()
+
+    def isRunning(self) -> bool:
+        """
+        Check if processing threads are running.
+        :return: True if at least one processing thread is running
+        """
+        return any(worker.is_alive() for worker in self.__workers)
+
+    def stop(self):
+        """
+        Stop the processing threads after their current frame.
+        :return: None
+        """
+        self.running = False
+        self.queue.close()
+
+    def wait(self):
+        """
+        Wait until all processing threads are stopped.
+        :return: None
+        """
+        for worker in self.__workers:
+            worker.join()
+
+    def close(self):
+        """
+        Stop the processing threads and close the pipelines of all streams.
+        :return: None
+        """
+        self.stop()
+        self.wait()
+        for stream in list(self.__streams.values()):
+            stream['pipeline'].close()
+
+    def __run(self):
+        """
+        Processing thread: process frames of all streams until stop is called.
+        :return: None
+        """
+        while self.running:
+            item = self.queue.get(timeout=0.1)
+            if item is None:
+                continue
+
+            stream_id, frame = item
+            stream = self.__streams.get(stream_id)
+            try:
+                if stream is not None:
+                    self.__process(stream_id, stream, frame)
+            finally:
+                self.__release_frame(stream_id, frame, stream)
+                self.queue.task_done(stream_id)
+
+    def __process(self, stream_id, stream: dict, frame: np.ndarray):
+        """
+        Process a frame of a stream and send the result of the preview stream to the GUI.
+        Note: Frames of one stream are never processed concurrently (see FairFrameQueue).
+        :param stream_id: Stream id.
+        :param stream: Stream of the frame.
+        :param frame: Frame to process.
+        :return: None
+        """
+        pipeline = stream['pipeline']
+        with self.__lock:
+            config = stream['config']
+            stream['config'] = {}
+        if 'rois' in config:
+            pipeline.set_rois(config['rois'])
+        if 'distance' in config:
+            pipeline.set_distance(config['distance'])
+        if 'level_engine' in config:
+            pipeline.set_level_engine(config['level_engine'])
+
+        results = pipeline.process(frame)
+        stream['frames_processed'] += 1
+        stream['processed_times'].append(time.monotonic())
+
+        if stream_id != self.__preview_stream:
+            return
+
+        # Skip the preview if the GUI is still busy with the last one
+        if self.__result_pending.is_set():
+            self.results_skipped += 1
+            return
+
+        t = pipeline.timer.tic()
+        output = build_output(pipeline, results, self.__preview_station, self.__previews)
+        pipeline.timer.toc('processing.previews', t)
+        output['stream_id'] = stream_id
+        output['stream_stats'] = self.stream_stats()
+        output['frames_dropped'] = output['stream_stats'][stream_id]['frames_dropped']
+        output['results_skipped'] = self.results_skipped
+        self.__result_pending.set()
+        self.result_ready.emit(output)
+
+    def __release_frame(self, stream_id, frame: np.ndarray, stream: dict = None):
+        """
+        Hand a frame that is no longer needed back to its source.
+        :param stream_id: Stream id.
+        :param frame: Processed or dropped frame.
+        :param stream: Stream of the frame (None: look up by id)
+        :return: None
+        """
+        stream = stream if stream is not None else self.__streams.get(stream_id)
+        if stream is not None and stream['release_frame_callback'] is not None:
+            stream['release_frame_callback'](frame)
@@ -43,13 +43,25 @@ class GlassDetectionTabWidget(QWidget):
         """
 
         frame = self.glass_detector.detect(frame)
-        frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+        self.show_detection(frame, self.glass_detector.estimated_glass(), self.glass_detector.state(),
+                            self.glass_detector.get_glass_stencil())
 
-        x, y, x2, y2 = self.glass_detector.estimated_glass()
-        if self.glass_detector.state():
-            self.glass_stencil_widget.update_image(self.glass_detector.get_glass_stencil())
+    def show_detection(self, edge_frame: np.ndarray, estimated_glass: tuple, detected: bool, stencil: np.ndarray):
+        """
+        Display a glass detection result without running the detection.
+        :param edge_frame: Binarized edge frame returned by the glass detection.
+        :param estimated_glass: Estimated glass BoundingBox (x1, y1, x2, y2)
+        :param detected: Glass detection state.
+        :param stencil: Glass stencil (only displayed if the glass is detected)
+        :return: True if the detection image was drawn (see ImageWidget.update_image)
+        """
+        frame = cv2.cvtColor(edge_frame, cv2.COLOR_GRAY2RGB)
+
+        x, y, x2, y2 = estimated_glass
+        if detected:
+            self.glass_stencil_widget.update_image(stencil)
             cv2.rectangle(frame, (x, y), (x2, y2), (0, 255, 0), 3)
         elif x is not None:
             cv2.rectangle(frame, (x, y), (x2, y2), (255, 255, 0), 3)
 
-        self.glass_extraction_image_widget.update_image(frame)
+        return self.glass_extraction_image_widget.update_image(frame)
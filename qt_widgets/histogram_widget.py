@@ -4,6 +4,7 @@ from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
 from PySide6.QtWidgets import QWidget, QVBoxLayout
 import numpy as np
 import cv2
+import bv_algorithms as bv
 
 
 class HistogramWidget(QWidget):
@@ -60,49 +61,101 @@ class HistogramWidget(QWidget):
         self.cum_histogram.setRenderHint(QPainter.Antialiasing)
         self.central_layout.addWidget(self.cum_histogram)
 
-    def add_histogram(self, name: str, image: np.ndarray):
+        # Persistent series per name: (histogram series, cumulative histogram series)
+        self.__series: dict = {}
 
-        series = QLineSeries()
-        series.setName(name)
+        # Maximum histogram value of each series.
+        self.__y_max: dict = {}
 
-        cum_series = QLineSeries()
-        cum_series.setName(name)
+    def add_histogram(self, name: str, image: np.ndarray):
+        """
+        Show the histogram of an image. An existing histogram with the same name gets updated.
+        :param name: Series name.
+        :param image: Grayscale 8 or 16-bit image.
+        :return: None
+        """
+        self.update_histogram(name, image)
 
+    def update_histogram(self, name: str, image: np.ndarray):
+        """
+        Update the histogram series of an image in place (created on first use).
+        :param name: Series name.
+        :param image: Grayscale 8 or 16-bit image.
+        :return: None
+        """
         n_pixel = (image.shape[0] * image.shape[1])
-        m = 64 if str(image.dtype) == "uint16" else 1
-        bins = 65536 if str(image.dtype) == "uint16" else 256
-
-        self.hist_x_axis.setMax(bins - 1)
-        self.cum_hist_x_axis.setMax(bins - 1)
-
-        hist = cv2.calcHist([image], [0], None, [bins // m], [0, bins])
-        cum_hist = hist / n_pixel
-        cum_hist = cum_hist.cumsum()
-
-        for p, n in enumerate(hist):
-            series.append(QPointF(p*m, n))
-
-        for p, n in enumerate(cum_hist):
-            cum_series.append(QPointF(p*m, n))
-
+        n_bins, m = bv.histogram_bins(image.dtype)
+
+        hist = cv2.calcHist([image], [0], None, [n_bins], [0, n_bins * m]).ravel()
+        cum_hist = hist.cumsum() / n_pixel
+        self.show_histogram(name, np.arange(n_bins, dtype=np.float64) * m, hist, cum_hist, n_bins * m)
+
+    def show_histogram(self, name: str, x: np.ndarray, hist: np.ndarray, cum_hist: np.ndarray, value_range: int):
+        """
+        Show a histogram computed elsewhere (e.g. by the HistogramThread).
+        :param name: Series name.
+        :param x: Lowest pixel value of each bin.
+        :param hist: Pixel count of each bin.
+        :param cum_hist: Cumulative distribution (0.0 .. 1.0) of each bin.
+        :param value_range: Number of pixel values (256 or 65536)
+        :return: None
+        """
+        if self.hist_x_axis.max() != value_range - 1:
+            self.hist_x_axis.setMax(value_range - 1)
+            self.cum_hist_x_axis.setMax(value_range - 1)
+
+        # Render at most one point per pixel of the plot area.
+        # Note: The histogram keeps the maximum of merged bins (peaks stay visible), the cumulative
+        # histogram the value at the end of the merged bins.
+        width = int(self.hist_chart.plotArea().width())
+        step = -(-len(hist) // width) if 0 < width < len(hist) else 1
+        if step > 1:
+            starts = np.arange(0, len(hist), step)
+            hist = np.maximum.reduceat(hist, starts)
+            cum_hist = cum_hist[np.minimum(starts + step - 1, len(cum_hist) - 1)]
+            x = x[starts]
+
+        series, cum_series = self.__series.get(name) or self.__create_series(name)
+        self.__replace_points(series, x, hist)
+        self.__replace_points(cum_series, x, cum_hist)
+
+        # Y-axis range from the maximum of each series (no rescan of the chart)
+        self.__y_max[name] = float(hist.max()) if len(hist) > 0 else 0.0
+        y_max = max(self.__y_max.values())
+        if y_max != self.hist_y_axis.max():
+            self.hist_y_axis.setMax(y_max)
+
+    def __create_series(self, name: str):
+        """
+        Create and attach the histogram and cumulative histogram series of a name.
+        :param name: Series name.
+        :return: Tuple (histogram series, cumulative histogram series)
+        """
+        series = QLineSeries()
+        series.setName(name)
         self.hist_chart.addSeries(series)
         series.attachAxis(self.hist_x_axis)
         series.attachAxis(self.hist_y_axis)
 
+        cum_series = QLineSeries()
+        cum_series.setName(name)
         self.cum_hist_chart.addSeries(cum_series)
         cum_series.attachAxis(self.cum_hist_x_axis)
         cum_series.attachAxis(self.cum_hist_y_axis)
 
-        y_max = self.hist_y_axis.max() if self.hist_y_axis.max() > hist.max() else hist.max()
-        self.hist_y_axis.setMax(y_max)
-
-    def update_histogram(self, name: str, image: np.ndarray):
-        for series in self.hist_chart.series():
-            if series.name() == name:
-                self.hist_chart.removeSeries(series)
-                break
-        for series in self.cum_hist_chart.series():
-            if series.name() == name:
-                self.cum_hist_chart.removeSeries(series)
-                break
-        self.add_histogram(name, image)
+        self.__series[name] = (series, cum_series)
+        return series, cum_series
+
+    @staticmethod
+    def __replace_points(series: QLineSeries, x: np.ndarray, y: np.ndarray):
+        """
+        Replace all points of a series in one call.
+        :param series: Line series.
+        :param x: X-values.
+        :param y: Y-values.
+        :return: None
+        """
+        if hasattr(series, 'replaceNp'):
+            series.replaceNp(np.ascontiguousarray(x, dtype=np.float64), np.ascontiguousarray(y, dtype=np.float64))
+        else:
+            series.replace([QPointF(xi, yi) for xi, yi in zip(x.tolist(), y.tolist())])
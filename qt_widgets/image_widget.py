@@ -1,4 +1,6 @@
-from PySide6.QtCore import QSize, Qt
+import time
+import cv2
+from PySide6.QtCore import QSize, Qt, QTimer
 from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
 import numpy as np
@@ -6,9 +8,31 @@ import numpy as np
 
 class ImageWidget(QWidget):
 
-    def __init__(self):
+    def __init__(self, max_fps: float = 25.0):
+        """
+        Constructor.
+        :param max_fps: Maximum display refresh rate (0: unlimited)
+        """
         super().__init__()
 
+        # Maximum display refresh rate (0: unlimited).
+        # Note: Images passed to update_image within the refresh interval are skipped.
+        self.max_fps: float = max_fps
+
+        self.__last_update: float = 0.0
+
+        # Last image within the refresh interval is already scaled into the display buffer and drawn when the
+        # interval is over (single shot timer).
+        # Note: So the last image of a burst (e.g. the final frame of a video) isn't lost.
+        self.__image_pending: bool = False
+        self.__redraw_timer = QTimer(self)
+        self.__redraw_timer.setSingleShot(True)
+        self.__redraw_timer.timeout.connect(self.__draw_pending_image)
+
+        # Display buffer with the label size and the QImage wrapping it (reused between updates).
+        self.__buffer: np.ndarray = None
+        self.__q_image: QImage = None
+
         self.central_layout = QVBoxLayout(self)
         self.central_layout.setObjectName(u"central_layout")
 
@@ -29,20 +53,72 @@ class ImageWidget(QWidget):
         else:
             raise Exception("Invalid frame input.\n")
 
-        if str(image.dtype) == "uint16":
-            q_image = QImage(image.data, w, h, w * 2, QImage.Format_Grayscale16)
-        else:
-            if c is None:
-                q_image = QImage(image.data, w, h, w, QImage.Format_Grayscale8)
+        # Scale to the label size (keep aspect ratio) before any Qt conversion.
+        # Note: Downscaling uses an area filter, upscaling the nearest pixel like QImage.scaled.
+        scale = min(self.__image.width() / w, self.__image.height() / h)
+        size = (max(int(w * scale), 1), max(int(h * scale), 1))
+        shape = (size[1], size[0]) if c is None else (size[1], size[0], c)
+        if self.__buffer is None or self.__buffer.shape != shape or self.__buffer.dtype != image.dtype:
+            self.__buffer = np.empty(shape=shape, dtype=image.dtype)
+            self.__q_image = None
+        cv2.resize(image, size, dst=self.__buffer, interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_NEAREST)
+
+        if self.__q_image is None:
+            if str(image.dtype) == "uint16":
+                image_format = QImage.Format_Grayscale16
+            elif c is None:
+                image_format = QImage.Format_Grayscale8
             else:
-                q_image = QImage(image.data, w, h, w * 3, QImage.Format_RGB888)
+                image_format = QImage.Format_RGB888
+            self.__q_image = QImage(self.__buffer.data, size[0], size[1], self.__buffer.strides[0], image_format)
 
-        return q_image.scaled(self.__image.width(), self.__image.height(), Qt.KeepAspectRatio)
+        return self.__q_image
 
-    def update_image(self, image: np.ndarray):
+    def update_image(self, image: np.ndarray, force: bool = False) -> bool:
+        """
+        Display a new image.
+        Note: The image is scaled into the display buffer right away (the caller may reuse it after the call).
+        An image within the refresh interval is drawn when the interval is over, unless a newer image replaces it.
+        :param image: Grayscale (8 or 16 bit) or RGB image.
+        :param force: Display the image even within the refresh interval (e.g. for images shown only once).
+        :return: True: image drawn | False: image deferred to the end of the refresh interval (or no image)
+        """
 
         if not isinstance(image, np.ndarray):
-            return
+            return False
+
+        # 1. Scale the image into the display buffer (small copy, so no reference to the caller's image is kept)
+        q_image = self.__convert_cv_qt(image)
+
+        # 2. Within the refresh interval: draw the display buffer when the interval is over
+        now = time.monotonic()
+        if not force and self.max_fps > 0 and now - self.__last_update < 1.0 / self.max_fps:
+            self.__image_pending = True
+            if not self.__redraw_timer.isActive():
+                remaining = 1.0 / self.max_fps - (now - self.__last_update)
+                self.__redraw_timer.start(max(int(remaining * 1000) + 1, 1))
+            return False
+
+        # 3. Draw the display buffer
+        self.__redraw_timer.stop()
+        self.__draw_buffer(q_image, now)
+        return True
+
+    def __draw_buffer(self, q_image: QImage, now: float):
+        """
+        Draw the display buffer.
+        :param q_image: QImage wrapping the display buffer.
+        :param now: Time of the update (time.monotonic).
+        :return: None
+        """
+        self.__last_update = now
+        self.__image_pending = False
+        self.__image.setPixmap(QPixmap.fromImage(q_image))
 
-        q_pixmap = self.__convert_cv_qt(image)
-        self.__image.setPixmap(QPixmap.fromImage(q_pixmap))
+    def __draw_pending_image(self):
+        """
+        Draw the last image skipped within the refresh interval.
+        :return: None
+        """
+        if self.__image_pending and self.__q_image is not None:
+            self.__draw_buffer(self.__q_image, time.monotonic())
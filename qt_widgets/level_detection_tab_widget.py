@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QWidget, QHBoxLayout, QGroupBox
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QGroupBox, QVBoxLayout, QFormLayout, QComboBox
 from .image_widget import ImageWidget
 import bv_algorithms as bv
 import numpy as np
@@ -6,9 +6,10 @@ import numpy as np
 
 class LevelDetectionTabWidget(QWidget):
 
-    def __init__(self):
+    def __init__(self, engine_changed_callback=None):
         super().__init__()
 
+        self.__engine_changed_callback = engine_changed_callback
         self.level_detector = bv.LevelDetector()
 
         self.central_layout = QHBoxLayout(self)
@@ -23,8 +24,48 @@ class LevelDetectionTabWidget(QWidget):
         self.contours_image_widget = ImageWidget()
         self.contours_image_widget.setObjectName(u"contours_image_widget")
         self.groupbbox_contours_layout.addWidget(self.contours_image_widget)
+
+        # Level Detection Params
+        self.groupbox_controls = QGroupBox()
+        self.groupbox_controls.setObjectName(u"groupbox_controls")
+        self.groupbox_controls.setTitle(u"Level Detection")
+        self.groupbox_controls.setMaximumWidth(220)
+        self.groupbox_controls_layout = QVBoxLayout(self.groupbox_controls)
+        self.groupbox_controls_layout.setObjectName(u"groupbox_controls_layout")
+
+        self.controls_form_layout = QFormLayout()
+        self.controls_form_layout.setObjectName(u"controls_form_layout")
+        self.engine_combobox = QComboBox()
+        self.engine_combobox.setObjectName(u"engine_combobox")
+        self.engine_combobox.addItems(bv.LEVEL_ENGINES)
+        self.engine_combobox.currentTextChanged.connect(self.__engine_selected)
+        self.controls_form_layout.addRow("Engine:", self.engine_combobox)
+        self.groupbox_controls_layout.addLayout(self.controls_form_layout)
+        self.groupbox_controls_layout.addStretch()
+
         self.central_layout.addWidget(self.groupbbox_contours)
+        self.central_layout.addWidget(self.groupbox_controls)
+
+    def __engine_selected(self, engine: str):
+        self.level_detector.engine = engine
+        if self.__engine_changed_callback is not None:
+            self.__engine_changed_callback(engine)
+
+    def level_engine(self) -> str:
+        """
+        Selected level detection engine.
+        :return: Engine name (see LEVEL_ENGINES)
+        """
+        return self.engine_combobox.currentText()
 
     def update_image(self, diff_frame: np.ndarray):
         new_frame = self.level_detector.detect(diff_frame.copy())
-        self.contours_image_widget.update_image(new_frame)
+        self.show_level_image(new_frame)
+
+    def show_level_image(self, level_frame: np.ndarray):
+        """
+        Display a level detection result without running the detection.
+        :param level_frame: Frame returned by the level detection.
+        :return: True if the image was drawn (see ImageWidget.update_image)
+        """
+        return self.contours_image_widget.update_image(level_frame)
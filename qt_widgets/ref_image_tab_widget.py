@@ -7,9 +7,10 @@ import numpy as np
 
 class RefImageTabWidget(QWidget):
 
-    def __init__(self):
+    def __init__(self, distance_changed_callback=None):
         super().__init__()
 
+        self.__distance_changed_callback = distance_changed_callback
         self.__diff_image_set = False
         self.__diff_image_builder = bv.DifferenceImageBuilder()
 
@@ -72,10 +73,12 @@ class RefImageTabWidget(QWidget):
     def __slider_value_changed(self, value: int):
         self.__diff_image_builder.distance = value
         self.current_distance_label.setText(f"{value}")
+        if self.__distance_changed_callback is not None:
+            self.__distance_changed_callback(value)
 
     def __save_ref_image(self):
         self.__diff_image_builder.set_reference_image(self.active_frame.copy())
-        self.reference_image.update_image(self.active_frame.copy())
+        self.reference_image.update_image(self.active_frame.copy(), force=True)
         self.__diff_image_set = True
 
     def ref_image_state(self):
@@ -91,3 +94,25 @@ class RefImageTabWidget(QWidget):
         if self.__diff_image_set:
             self.diff_image = self.__diff_image_builder.build(self.active_frame)
             self.difference_image.update_image(self.diff_image)
+
+    def show_reference_image(self, frame: np.ndarray):
+        """
+        Display a reference image set outside of this widget.
+        :param frame: Reference image
+        :return: None
+        """
+        self.reference_image.update_image(frame, force=True)
+        self.__diff_image_set = True
+
+    def show_images(self, frame: np.ndarray, diff_image: np.ndarray = None):
+        """
+        Display live and difference image without building the difference image.
+        :param frame: Live glass frame
+        :param diff_image: Difference image (None: keep the last one)
+        :return: True if all given images were drawn (see ImageWidget.update_image)
+        """
+        drawn = self.live_image.update_image(frame)
+        if diff_image is not None:
+            self.diff_image = diff_image
+            drawn = self.difference_image.update_image(diff_image) and drawn
+        return drawn
@@ -1,23 +1,27 @@
 import cv2
 import operator
 from PySide6.QtCore import Slot
-from PySide6.QtWidgets import QWidget, QPushButton, QHBoxLayout, QGroupBox, QFormLayout, QLineEdit, QLabel, QVBoxLayout
+from PySide6.QtWidgets import (QWidget, QPushButton, QHBoxLayout, QGroupBox, QFormLayout, QLineEdit, QLabel,
+                               QVBoxLayout, QComboBox)
 from .image_widget import ImageWidget
+import bv_algorithms as bv
 import numpy as np
 
 
 class ROITabWidget(QWidget):
+    """
+    ROI selection of all stations (one ROI and glass per station) seen by the camera.
+    Note: The controls edit the ROI of the selected station, the image shows all stations.
+    """
 
     def __init__(self, roi_update_callback, default_p1: tuple = (0, 0), default_p2: tuple = (2048, 2048)):
         super().__init__()
         self.__roi_update_callback_fct = roi_update_callback
-        self.__glass_p1 = (0, 0)
-        self.__glass_p2 = (0, 0)
-        self.__p1 = default_p1
-        self.__p2 = default_p2
-        self.glass_type = -1
-        self.fill_level = -1
-        self.fill_level_pixel = 0
+
+        # ROI (p1, p2) and detection state of each station, the index is the station id.
+        self.__rois = [(default_p1, default_p2)]
+        self.__stations = [self.__new_station()]
+        self.__selected = 0
         self.roi_image = np.zeros(shape=(2048, 2048), dtype='uint8')
         self.setObjectName(u"roi_tab_widget")   # Set default object name
 
@@ -29,29 +33,35 @@ class ROITabWidget(QWidget):
         self.groupbox_controls.setObjectName(u"groupbox_controls")
         self.groupbox_controls.setTitle(u"Select ROI Coordinates")
         self.groupbox_controls.setMaximumWidth(220)
-        self.groupbox_controls.setMaximumHeight(220)
+        self.groupbox_controls.setMaximumHeight(300)
 
         self.roi_form_layout = QFormLayout(self.groupbox_controls)
         self.roi_form_layout.setObjectName(u"roi_form_layout")
 
+        self.station_combobox = QComboBox()
+        self.station_combobox.setObjectName(u"station_combobox")
+        self.station_combobox.addItem(u"Station 0")
+        self.station_combobox.currentIndexChanged.connect(self.__station_selected)
+        self.roi_form_layout.addRow("Station:", self.station_combobox)
+
         self.roi_textbox_x1 = QLineEdit()
         self.roi_textbox_x1.setObjectName(u"roi_textbox_x1")
-        self.roi_textbox_x1.setText(f"{self.__p1[0]}")
+        self.roi_textbox_x1.setText(f"{default_p1[0]}")
         self.roi_form_layout.addRow("x_1:", self.roi_textbox_x1)
 
         self.roi_textbox_y1 = QLineEdit()
         self.roi_textbox_y1.setObjectName(u"roi_textbox_y1")
-        self.roi_textbox_y1.setText(f"{self.__p1[1]}")
+        self.roi_textbox_y1.setText(f"{default_p1[1]}")
         self.roi_form_layout.addRow("y_1:", self.roi_textbox_y1)
 
         self.roi_textbox_x2 = QLineEdit()
         self.roi_textbox_x2.setObjectName(u"roi_textbox_x2")
-        self.roi_textbox_x2.setText(f"{self.__p2[0]}")
+        self.roi_textbox_x2.setText(f"{default_p2[0]}")
         self.roi_form_layout.addRow("x_2:", self.roi_textbox_x2)
 
         self.roi_textbox_y2 = QLineEdit()
         self.roi_textbox_y2.setObjectName(u"roi_textbox_y2")
-        self.roi_textbox_y2.setText(f"{self.__p2[1]}")
+        self.roi_textbox_y2.setText(f"{default_p2[1]}")
         self.roi_form_layout.addRow("y_2:", self.roi_textbox_y2)
 
         self.select_button = QPushButton()
@@ -60,6 +70,19 @@ class ROITabWidget(QWidget):
         self.select_button.clicked.connect(self.__select_roi_clicked)
         self.roi_form_layout.addWidget(self.select_button)
 
+        self.add_button = QPushButton()
+        self.add_button.setObjectName(u"add_button")
+        self.add_button.setText(u"Add Station")
+        self.add_button.clicked.connect(self.__add_station_clicked)
+        self.roi_form_layout.addWidget(self.add_button)
+
+        self.remove_button = QPushButton()
+        self.remove_button.setObjectName(u"remove_button")
+        self.remove_button.setText(u"Remove Station")
+        self.remove_button.setEnabled(False)
+        self.remove_button.clicked.connect(self.__remove_station_clicked)
+        self.roi_form_layout.addWidget(self.remove_button)
+
         # Info Controls
         self.info_groupbox = QGroupBox()
         self.info_groupbox.setObjectName(u"info_groupbox")
@@ -78,8 +101,13 @@ class ROITabWidget(QWidget):
         self.fill_level_label.setObjectName(u"fill_level_label")
         self.fill_level_label.setText(u"Fill Level: - mm")
 
+        # Fill level of all stations
+        self.stations_label = QLabel()
+        self.stations_label.setObjectName(u"stations_label")
+
         self.info_groupbox_layout.addWidget(self.glass_type_label)
         self.info_groupbox_layout.addWidget(self.fill_level_label)
+        self.info_groupbox_layout.addWidget(self.stations_label)
 
         # ROI Image Widget
         self.roi_image_groupbox = QGroupBox()
@@ -95,72 +123,174 @@ class ROITabWidget(QWidget):
         self.central_layout.addWidget(self.info_groupbox)
         self.central_layout.addWidget(self.roi_image_groupbox)
 
+    @staticmethod
+    def __new_station() -> dict:
+        """
+        Detection state of a station without detected glass.
+        :return: Dictionary with glass type, glass rectangle (original frame) and fill level in pixel
+        """
+        return {'glass_type': -1, 'glass_p1': (0, 0), 'glass_p2': (0, 0), 'fill_level_pixel': 0}
+
     @Slot()
     def __select_roi_clicked(self):
-        self.__p1 = (int(self.roi_textbox_x1.text()), int(self.roi_textbox_y1.text()))
-        self.__p2 = (int(self.roi_textbox_x2.text()), int(self.roi_textbox_y2.text()))
+        self.__rois[self.__selected] = ((int(self.roi_textbox_x1.text()), int(self.roi_textbox_y1.text())),
+                                        (int(self.roi_textbox_x2.text()), int(self.roi_textbox_y2.text())))
+        self.__stations[self.__selected] = self.__new_station()
+        self.__roi_update_callback_fct()
+
+    @Slot()
+    def __add_station_clicked(self):
+        # New station starts with a copy of the selected ROI
+        self.__rois.append(self.__rois[self.__selected])
+        self.__stations.append(self.__new_station())
+        self.station_combobox.addItem(f"Station {len(self.__rois) - 1}")
+        self.station_combobox.setCurrentIndex(len(self.__rois) - 1)
+        self.remove_button.setEnabled(True)
+        self.__roi_update_callback_fct()
+
+    @Slot()
+    def __remove_station_clicked(self):
+        # Station ids are list indices, only the last station can be removed without renumbering.
+        if len(self.__rois) <= 1:
+            return
+        self.__rois.pop()
+        self.__stations.pop()
+        self.station_combobox.removeItem(len(self.__rois))
+        self.remove_button.setEnabled(len(self.__rois) > 1)
+        self.__roi_update_callback_fct()
+
+    @Slot(int)
+    def __station_selected(self, index: int):
+        if index < 0 or index >= len(self.__rois):
+            return
+        self.__selected = index
+        p1, p2 = self.__rois[index]
+        self.roi_textbox_x1.setText(str(p1[0]))
+        self.roi_textbox_y1.setText(str(p1[1]))
+        self.roi_textbox_x2.setText(str(p2[0]))
+        self.roi_textbox_y2.setText(str(p2[1]))
         self.__roi_update_callback_fct()
 
     def update_roi(self, p1: tuple, p2: tuple):
-        self.__p1 = p1
-        self.__p2 = p2
+        self.__rois[self.__selected] = (p1, p2)
         self.roi_textbox_x1.setText(str(p1[0]))
         self.roi_textbox_y1.setText(str(p1[1]))
         self.roi_textbox_x2.setText(str(p2[0]))
         self.roi_textbox_y2.setText(str(p2[1]))
 
-    def update_glass_rect(self, p1: tuple, p2: tuple):
+    def set_rois(self, rois: list):
+        """
+        Replace the ROIs of all stations (e.g. when another stream is selected), the first station gets selected.
+        :param rois: List of (p1, p2) with top left and bottom right corner (x, y), the index is the station id.
+        :return: None
+        """
+        self.__rois = [(tuple(p1), tuple(p2)) for p1, p2 in rois]
+        self.__stations = [self.__new_station() for _ in self.__rois]
+        self.__selected = 0
+
+        self.station_combobox.blockSignals(True)
+        self.station_combobox.clear()
+        self.station_combobox.addItems([f"Station {station_id}" for station_id in range(len(self.__rois))])
+        self.station_combobox.blockSignals(False)
+        self.remove_button.setEnabled(len(self.__rois) > 1)
+        self.update_roi(*self.__rois[0])
+
+    def get_roi(self):
+        """
+        ROI of the selected station.
+        :return: Tuple (p1, p2) with top left and bottom right corner (x, y)
+        """
+        return self.__rois[self.__selected]
+
+    def get_rois(self):
+        """
+        ROIs of all stations.
+        :return: List of (p1, p2) with top left and bottom right corner (x, y), the index is the station id.
+        """
+        return list(self.__rois)
+
+    def selected_station(self) -> int:
+        """
+        Station selected in the controls.
+        :return: Station id
+        """
+        return self.__selected
+
+    def update_station(self, station_id: int, glass_type: int, glass_rect: tuple, fill_level_pixel: int):
+        """
+        Detection state of a station.
+        :param station_id: Station id.
+        :param glass_type: 0: Small glass | 1: Large glass | -1: No glass
+        :param glass_rect: Detected glass (x1, y1, x2, y2) on the ROI of the station.
+        :param fill_level_pixel: Fill level in pixel referenced by the glass mask.
+        :return: None
+        """
+        if station_id >= len(self.__stations):
+            return
 
         # Transform detected glass points into original frame size
-        self.__glass_p1 = tuple(map(operator.add, self.__p1, p1))
-        self.__glass_p2 = tuple(map(operator.add, self.__p1, p2))
+        p1 = self.__rois[station_id][0]
+        self.__stations[station_id] = {'glass_type': glass_type,
+                                       'glass_p1': tuple(map(operator.add, p1, glass_rect[0:2])),
+                                       'glass_p2': tuple(map(operator.add, p1, glass_rect[2:4])),
+                                       'fill_level_pixel': fill_level_pixel}
 
-    def update_image(self, frame: np.ndarray):
+    def update_image(self, frame: np.ndarray) -> bool:
 
         # ---------------------------- #
         # Update GUI elements
         # ---------------------------- #
-        fill_level_mm: float = 0.0
-        if self.glass_type == 0:
-            glass_height_pixel = self.__glass_p2[1] - self.__glass_p1[1]
-            # glass_height_pixel += int(glass_height_pixel * 0.2)
-            if self.fill_level_pixel > 0.0:
-                fill_level_mm = 118.0 / glass_height_pixel * (glass_height_pixel - self.fill_level_pixel)
+        levels_mm = []
+        for station in self.__stations:
+            glass_height_pixel = station['glass_p2'][1] - station['glass_p1'][1]
+            levels_mm.append(bv.fill_level_mm(station['glass_type'], glass_height_pixel, station['fill_level_pixel']))
+
+        glass_type = self.__stations[self.__selected]['glass_type']
+        if glass_type == 0:
             self.glass_type_label.setText(u"Glass: Small")
-        elif self.glass_type == 1:
-            glass_height_pixel = self.__glass_p2[1] - self.__glass_p1[1]
-            # glass_height_pixel += int(glass_height_pixel * 0.1)
-            if self.fill_level_pixel > 0.0:
-                fill_level_mm = 145.0 / glass_height_pixel * (glass_height_pixel - self.fill_level_pixel)
+        elif glass_type == 1:
             self.glass_type_label.setText(u"Glass: Large")
 
-        self.fill_level_label.setText("Level: " + str(round(fill_level_mm, 2)) + " mm")
+        self.fill_level_label.setText("Level: " + str(round(levels_mm[self.__selected], 2)) + " mm")
+        if len(self.__stations) > 1:
+            self.stations_label.setText("\n".join(f"Station {station_id}: {round(level_mm, 2)} mm"
+                                                  for station_id, level_mm in enumerate(levels_mm)))
+        else:
+            self.stations_label.setText("")
 
         # ---------------------------- #
         # Get ROI Image
         # ---------------------------- #
-        self.roi_image = frame[self.__p1[1]:self.__p2[1], self.__p1[0]:self.__p2[0]].copy()
+        p1, p2 = self.__rois[self.__selected]
+        self.roi_image = frame[p1[1]:p2[1], p1[0]:p2[0]].copy()
         frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
 
-        # ---------------------------- #
-        # Draw BoundingBox around ROI
-        # ---------------------------- #
-        frame = cv2.rectangle(frame, self.__p1, self.__p2, color=(255, 0, 0), thickness=3)
+        for station_id, ((p1, p2), station) in enumerate(zip(self.__rois, self.__stations)):
+
+            # ---------------------------- #
+            # Draw BoundingBox around ROI
+            # ---------------------------- #
+            thickness = 3 if station_id == self.__selected else 1
+            frame = cv2.rectangle(frame, p1, p2, color=(255, 0, 0), thickness=thickness)
+            if len(self.__rois) > 1:
+                frame = cv2.putText(frame, str(station_id), (p1[0] + 10, p1[1] + 60), cv2.FONT_HERSHEY_SIMPLEX, 2,
+                                    color=(255, 0, 0), thickness=thickness)
 
-        # ----------------------------------------------------- #
-        # This point indicates if the glass is estimated or not
-        # ----------------------------------------------------- #
-        if self.__p2 != (0, 0):
+            # ----------------------------------------------------- #
+            # This point indicates if the glass is estimated or not
+            # ----------------------------------------------------- #
+            if p2 != (0, 0):
+                glass_p1, glass_p2 = station['glass_p1'], station['glass_p2']
 
-            # Draw BoundingBox around estimated glass region.
-            frame = cv2.rectangle(frame, self.__glass_p1, self.__glass_p2, color=(0, 255, 0), thickness=2)
+                # Draw BoundingBox around estimated glass region.
+                frame = cv2.rectangle(frame, glass_p1, glass_p2, color=(0, 255, 0), thickness=2)
 
-            # Draw the fill-level line
-            glass_height = self.__glass_p2[0] - self.__glass_p2[0]
-            y_level = self.fill_level_pixel + int(glass_height*0.1)
+                # Draw the fill-level line
+                glass_height = glass_p2[0] - glass_p2[0]
+                y_level = station['fill_level_pixel'] + int(glass_height*0.1)
 
-            level_p1 = (self.__glass_p1[0], self.__glass_p1[1] + y_level)
-            level_p2 = (self.__glass_p2[0], self.__glass_p1[1] + y_level)
-            frame = cv2.line(frame, pt1=level_p1, pt2=level_p2, color=(255, 255, 0), thickness=3)
+                level_p1 = (glass_p1[0], glass_p1[1] + y_level)
+                level_p2 = (glass_p2[0], glass_p1[1] + y_level)
+                frame = cv2.line(frame, pt1=level_p1, pt2=level_p2, color=(255, 255, 0), thickness=3)
 
-        self.roi_image_widget.update_image(frame)
+        return self.roi_image_widget.update_image(frame)
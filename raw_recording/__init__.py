@@ -0,0 +1 @@
+from .raw_recording import RawRecordingWriter, RawRecordingReader, RAW_EXTENSION
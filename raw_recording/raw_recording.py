@@ -0,0 +1,174 @@
+import os
+import struct
+import time
+import numpy as np
+
+# ------------------------------------------------------------ #
+# Raw recording file layout (little endian):
+#
+#   [0, DATA_OFFSET)      Header (HEADER_FORMAT, zero padded)
+#   [DATA_OFFSET, ...)    Frames, appended one after another
+#   [index_offset, EOF)   Frame index (INDEX_DTYPE), written on close
+#
+# The header is written with frame_count = 0 and patched on close.
+# A recording that wasn't closed (e.g. crash) is still readable:
+# the frame count is taken from the file size, timestamps are NaN.
+# ------------------------------------------------------------ #
+RAW_EXTENSION = '.raw'
+MAGIC = b'BVRAW\x00\x00\x00'
+VERSION = 1
+
+# magic, version, height, width, dtype string, frame count, index offset
+HEADER_FORMAT = '<8sIII16sQQ'
+
+# Frames start on a page boundary, so every memory-mapped frame is aligned.
+DATA_OFFSET = 4096
+
+# One entry per frame: byte offset in the file and capture time in seconds.
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('timestamp', '<f8')])
+
+
+class RawRecordingWriter(object):
+    """
+    Append-only writer of uncompressed recordings.
+
+    Frames are written unchanged (e.g. raw 16-bit camera frames), so a replay runs the same pipeline
+    as the live camera without any decoding.
+    """
+
+    def __init__(self, file_path: str, frame_shape: tuple, dtype='uint16'):
+        """
+        Constructor, creates the file and writes the header.
+        :param file_path: Path of the recording.
+        :param frame_shape: Frame shape (height, width)
+        :param dtype: Frame data type.
+        """
+        self.frame_shape: tuple = tuple(frame_shape)
+        self.dtype: np.dtype = np.dtype(dtype).newbyteorder('<')
+
+        # Number of frames written.
+        self.frame_count: int = 0
+
+        self.__frame_bytes: int = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.__timestamps: list = []
+        self.__file = open(file_path, 'wb')
+        self.__write_header(0, 0)
+        self.__file.seek(DATA_OFFSET)
+
+    def write(self, frame: np.ndarray, timestamp: float = None) -> None:
+        """
+        Append a frame.
+        :param frame: Frame with the shape and data type of the recording.
+        :param timestamp: Capture time in seconds (None: current time)
+        :return: None
+        """
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} doesn't match the recording {self.frame_shape}.")
+
+        self.__file.write(np.ascontiguousarray(frame, dtype=self.dtype).data)
+        self.__timestamps.append(time.time() if timestamp is None else timestamp)
+        self.frame_count += 1
+
+    def close(self) -> None:
+        """
+        Write the frame index and finish the header.
+        :return: None
+        """
+        if self.__file.closed:
+            return
+
+        index = np.empty(shape=self.frame_count, dtype=INDEX_DTYPE)
+        index['offset'] = DATA_OFFSET + np.arange(self.frame_count, dtype='<u8') * self.__frame_bytes
+        index['timestamp'] = self.__timestamps
+
+        index_offset = DATA_OFFSET + self.frame_count * self.__frame_bytes
+        self.__file.seek(index_offset)
+        self.__file.write(index.tobytes())
+        self.__write_header(self.frame_count, index_offset)
+        self.__file.close()
+
+    def __write_header(self, frame_count: int, index_offset: int) -> None:
+        """
+        Write the header at the start of the file.
+        :param frame_count: Number of frames.
+        :param index_offset: Byte offset of the frame index (0: no index)
+        :return: None
+        """
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.frame_shape[0], self.frame_shape[1],
+                             self.dtype.str.encode('ascii'), frame_count, index_offset)
+        self.__file.seek(0)
+        self.__file.write(header.ljust(DATA_OFFSET, b'\x00'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RawRecordingReader(object):
+    """
+    Zero-copy random access to a raw recording through np.memmap.
+    Note: Frames are read-only views into the file, the operating system loads them on first access.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Constructor, maps the frames and the frame index of the file.
+        :param file_path: Path of the recording.
+        """
+        with open(file_path, 'rb') as file:
+            header = file.read(struct.calcsize(HEADER_FORMAT))
+        if len(header) < struct.calcsize(HEADER_FORMAT):
+            raise ValueError(f"Not a raw recording: {file_path}")
+
+        magic, version, height, width, dtype, frame_count, index_offset = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a raw recording or unsupported version: {file_path}")
+
+        self.file_path: str = file_path
+        self.frame_shape: tuple = (height, width)
+        self.dtype: np.dtype = np.dtype(dtype.rstrip(b'\x00').decode('ascii'))
+
+        frame_bytes = height * width * self.dtype.itemsize
+        if index_offset == 0:
+            # Recording wasn't closed: use all complete frames of the file.
+            frame_count = max(os.path.getsize(file_path) - DATA_OFFSET, 0) // frame_bytes
+            self.index = np.zeros(shape=frame_count, dtype=INDEX_DTYPE)
+            self.index['offset'] = DATA_OFFSET + np.arange(frame_count, dtype='<u8') * frame_bytes
+            self.index['timestamp'] = np.nan
+        else:
+            self.index = np.memmap(file_path, dtype=INDEX_DTYPE, mode='r', offset=index_offset, shape=(frame_count,))
+
+        # All frames of the recording as a (frame_count, height, width) array.
+        self.frames: np.ndarray = np.memmap(file_path, dtype=self.dtype, mode='r', offset=DATA_OFFSET,
+                                            shape=(frame_count, height, width)) if frame_count > 0 else \
+            np.empty(shape=(0, height, width), dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return self.frames.shape[0]
+
+    def __getitem__(self, frame_index: int) -> np.ndarray:
+        """
+        Frame at the given position.
+        :param frame_index: Frame number.
+        :return: Read-only view of the frame.
+        """
+        return self.frames[frame_index]
+
+    def timestamps(self) -> np.ndarray:
+        """
+        Capture time of each frame in seconds (NaN if the recording wasn't closed).
+        :return: Array with one timestamp per frame.
+        """
+        return self.index['timestamp']
+
+    def frame_rate(self) -> float:
+        """
+        Mean frame rate of the recording.
+        :return: Frames per second (0.0 if unknown)
+        """
+        timestamps = self.timestamps()
+        if len(timestamps) < 2 or not np.all(np.isfinite(timestamps[[0, -1]])) or timestamps[-1] <= timestamps[0]:
+            return 0.0
+        return (len(timestamps) - 1) / float(timestamps[-1] - timestamps[0])
@@ -0,0 +1,44 @@
+import os
+import sys
+import cv2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from bv_algorithms import LevelDetectionPipeline
+from pco_capture import SimulatedCamera
+
+
+class PourCamera(SimulatedCamera):
+    """
+    Simulated camera with a pour driven by the frame count instead of the clock (reproducible frames):
+    empty glass, pour, full glass, empty glass again.
+    """
+
+    def fill_fraction(self, timestamp: float) -> float:
+        n = self.frames_generated
+        if n < 50 or n >= 200:
+            return 0.0
+        return min((n - 50) / 100, 1.0)
+
+
+@pytest.mark.parametrize('noise', [0.0, 100.0])
+def test_gated_levels_follow_pour(noise):
+    """
+    The change detection gate must report the same levels as the ungated pipeline during a pour.
+    """
+    camera = PourCamera(frame_rate=0, noise=noise, seed=3)
+    camera.record()
+    gated, ungated = LevelDetectionPipeline(), LevelDetectionPipeline()
+    gated.level_interval = ungated.level_interval = 1
+    ungated.change_detector.enabled = False
+
+    levels, differences = [], []
+    for _ in range(230):
+        frame = cv2.rotate(camera.image()[0], cv2.ROTATE_90_CLOCKWISE)
+        level = ungated.process(frame).level_pixel
+        levels.append(level)
+        differences.append(abs(gated.process(frame).level_pixel - level))
+
+    assert max(levels) > 0
+    assert max(differences) <= 4
+    assert gated.change_detector.frames_skipped > 0
@@ -0,0 +1,73 @@
+import os
+import sys
+import types
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from pco_capture import camera as camera_module
+from pco_capture import create_camera
+
+
+class FakeSdk(object):
+
+    def __init__(self, serial: int):
+        self.serial = serial
+
+    def get_camera_type(self):
+        return {'camera type': 0x1304, 'serial number': self.serial}
+
+
+def fake_pco(serials: list):
+    """
+    Fake pco module: like pco==0.1.3 every Camera opens the next free camera, ValueError if there is none.
+    """
+    module = types.SimpleNamespace(opened=[], closed=[])
+    free = list(serials)
+
+    class Camera(object):
+
+        # Same parameters as pco.Camera of pco==0.1.3 (no serial number)
+        def __init__(self, debuglevel='off', timestamp='off', name='', interface=None):
+            if not free:
+                raise ValueError
+            self.sdk = FakeSdk(free.pop(0))
+            self.interface = interface
+            module.opened.append(self)
+
+        def close(self):
+            module.closed.append(self)
+            free.append(self.sdk.serial)
+
+    module.Camera = Camera
+    return module
+
+
+def test_create_camera_by_serial(monkeypatch):
+    pco = fake_pco([1001, 1002, 1003])
+    monkeypatch.setattr(camera_module, 'pco', pco)
+
+    camera = create_camera('pco', serial=1002, interface='USB 3.0')
+    assert camera.sdk.serial == 1002
+    assert camera.interface == 'USB 3.0'
+    assert [c.sdk.serial for c in pco.closed] == [1001]
+    assert camera not in pco.closed
+
+    # The next camera with a serial skips the camera in use
+    assert create_camera('pco', serial=1003).sdk.serial == 1003
+
+
+def test_create_camera_unknown_serial(monkeypatch):
+    pco = fake_pco([1001, 1002])
+    monkeypatch.setattr(camera_module, 'pco', pco)
+
+    with pytest.raises(ValueError):
+        create_camera('pco', serial=4711)
+    assert len(pco.closed) == 2
+
+
+def test_create_camera_without_serial(monkeypatch):
+    pco = fake_pco([1001, 1002])
+    monkeypatch.setattr(camera_module, 'pco', pco)
+
+    assert create_camera('pco').sdk.serial == 1001
+    assert create_camera('simulated', serial=1001, frame_rate=0).frame_rate == 0